@@ -1,8 +1,19 @@
 #!/bin/bash
 
+LOG_DIR="/mosquitto/log"
+LOG_FILE="${LOG_DIR}/mosquitto.log"
+
+if [ ! -d "$LOG_DIR" ]; then
+  echo "📁 Criando diretório de log: $LOG_DIR"
+  mkdir -p "$LOG_DIR" || { echo "❌ Falha ao criar diretório de log: $LOG_DIR"; exit 1; }
+fi
+touch "$LOG_FILE" && chmod 666 "$LOG_FILE" || echo "⚠️  Falha ao ajustar permissões do arquivo: $LOG_FILE"
+
 /usr/sbin/mosquitto -c /mosquitto/config/mosquitto.conf &
 MOSQUITTO_PID=$!
 
-/usr/local/bin/watch.sh &
+# SIGHUP ao mosquitto quando passwd, ACL, CA, certificado/chave do broker ou CRL mudam
+# (inotify, com polling como fallback; métricas em /mosquitto/log/reload_metrics.json)
+PYTHONPATH=/opt/reload python3 -m mosquitto_auth.broker.reload_daemon --pid "$MOSQUITTO_PID" &
 
 wait $MOSQUITTO_PID
@@ -0,0 +1,146 @@
+from typing import Dict, Iterable, List, Tuple
+
+# Access bits, as in mosquitto's acl_file
+ACCESS_READ = 1
+ACCESS_WRITE = 2
+ACCESS_BITS = {
+    "read": ACCESS_READ,
+    "write": ACCESS_WRITE,
+    "readwrite": ACCESS_READ | ACCESS_WRITE,
+    "deny": 0,
+}
+
+# mosquitto-go-auth / plugin "acc" values
+ACC_READ = 1
+ACC_WRITE = 2
+ACC_READWRITE = 3
+ACC_SUBSCRIBE = 4
+
+
+def required_bits(acc: int) -> int:
+    if acc == ACC_WRITE:
+        return ACCESS_WRITE
+    if acc == ACC_READWRITE:
+        return ACCESS_READ | ACCESS_WRITE
+    return ACCESS_READ  # read and subscribe
+
+
+def validate_topic_filter(topic: str) -> str:
+    if not topic:
+        raise ValueError("Topic must not be empty.")
+    levels = topic.split("/")
+    for i, level in enumerate(levels):
+        if "#" in level and (level != "#" or i != len(levels) - 1):
+            raise ValueError(f"Invalid topic '{topic}': '#' must be a whole, last level.")
+        if "+" in level and level != "+":
+            raise ValueError(f"Invalid topic '{topic}': '+' must be a whole level.")
+    return topic
+
+
+class _Node:
+    __slots__ = ("children", "templates", "grant", "deny")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.templates: List[Tuple[str, "_Node"]] = []  # levels containing %u / %c
+        self.grant = 0
+        self.deny = False
+
+
+class TopicTrie:
+    """
+    ACL topic filters compiled into a trie, one level per node, with +/# handling.
+    Only pattern tries substitute %u / %c; in a user's topic rules they are literal, as in mosquitto.
+    """
+
+    def __init__(self, patterns: bool = False):
+        self.root = _Node()
+        self.size = 0
+        self.patterns = patterns
+
+    def insert(self, topic: str, access: str) -> None:
+        node = self.root
+        for level in topic.split("/"):
+            if self.patterns and ("%u" in level or "%c" in level):
+                child = next((n for t, n in node.templates if t == level), None)
+                if child is None:
+                    child = _Node()
+                    node.templates.append((level, child))
+            else:
+                child = node.children.get(level)
+                if child is None:
+                    child = node.children[level] = _Node()
+            node = child
+        if access == "deny":
+            node.deny = True
+        else:
+            node.grant |= ACCESS_BITS[access]
+        self.size += 1
+
+    def match(self, levels: List[str], username: str = "", clientid: str = "") -> Tuple[int, bool]:
+        """Return (granted access bits, denied) over every filter matching the topic."""
+        grant, deny = 0, False
+        stack = [(self.root, 0)]
+        while stack:
+            node, i = stack.pop()
+            # Wildcards never match a leading '$' level ($SYS, $CONTROL...)
+            wildcards = not (i == 0 and levels and levels[0].startswith("$"))
+            if wildcards:
+                hash_node = node.children.get("#")
+                if hash_node is not None:
+                    grant |= hash_node.grant
+                    deny = deny or hash_node.deny
+            if i == len(levels):
+                grant |= node.grant
+                deny = deny or node.deny
+                continue
+            level = levels[i]
+            child = node.children.get(level)
+            if child is not None:
+                stack.append((child, i + 1))
+            if wildcards and level not in ("+", "#"):
+                plus = node.children.get("+")
+                if plus is not None:
+                    stack.append((plus, i + 1))
+            for template, child in node.templates:
+                if template.replace("%u", username).replace("%c", clientid) == level:
+                    stack.append((child, i + 1))
+        return grant, deny
+
+
+class AclEngine:
+    """
+    Compiled ACL: one trie per user plus one trie of pattern rules (%u / %c).
+    A check walks at most two tries, independent of the total number of rules.
+    """
+
+    def __init__(self, rules: Iterable[dict] = (), superusers: Iterable[str] = ()):
+        self.user_tries: Dict[str, TopicTrie] = {}
+        self.pattern_trie = TopicTrie(patterns=True)
+        self.superusers = set(superusers)
+        for rule in rules:
+            username = rule.get("username")
+            if username:
+                self.user_tries.setdefault(username, TopicTrie()).insert(rule["topic"], rule["access"])
+            else:
+                self.pattern_trie.insert(rule["topic"], rule["access"])
+
+    @property
+    def empty(self) -> bool:
+        return not self.user_tries and not self.pattern_trie.size
+
+    def check(self, username: str, clientid: str | None, topic: str, acc: int) -> bool:
+        if username in self.superusers:
+            return True
+        levels = topic.split("/")
+        clientid = clientid or ""
+        grant, deny = self.pattern_trie.match(levels, username, clientid)
+        user_trie = self.user_tries.get(username)
+        if user_trie is not None:
+            user_grant, user_deny = user_trie.match(levels, username, clientid)
+            grant |= user_grant
+            deny = deny or user_deny
+        if deny:
+            return False
+        need = required_bits(acc)
+        return grant & need == need
@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, List
+from mosquitto_auth.acl.engine import AclEngine, ACCESS_BITS, validate_topic_filter
+from mosquitto_auth.lib.fs import atomic_write, file_lock
+
+
+def normalize_rule(rule: dict) -> dict:
+    """Rules without a username are mosquitto 'pattern' rules and may use %u / %c."""
+    access = rule.get("access", "readwrite")
+    if access not in ACCESS_BITS:
+        raise ValueError(f"Invalid access '{access}'. Choose one of: {', '.join(ACCESS_BITS)}")
+    username = rule.get("username") or None
+    topic = validate_topic_filter(rule.get("topic", ""))
+    return {"username": username, "topic": topic, "access": access}
+
+
+def render_acl_file(rules: Iterable[dict]) -> str:
+    """Render rules in mosquitto acl_file syntax: pattern lines first, then one block per user."""
+    lines = ["# Generated by mosquitto_auth. Manual changes are overwritten.", ""]
+    by_user: dict[str, List[dict]] = {}
+    for rule in rules:
+        if rule["username"]:
+            by_user.setdefault(rule["username"], []).append(rule)
+        else:
+            lines.append(f"pattern {rule['access']} {rule['topic']}")
+    for username, user_rules in by_user.items():
+        lines.append("")
+        lines.append(f"user {username}")
+        lines.extend(f"topic {r['access']} {r['topic']}" for r in user_rules)
+    return "\n".join(lines) + "\n"
+
+
+class AclStore:
+    """
+    ACL rules persisted as JSON, rendered to the broker's acl_file on every change,
+    and compiled into an AclEngine that is rebuilt only when the rules file changes.
+    Changes take a file_lock on the rules file, so both API workers see each
+    other's edits.
+    """
+
+    def __init__(self, rules_path: Path, acl_file_path: Path, superusers: Iterable[str] = ()):
+        self.rules_path = Path(rules_path)
+        self.acl_file_path = Path(acl_file_path)
+        self.superusers = list(superusers)
+        self._lock = threading.Lock()
+        self._rules: List[dict] = []
+        self._engine = AclEngine(superusers=self.superusers)
+        self._signature = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.rules_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _refresh(self) -> None:
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return
+        rules: List[dict] = []
+        if signature is not None:
+            with open(self.rules_path, "r", encoding="utf-8") as f:
+                rules = [normalize_rule(r) for r in json.load(f).get("rules", [])]
+        self._rules = rules
+        self._engine = AclEngine(rules, self.superusers)
+        self._signature = signature
+
+    def fresh(self) -> bool:
+        """True when the compiled engine matches the rules file (one stat, no lock)."""
+        return self._stat_signature() == self._signature
+
+    def rules(self) -> List[dict]:
+        with self._lock:
+            self._refresh()
+            return list(self._rules)
+
+    def engine(self) -> AclEngine:
+        with self._lock:
+            self._refresh()
+            return self._engine
+
+    def _save(self, rules: List[dict]) -> None:
+        atomic_write(self.rules_path, json.dumps({"rules": rules}, indent=2))
+        atomic_write(self.acl_file_path, render_acl_file(rules))
+        self._rules = rules
+        self._engine = AclEngine(rules, self.superusers)
+        self._signature = self._stat_signature()
+
+    def replace_rules(self, rules: Iterable[dict]) -> List[dict]:
+        normalized = [normalize_rule(r) for r in rules]
+        with self._lock, file_lock(self.rules_path):
+            self._save(normalized)
+            return list(normalized)
+
+    def add_rules(self, rules: Iterable[dict]) -> List[dict]:
+        new_rules = [normalize_rule(r) for r in rules]
+        with self._lock, file_lock(self.rules_path):
+            self._refresh()
+            merged = self._rules + [r for r in new_rules if r not in self._rules]
+            self._save(merged)
+            return list(merged)
+
+    def remove_rules(self, rules: Iterable[dict]) -> List[dict]:
+        to_remove = [normalize_rule(r) for r in rules]
+        with self._lock, file_lock(self.rules_path):
+            self._refresh()
+            remaining = [r for r in self._rules if r not in to_remove]
+            self._save(remaining)
+            return list(remaining)
+
+    def render(self) -> str:
+        return render_acl_file(self.rules())
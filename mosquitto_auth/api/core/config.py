@@ -13,12 +13,38 @@ class Settings(BaseSettings):
     BROKER_CN: str
     BROKER_PORT: int = 8883
     PASSWD_FILE_PATH: Path = Path("./config/mosquitto.passwd")
+    MOSQUITTO_CONF_PATH: Path = Path("./config/mosquitto.conf")
+    PASSWD_BACKEND: str = "native"  # native | subprocess (mosquitto_passwd) | dynsec (dynamic-security plugin)
+    PASSWD_HASH_WORKERS: int | None = None  # bulk hashing processes (default: CPU count)
+    PASSWD_COMMIT_WINDOW_MS: int = 20  # group commit window for passwd writes
     LOG_FILE_PATH: Path = Path("./log/mosquitto.log")
+    RELOAD_METRICS_PATH: Path = Path("./log/reload_metrics.json")  # written by the broker's reload daemon
+    RELOAD_CONTROL_URL: str | None = None  # reload daemon control server, e.g. http://mosquitto:8884 (unset: rely on the file watcher)
+    RELOAD_CONTROL_TOKEN: str | None = None  # shared with the broker container
+    RELOAD_BATCH_WINDOW_MS: int = 50  # reload requests within this window share one control call
+    RELOAD_WAIT_TIMEOUT_SECONDS: float = 10.0  # max wait for ?wait_reload=true
+    ACL_RULES_PATH: Path = Path("./config/acl.json")
+    ACL_FILE_PATH: Path = Path("./config/mosquitto.acl")
     
     # Configurações do Monitoramento MQTT
     USER_MQTT_MONITOR: str = "$SYS-monitor"
     PASSWD_MQTT_MONITOR: str = "$SYS-pswd"
     SYS_INTERVAL_ACL: int = 10
+    METRICS_HISTORY_TIERS: dict[int, int] = {1: 3600, 60: 2880, 3600: 720}  # bucket seconds -> buckets kept (1h, 2d, 30d)
+    METRICS_HISTORY_MAX_POINTS: int = 1000  # max bins per /monitor/history series
+    METRICS_STORE_ENABLED: bool = True  # persist $SYS samples to SQLite so history survives restarts
+    METRICS_DB_PATH: Path = Path("./log/metrics.db")
+    METRICS_RETENTION_DAYS: dict[int, float] = {1: 2, 60: 30, 3600: 730}  # table resolution (s) -> days kept
+    METRICS_FLUSH_SECONDS: float = 10.0  # buffered samples are written in one transaction per interval
+    METRICS_ROLLUP_SECONDS: float = 300.0  # rollup + retention pass
+    METRICS_MMAP_BYTES: int = 256 * 1024 * 1024  # mmap window for history reads
+    
+    # 🔑 HTTP auth backend for mosquitto-go-auth (/auth/*, reachable without API key)
+    AUTH_BACKEND_ENABLED: bool = False
+    AUTH_BACKEND_TOKEN: str | None = None  # sent by mosquitto-go-auth as x-auth-backend-token; required to mount /auth
+    AUTH_SUPERUSERS: list[str] = []
+    AUTH_CACHE_SIZE: int = 100_000
+    AUTH_CACHE_TTL: float = 300.0
     
     # 🔐 CERTS
     certs_dir: Path = "certs"
@@ -28,6 +54,22 @@ class Settings(BaseSettings):
     broker_key_path: Path = "certs/broker/broker.key"
     broker_dir: Path = "certs/broker"
     client_certs_dir: Path = "certs/client"
+    BROKER_CERT_KEEP_VERSIONS: int = 5  # broker certificate versions kept for rollback (including the active one)
+    crl_path: Path = "certs/ca.crl"  # point mosquitto's crlfile here
+    crl_delta_path: Path = "certs/ca.delta.crl"
+    KEY_POOL_SIZES: dict[str, int] = {"rsa-2048": 32}  # pre-generated keys kept per key type (0 disables)
+    KEY_POOL_WORKERS: int = 1  # processes refilling the key pool
+    CERT_ISSUE_WORKERS: int | None = None  # bulk issuance processes (default: CPU count)
+    CERT_INVENTORY_REFRESH_SECONDS: float = 5.0  # min interval between certs directory rescans
+    CERT_RENEWAL_ENABLED: bool = True  # re-issue client certificates before they expire
+    CERT_RENEWAL_WINDOW_DAYS: float = 30.0  # renew certificates expiring within this many days
+    CERT_RENEWAL_RATE_PER_MINUTE: float = 60.0  # max renewals per minute
+    CERT_RENEWAL_WORKERS: int = 2  # concurrent renewals
+    CERT_RENEWAL_CHECK_SECONDS: float = 60.0  # scheduling cycle interval
+    CERT_RENEWAL_DAYS: int | None = None  # validity of renewed certificates (default: same as the old one)
+    CRL_VALIDITY_HOURS: float = 168.0  # CRL nextUpdate; republished at half of it
+    CRL_DELTA_MAX_ENTRIES: int = 1000  # delta CRL size that moves its base forward
+    CRL_BATCH_WINDOW_SECONDS: float = 0.2  # revocations arriving within this window share one CRL rebuild
     
     model_config = SettingsConfigDict(
         env_file=".env", 
@@ -1,5 +1,6 @@
 from typing import Annotated
 import asyncio
+import hmac
 from fastapi import HTTPException, Depends, status, WebSocket
 from fastapi.security import APIKeyHeader
 from pydantic import ValidationError
@@ -15,6 +16,15 @@ async def verify_api_key(api_key: Annotated[str, Depends(api_key_scheme)]) -> st
 
 ApiKeyDep: Annotated[str, Depends(verify_api_key)] = Depends(verify_api_key)
 
+auth_backend_token_scheme = APIKeyHeader(name="x-auth-backend-token", auto_error=False)
+
+async def verify_auth_backend_token(token: Annotated[str | None, Depends(auth_backend_token_scheme)]) -> None:
+    # mosquitto-go-auth reads any non-200 as a denial, so a missing or wrong token is a plain 403
+    if not token or not hmac.compare_digest(token, settings.AUTH_BACKEND_TOKEN or ""):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid auth backend token")
+
+AuthBackendDep = Depends(verify_auth_backend_token)
+
 async def verify_websocket_auth(websocket: WebSocket) -> None:
     await websocket.accept()
 
@@ -0,0 +1,247 @@
+import math
+import threading
+import time
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # not a dependency: the array backend is the supported default, NumPy only speeds up queries
+    np = None
+
+AGGREGATES = ("min", "max", "avg", "last")
+
+
+def _new(typecode: str, value, size: int, numpy: bool):
+    if numpy:
+        return np.full(size, value, dtype=np.int64 if typecode == "q" else np.float64)
+    return array(typecode, [value]) * size
+
+
+def _fill(values, start: int, stop: int, value) -> None:
+    if isinstance(values, array):
+        values[start:stop] = array(values.typecode, [value]) * (stop - start)
+    else:
+        values[start:stop] = value
+
+
+def _clean(value: float) -> float | None:
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+class _Tier:
+    """
+    Ring of `capacity` buckets of `step` seconds, one column per field. Each slot
+    remembers which bucket it holds (`stamps`), so wrapped-around data is never
+    mistaken for current data and nothing has to be cleared eagerly.
+    """
+
+    def __init__(self, step: int, capacity: int, width: int, numpy: bool = False):
+        self.step = step
+        self.capacity = capacity
+        self.width = width
+        self.numpy = numpy
+        size = capacity * width
+        self.stamps = _new("q", -1, capacity, numpy)
+        self.mins = _new("d", math.inf, size, numpy)
+        self.maxs = _new("d", -math.inf, size, numpy)
+        self.sums = _new("d", 0.0, size, numpy)
+        self.counts = _new("d", 0.0, size, numpy)
+        self.lasts = _new("d", math.nan, size, numpy)
+
+    @property
+    def span(self) -> int:
+        return self.step * self.capacity
+
+    def add(self, column: int, value: float, ts: float) -> None:
+        bucket = int(ts // self.step)
+        slot = bucket % self.capacity
+        row = slot * self.width
+        if self.stamps[slot] != bucket:
+            self.stamps[slot] = bucket
+            _fill(self.mins, row, row + self.width, math.inf)
+            _fill(self.maxs, row, row + self.width, -math.inf)
+            _fill(self.sums, row, row + self.width, 0.0)
+            _fill(self.counts, row, row + self.width, 0.0)
+            _fill(self.lasts, row, row + self.width, math.nan)
+        i = row + column
+        if value < self.mins[i]:
+            self.mins[i] = value
+        if value > self.maxs[i]:
+            self.maxs[i] = value
+        self.sums[i] += value
+        self.counts[i] += 1
+        self.lasts[i] = value
+
+    def aggregate(self, columns: Sequence[int], first_bucket: int, bins: int, per_bin: int) -> Dict[str, list]:
+        """
+        Downsample `bins` consecutive groups of `per_bin` buckets starting at `first_bucket`.
+        Returns {aggregate: [bin][column]} with NaN where a bin holds no sample.
+        """
+        if self.numpy:
+            return self._aggregate_numpy(columns, first_bucket, bins, per_bin)
+        return self._aggregate_array(columns, first_bucket, bins, per_bin)
+
+    def _runs(self, first_bucket: int, stop_bucket: int) -> List[Tuple[int, int]]:
+        """
+        Slot ranges [start, stop), oldest first, of the consecutive slots that still hold
+        buckets first_bucket..stop_bucket-1 (stale or never written slots are skipped).
+        """
+        runs = []
+        bucket = first_bucket
+        while bucket < stop_bucket:
+            slot = bucket % self.capacity
+            n = min(stop_bucket - bucket, self.capacity - slot)  # up to the end of the ring
+            stamps = self.stamps[slot:slot + n]
+            if stamps == array("q", range(bucket, bucket + n)):
+                runs.append((slot, slot + n))
+            else:
+                start = None
+                for k in range(n):
+                    if stamps[k] == bucket + k:
+                        start = k if start is None else start
+                    elif start is not None:
+                        runs.append((slot + start, slot + k))
+                        start = None
+                if start is not None:
+                    runs.append((slot + start, slot + n))
+            bucket += n
+        return runs
+
+    def _aggregate_array(self, columns: Sequence[int], first_bucket: int, bins: int, per_bin: int) -> Dict[str, list]:
+        # Per run of slots, each field is one strided slice reduced by min/max/sum in C;
+        # empty buckets hold the neutral inf/-inf/0, so they need no masking
+        out = {name: [] for name in AGGREGATES}
+        width = self.width
+        for b in range(bins):
+            start = first_bucket + b * per_bin
+            runs = self._runs(start, start + per_bin)
+            row_min, row_max, row_avg, row_last = [], [], [], []
+            for column in columns:
+                lo_v, hi_v, total, count, last = math.inf, -math.inf, 0.0, 0.0, math.nan
+                for first, stop in runs:
+                    lo, hi = first * width + column, stop * width
+                    counts = self.counts[lo:hi:width]
+                    n = sum(counts)
+                    if not n:
+                        continue
+                    lo_v = min(lo_v, min(self.mins[lo:hi:width]))
+                    hi_v = max(hi_v, max(self.maxs[lo:hi:width]))
+                    total += sum(self.sums[lo:hi:width])
+                    count += n
+                    k = len(counts) - 1
+                    while not counts[k]:
+                        k -= 1
+                    last = self.lasts[lo + k * width]
+                row_min.append(lo_v)
+                row_max.append(hi_v)
+                row_avg.append(total / count if count else math.nan)
+                row_last.append(last)
+            out["min"].append(row_min)
+            out["max"].append(row_max)
+            out["avg"].append(row_avg)
+            out["last"].append(row_last)
+        return out
+
+    def _aggregate_numpy(self, columns: Sequence[int], first_bucket: int, bins: int, per_bin: int) -> Dict[str, list]:
+        buckets = np.arange(first_bucket, first_bucket + bins * per_bin, dtype=np.int64)
+        slots = buckets % self.capacity
+        valid = (self.stamps[slots] == buckets)[:, None]
+        cols = np.asarray(columns, dtype=np.int64)
+        shape = (bins, per_bin, len(columns))
+
+        def gather(values, empty):
+            grid = values.reshape(self.capacity, self.width)[slots][:, cols]
+            return np.where(valid, grid, empty).reshape(shape)
+
+        counts = gather(self.counts, 0.0).sum(axis=1)
+        sums = gather(self.sums, 0.0).sum(axis=1)
+        lasts = gather(self.lasts, np.nan)
+        present = ~np.isnan(lasts)
+        newest = per_bin - 1 - np.argmax(present[:, ::-1, :], axis=1)
+        last = np.take_along_axis(lasts, newest[:, None, :], axis=1)[:, 0, :]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = np.where(counts > 0, sums / counts, np.nan)
+        return {
+            "min": gather(self.mins, np.inf).min(axis=1).tolist(),
+            "max": gather(self.maxs, -np.inf).max(axis=1).tolist(),
+            "avg": avg.tolist(),
+            "last": np.where(present.any(axis=1), last, np.nan).tolist(),
+        }
+
+
+class MetricsHistory:
+    """
+    Fixed-memory history of the numeric $SYS metrics.
+
+    Every sample goes into each tier (by default 1 s for an hour, 1 min for two days,
+    1 h for a month), keeping min/max/sum/count/last per bucket and field, so any
+    range can be answered from the coarsest tier that still resolves the requested
+    step. Memory is allocated once, up front. The stdlib array backend is what the
+    deployed API runs (NumPy is not a dependency); NumPy is used when installed (or
+    forced with `numpy`) and returns the same aggregates (poetry run test-history).
+    """
+
+    def __init__(self, fields: Sequence[str], tiers: Dict[int, int], max_points: int = 1000,
+                 numpy: bool | None = None):
+        self.fields = list(fields)
+        self.columns = {name: i for i, name in enumerate(self.fields)}
+        self.numpy = np is not None if numpy is None else numpy and np is not None
+        self.tiers = [_Tier(step, capacity, len(self.fields), self.numpy) for step, capacity in sorted(tiers.items())]
+        self.max_points = max_points
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.started_at = time.time()  # nothing older than this is in memory
+
+    @property
+    def backend(self) -> str:
+        return "numpy" if self.numpy else "array"
+
+    def record(self, field: str, value: float, ts: float | None = None) -> None:
+        column = self.columns.get(field)
+        if column is None:
+            return
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for tier in self.tiers:
+                tier.add(column, float(value), ts)
+            self.samples += 1
+
+    def _pick(self, start: float, step: int) -> Tuple[_Tier, int]:
+        # The coarsest tier no coarser than `step` that still reaches back to `start`;
+        # when none does, the finest tier that does (ranges older than every tier's span fall on the last).
+        now = time.time()
+        covering = [t for t in self.tiers if now - t.span - t.step <= start] or self.tiers[-1:]
+        fitting = [t for t in covering if t.step <= step]
+        tier = fitting[-1] if fitting else covering[0]
+        step = max(tier.step, math.ceil(step / tier.step) * tier.step)
+        return tier, step
+
+    def query(self, fields: Sequence[str], start: float, end: float, step: int | None = None) -> dict:
+        """Series of (min, max, avg, last) per `step`-second bin over [start, end]."""
+        unknown = [f for f in fields if f not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        if end <= start:
+            raise ValueError("'from' must be before 'to'.")
+        span = end - start
+        step = max(int(step or 0), math.ceil(span / self.max_points), 1)
+        tier, step = self._pick(start, step)
+        first_bin, last_bin = int(start // step), int(end // step)
+        bins = last_bin - first_bin + 1
+        per_bin = step // tier.step
+        columns = [self.columns[f] for f in fields]
+        with self._lock:
+            data = tier.aggregate(columns, first_bin * per_bin, bins, per_bin)
+        series = {
+            field: {name: [_clean(row[j]) for row in data[name]] for name in AGGREGATES}
+            for j, field in enumerate(fields)
+        }
+        return {
+            "start": first_bin * step,
+            "end": (last_bin + 1) * step,
+            "step": step,
+            "tier_step": tier.step,
+            "timestamps": [(first_bin + b) * step for b in range(bins)],
+            "series": series,
+        }
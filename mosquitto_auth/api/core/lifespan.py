@@ -4,11 +4,18 @@ import asyncio
 from datetime import datetime, timezone
 
 from mosquitto_auth.api.services.mqtt_monitor import start_mqtt_monitor
-from mosquitto_auth.api.core.state import broker_state, BrokerAvailability
+from mosquitto_auth.ca.key_pool import key_pool
+from mosquitto_auth.ca.renewal import renewal_scheduler
+from mosquitto_auth.ca.revocation import run_crl_refresh
+from mosquitto_auth.api.core.state import broker_state, BrokerAvailability, metrics_store
 from mosquitto_auth.api.core.config import settings
 
 monitor_task = None
 stale_detection_task = None
+key_pool_task = None
+renewal_task = None
+crl_refresh_task = None
+metrics_store_task = None
 
 async def stale_detection_loop():
     """Detecta se o Mosquitto parou de publicar no $SYS mesmo estando conectado no socket TCP."""
@@ -27,17 +34,29 @@ async def stale_detection_loop():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global monitor_task, stale_detection_task
+    global monitor_task, stale_detection_task, key_pool_task, renewal_task, crl_refresh_task, metrics_store_task
     
     # Startup Events
     monitor_task = asyncio.create_task(start_mqtt_monitor())
     stale_detection_task = asyncio.create_task(stale_detection_loop())
+    key_pool_task = asyncio.create_task(key_pool.run())
+    if settings.CERT_RENEWAL_ENABLED:
+        renewal_task = asyncio.create_task(renewal_scheduler.run())
+    crl_refresh_task = asyncio.create_task(run_crl_refresh())
+    if metrics_store:
+        metrics_store_task = asyncio.create_task(metrics_store.run())
     
     yield
     
     # Shutdown Events (Graceful)
     if stale_detection_task:
         stale_detection_task.cancel()
+    if key_pool_task:
+        key_pool_task.cancel()
+    if renewal_task:
+        renewal_task.cancel()
+    if crl_refresh_task:
+        crl_refresh_task.cancel()
     if monitor_task:
         monitor_task.cancel()
         try:
@@ -45,3 +64,10 @@ async def lifespan(app: FastAPI):
             await asyncio.wait_for(monitor_task, timeout=2.0)
         except (asyncio.CancelledError, asyncio.TimeoutError):
             pass
+    if metrics_store_task:
+        # Cancelar dispara o flush final das amostras ainda em memória
+        metrics_store_task.cancel()
+        try:
+            await asyncio.wait_for(metrics_store_task, timeout=5.0)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            pass
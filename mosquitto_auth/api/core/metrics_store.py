@@ -0,0 +1,363 @@
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+from mosquitto_auth.lib.fs import try_file_lock
+
+RAW_STEP = 1
+# Each row packs every field of one bucket into a single blob of float64s, so a sample
+# second costs one row and rows arrive in primary-key (time) order: appends, no B-tree churn.
+#   samples_1:        last value per field (NaN = no sample that second)
+#   samples_60/3600:  min[], max[], sum[], count[], last[] per field
+ROLLUP_PARTS = 5
+
+
+def _table(step: int) -> str:
+    return f"samples_{int(step)}"
+
+
+def _unpack(blob: bytes, parts: int, width: int) -> List[array]:
+    """Split a row blob into `parts` arrays of `width` values; fields added after it was written read as NaN."""
+    values = array("d")
+    values.frombytes(blob)
+    stored = len(values) // parts
+    out = []
+    for p in range(parts):
+        column = values[p * stored:(p + 1) * stored]
+        if stored < width:
+            column.extend([math.nan] * (width - stored))
+        out.append(column)
+    return out
+
+
+class _Bins:
+    """min/max/sum/count/last accumulators for `bins` x `width` values."""
+
+    def __init__(self, bins: int, width: int):
+        self.mins = [[math.inf] * width for _ in range(bins)]
+        self.maxs = [[-math.inf] * width for _ in range(bins)]
+        self.sums = [[0.0] * width for _ in range(bins)]
+        self.counts = [[0.0] * width for _ in range(bins)]
+        self.lasts = [[math.nan] * width for _ in range(bins)]
+
+    def add_raw(self, b: int, columns: Sequence[int], values: array) -> None:
+        for j, column in enumerate(columns):
+            value = values[column]
+            if math.isnan(value):
+                continue
+            self._merge(b, j, value, value, value, 1.0, value)
+
+    def add_rollup(self, b: int, columns: Sequence[int], parts: List[array]) -> None:
+        mins, maxs, sums, counts, lasts = parts
+        for j, column in enumerate(columns):
+            if counts[column] > 0:
+                self._merge(b, j, mins[column], maxs[column], sums[column], counts[column], lasts[column])
+
+    def _merge(self, b, j, lo, hi, total, count, last) -> None:
+        if lo < self.mins[b][j]:
+            self.mins[b][j] = lo
+        if hi > self.maxs[b][j]:
+            self.maxs[b][j] = hi
+        self.sums[b][j] += total
+        self.counts[b][j] += count
+        self.lasts[b][j] = last
+
+    def pack(self, b: int) -> bytes:
+        return array("d", [*self.mins[b], *self.maxs[b], *self.sums[b], *self.counts[b], *self.lasts[b]]).tobytes()
+
+
+class MetricsStore:
+    """
+    On-disk $SYS history in SQLite (WAL), surviving API restarts.
+
+    Samples are buffered in memory and written once every `flush_interval` seconds, one
+    row per completed second, in a single transaction. A background pass rolls seconds
+    up into minutes and minutes into hours, then drops rows older than each table's
+    retention. Queries run on a separate read connection with mmap enabled.
+
+    With several API workers, only one of them writes: run() elects it with a
+    non-blocking lock on `<path>.lock` and the others keep retrying. Workers that are not
+    the writer drop their samples (record is a no-op) and only answer queries.
+    """
+
+    def __init__(self, path: Path, fields: Sequence[str], retention_days: Dict[int, float],
+                 flush_interval: float = 10.0, rollup_interval: float = 300.0, mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.retention = {int(step): days * 86400 for step, days in sorted(retention_days.items())}
+        if RAW_STEP not in self.retention:
+            raise ValueError("METRICS_RETENTION_DAYS must include the 1 second table.")
+        self.steps = list(self.retention)
+        self.flush_interval = flush_interval
+        self.rollup_interval = rollup_interval
+        self.mmap_bytes = mmap_bytes
+        self._fields = list(fields)
+        self._known = set(self._fields)
+        self._columns: Dict[str, int] = {}
+        self._conn: sqlite3.Connection | None = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._pending: Dict[int, Dict[str, float]] = {}  # second -> {field: last value}
+        self._writer_fd: int | None = None
+        self.rows_written = 0
+        self.flushes = 0
+
+    @property
+    def fields(self) -> List[str]:
+        return self._fields
+
+    @property
+    def writer(self) -> bool:
+        return self._writer_fd is not None
+
+    def elect(self) -> bool:
+        """Become the writer if no other process is; True if this process is the writer."""
+        if self._writer_fd is None:
+            self._writer_fd = try_file_lock(self.path)
+            if self._writer_fd is not None:
+                print(f"🗄️ Metrics store writer: PID {os.getpid()}")
+        return self._writer_fd is not None
+
+    def resign(self) -> None:
+        """Release the writer lock, so another worker takes over."""
+        if self._writer_fd is not None:
+            os.close(self._writer_fd)
+            self._writer_fd = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Writer connection; creates the schema and settles the column order on first use."""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only effective on a new database
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # WAL: fsync at checkpoints, never loses committed order
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            for step in self.steps:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {_table(step)} (ts INTEGER PRIMARY KEY, data BLOB NOT NULL)")
+            # Blobs are positional: keep the stored order and append fields that are new
+            row = conn.execute("SELECT value FROM meta WHERE key = 'fields'").fetchone()
+            stored = json.loads(row[0]) if row else []
+            fields = stored + [f for f in self._fields if f not in stored]
+            if fields != stored and self.writer:
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('fields', ?)", (json.dumps(fields),))
+            self._fields = fields
+            self._columns = {name: i for i, name in enumerate(fields)}
+            self._conn = conn
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._connect()
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, conn: sqlite3.Connection, key: str) -> int | None:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else None
+
+    def record(self, field: str, value: float, ts: float | None = None) -> None:
+        """Buffer a sample; called from the monitor for every numeric $SYS message (writer only)."""
+        if self._writer_fd is None:
+            return
+        ts = time.time() if ts is None else ts
+        if field in self._known:
+            self._pending.setdefault(int(ts), {})[field] = float(value)
+
+    def flush(self, now: float | None = None, everything: bool = False) -> int:
+        """Write every completed second (all of them with `everything`) in one transaction."""
+        current = int(time.time() if now is None else now)
+        if not self.writer:
+            return 0
+        with self._write_lock:
+            conn = self._connect()
+            ready = sorted(s for s in list(self._pending) if everything or s < current)
+            if not ready:
+                return 0
+            width = len(self._fields)
+            rows = []
+            for second in ready:
+                values = array("d", [math.nan]) * width
+                for field, value in self._pending.pop(second).items():
+                    values[self._columns[field]] = value
+                rows.append((second, values.tobytes()))
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(f"INSERT OR REPLACE INTO {_table(RAW_STEP)} VALUES (?, ?)", rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.rows_written += len(rows)
+            self.flushes += 1
+            return len(rows)
+
+    def _rollup(self, conn: sqlite3.Connection, source: int, target: int, until: int) -> int:
+        """Aggregate `source` rows into complete `target` buckets before `until`; returns the new watermark."""
+        key = f"rolled_{target}"
+        start = self._meta(conn, key)
+        if start is None:
+            first = conn.execute(f"SELECT MIN(ts) FROM {_table(source)}").fetchone()[0]
+            if first is None:
+                return until // target * target
+            start = first // target * target
+        end = until // target * target
+        if end <= start:
+            return start
+        width = len(self._fields)
+        columns = range(width)
+        buckets: Dict[int, _Bins] = {}
+        for ts, blob in conn.execute(
+            f"SELECT ts, data FROM {_table(source)} WHERE ts >= ? AND ts < ? ORDER BY ts", (start, end)
+        ):
+            bucket = ts // target * target
+            bins = buckets.get(bucket)
+            if bins is None:
+                bins = buckets[bucket] = _Bins(1, width)
+            if source == RAW_STEP:
+                bins.add_raw(0, columns, _unpack(blob, 1, width)[0])
+            else:
+                bins.add_rollup(0, columns, _unpack(blob, ROLLUP_PARTS, width))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {_table(target)} VALUES (?, ?)",
+            [(bucket, bins.pack(0)) for bucket, bins in buckets.items()]
+        )
+        conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(end)))
+        return end
+
+    def compact(self, now: float | None = None) -> dict:
+        """Roll up completed buckets, then apply retention (never dropping rows not yet rolled up)."""
+        now = time.time() if now is None else now
+        if not self.writer:
+            return {"rolled_up_to": {}, "deleted": 0}
+        with self._write_lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Raw rows up to the last flushed second are final
+                until = int(now) - int(self.flush_interval) - 1
+                watermarks = {}
+                for source, target in zip(self.steps, self.steps[1:]):
+                    until = watermarks[target] = self._rollup(conn, source, target, until)
+                deleted = 0
+                for i, step in enumerate(self.steps):
+                    cutoff = int(now - self.retention[step])
+                    if i + 1 < len(self.steps):
+                        cutoff = min(cutoff, watermarks[self.steps[i + 1]])
+                    deleted += conn.execute(f"DELETE FROM {_table(step)} WHERE ts < ?", (cutoff,)).rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if deleted:
+                conn.execute("PRAGMA incremental_vacuum")
+            return {"rolled_up_to": watermarks, "deleted": deleted}
+
+    def query(self, fields: Sequence[str], start: float, end: float, step: int | None = None, max_points: int = 1000) -> dict:
+        """Same contract as MetricsHistory.query, answered from disk."""
+        conn = self._reader()
+        columns = [self._columns.get(f) for f in fields]
+        unknown = [f for f, c in zip(fields, columns) if c is None]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}. Available: {', '.join(self._fields)}")
+        if end <= start:
+            raise ValueError("'from' must be before 'to'.")
+        step = max(int(step or 0), math.ceil((end - start) / max_points), 1)
+        table_step, step = self._pick(start, step)
+        first_bin, last_bin = int(start // step), int(end // step)
+        bins = _Bins(last_bin - first_bin + 1, len(columns))
+        width = len(self._fields)
+        lower, upper = first_bin * step, (last_bin + 1) * step
+        # A rolled-up table only holds buckets before its watermark; the rest of the range is
+        # still in the finer tables (retention never drops rows that were not rolled up)
+        conn.execute("BEGIN")  # one snapshot for watermarks and rows
+        try:
+            for table in reversed(self.steps[:self.steps.index(table_step) + 1]):
+                rolled = self._meta(conn, f"rolled_{table}") if table != RAW_STEP else None
+                until = upper if table == RAW_STEP else min(upper, max(lower, rolled or lower))
+                for ts, blob in conn.execute(
+                    f"SELECT ts, data FROM {_table(table)} WHERE ts >= ? AND ts < ? ORDER BY ts", (lower, until)
+                ):
+                    b = ts // step - first_bin
+                    if table == RAW_STEP:
+                        bins.add_raw(b, columns, _unpack(blob, 1, width)[0])
+                    else:
+                        bins.add_rollup(b, columns, _unpack(blob, ROLLUP_PARTS, width))
+                lower = max(lower, until)
+        finally:
+            conn.execute("COMMIT")
+        clean = lambda v: None if math.isnan(v) or math.isinf(v) else v
+        series = {}
+        for j, field in enumerate(fields):
+            series[field] = {
+                "min": [clean(row[j]) for row in bins.mins],
+                "max": [clean(row[j]) for row in bins.maxs],
+                "avg": [s[j] / c[j] if c[j] else None for s, c in zip(bins.sums, bins.counts)],
+                "last": [clean(row[j]) for row in bins.lasts],
+            }
+        return {
+            "start": first_bin * step,
+            "end": (last_bin + 1) * step,
+            "step": step,
+            "tier_step": table_step,
+            "timestamps": [(first_bin + b) * step for b in range(last_bin - first_bin + 1)],
+            "series": series,
+        }
+
+    def _pick(self, start: float, step: int) -> Tuple[int, int]:
+        # Coarsest table no coarser than `step` whose retention reaches `start`, as in MetricsHistory
+        now = time.time()
+        covering = [s for s in self.steps if now - self.retention[s] - s <= start] or self.steps[-1:]
+        fitting = [s for s in covering if s <= step]
+        table_step = fitting[-1] if fitting else covering[0]
+        return table_step, max(table_step, math.ceil(step / table_step) * table_step)
+
+    def stats(self) -> dict:
+        conn = self._reader()
+        return {
+            "path": str(self.path),
+            "writer": self.writer,
+            "size_bytes": sum(p.stat().st_size for p in self.path.parent.glob(f"{self.path.name}*")),
+            "rows": {step: conn.execute(f"SELECT COUNT(*) FROM {_table(step)}").fetchone()[0] for step in self.steps},
+            "pending_seconds": len(self._pending),
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+        }
+
+    async def run(self) -> None:
+        """
+        Flush every `flush_interval` and compact every `rollup_interval` while this process
+        is the writer; otherwise retry the election at the same pace. Runs until cancelled.
+        """
+        self.elect()
+        await asyncio.to_thread(self._connect)
+        role = "writer" if self.writer else "reader"
+        print(f"🗄️ Metrics store: {self.path} ({role}, flush {self.flush_interval}s, rollup {self.rollup_interval}s)")
+        next_compact = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                if not self.writer and not self.elect():
+                    continue
+                try:
+                    await asyncio.to_thread(self.flush)
+                    if time.monotonic() >= next_compact:
+                        await asyncio.to_thread(self.compact)
+                        next_compact = time.monotonic() + self.rollup_interval
+                except Exception as e:
+                    print(f"❌ Metrics store error: {e}")
+        finally:
+            # Shutdown: keep what is still buffered
+            try:
+                self.flush(everything=True)
+            except Exception as e:
+                print(f"❌ Metrics store final flush failed: {e}")
+            self.resign()
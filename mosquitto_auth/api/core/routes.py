@@ -1,14 +1,22 @@
-from mosquitto_auth.api.routers import user, ca, certificate, logs, health, monitor, config
+from mosquitto_auth.api.routers import user, ca, certificate, logs, health, monitor, config, auth, acl
+from mosquitto_auth.api.core.config import settings
 from mosquitto_auth.api.core.dependencies import ApiKeyDep, AuthWsDep
 
 
 def register_routes(app):
   app.include_router(user.router, prefix="/users", dependencies=[ApiKeyDep], tags=["Mosquitto Users 🦟"])
   app.include_router(certificate.router, prefix="/certificate", dependencies=[ApiKeyDep], tags=["Certificate 📑"])
+  app.include_router(acl.router, prefix="/acl", dependencies=[ApiKeyDep], tags=["ACL 🚦"])
   app.include_router(ca.router, prefix="/ca", dependencies=[ApiKeyDep], tags=["CA 📑"])
   app.include_router(logs.router, prefix="/logs", dependencies=[ApiKeyDep], tags=["Logs 📑"])
   app.include_router(logs.ws_router, prefix="/logs", dependencies=[AuthWsDep], tags=["Logs WebSocket"])
   app.include_router(health.router, prefix="/health", tags=["System Health 🩺"])
   app.include_router(config.router, prefix="/config", dependencies=[ApiKeyDep], tags=["Configurações ⚙️"])
   app.include_router(monitor.router, prefix="/monitor", dependencies=[ApiKeyDep], tags=["Broker Metrics 📊"])
-  app.include_router(monitor.ws_router, prefix="/monitor", dependencies=[AuthWsDep], tags=["Broker Metrics WS"])
\ No newline at end of file
+  app.include_router(monitor.ws_router, prefix="/monitor", dependencies=[AuthWsDep], tags=["Broker Metrics WS"])
+  if settings.AUTH_BACKEND_ENABLED:
+    if settings.AUTH_BACKEND_TOKEN:
+      app.include_router(auth.router, prefix="/auth", tags=["Broker Auth Backend 🔑"])
+    else:
+      # Sem token, /auth/user seria um oráculo de senhas aberto para qualquer um que alcance a API
+      print("⚠️ AUTH_BACKEND_ENABLED without AUTH_BACKEND_TOKEN: /auth routes not mounted")
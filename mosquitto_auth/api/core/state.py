@@ -1,6 +1,9 @@
 import asyncio
 from datetime import datetime
 from mosquitto_auth.api.models.monitor import BrokerAvailability, ContainerAvailability, BrokerMetrics
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.api.core.history import MetricsHistory
+from mosquitto_auth.api.core.metrics_store import MetricsStore
 
 class Dispatcher:
     def __init__(self):
@@ -77,7 +80,16 @@ TOPIC_MAP = {
     "$SYS/broker/load/bytes/sent/1min": ("bytes_sent_per_min", float), # (( BYTES / MIN )) - Taxa média de bytes enviados por minuto (1,5,15min).
     "$SYS/broker/load/sockets/1min": ("sockets_connected_per_min", float), # (( SOCKETS / MIN )) - Taxa média de soquetes conectados por minuto (1,5,15min).
     "$SYS/broker/heap/current": ("heap_current_bytes", int), # (( BYTES )) - Quantidade atual de memória heap usada pelo Mosquitto.
-    "$SYS/broker/heap/maximum": ("heap_maximum_bytes", int), # (( BYTES )) - Pico (valor máximo) de memória heap usada pelo Mosquitto.
+    "$SYS/broker/heap/maximum": ("heap_max_bytes", int), # (( BYTES )) - Pico (valor máximo) de memória heap usada pelo Mosquitto.
     "$SYS/broker/packet/out/count": ("packets_queue_pending", int), # (( PACKETS )) - Número atual de pacotes pendentes na fila de saída (todos os clientes).
     "$SYS/broker/packet/out/bytes": ("bytes_queue_pending", int), # (( BYTES )) - Total de bytes nos pacotes pendentes na fila de saída.
 }
+
+# Numeric metrics get a fixed-memory history (GET /monitor/history)
+HISTORY_FIELDS = [field for field, cast_fn in TOPIC_MAP.values() if cast_fn in (int, float)]
+metrics_history = MetricsHistory(HISTORY_FIELDS, settings.METRICS_HISTORY_TIERS, settings.METRICS_HISTORY_MAX_POINTS)
+# ...and, when enabled, a SQLite store that survives restarts (ranges older than this process)
+metrics_store = MetricsStore(
+    settings.METRICS_DB_PATH, HISTORY_FIELDS, settings.METRICS_RETENTION_DAYS,
+    settings.METRICS_FLUSH_SECONDS, settings.METRICS_ROLLUP_SECONDS, settings.METRICS_MMAP_BYTES
+) if settings.METRICS_STORE_ENABLED else None
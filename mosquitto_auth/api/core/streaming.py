@@ -0,0 +1,63 @@
+import asyncio
+import tempfile
+from starlette.responses import StreamingResponse
+
+REPORT_SPOOL_SIZE = 1024 * 1024  # reports above this size spill to disk
+REPORT_READ_SIZE = 64 * 1024
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for endpoints that keep reading the request body while the
+    response streams. StreamingResponse normally listens for the disconnect on the
+    same receive channel, which would steal body chunks from the reader; here the
+    body reader sees a disconnect itself (ClientDisconnect).
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class ImportReport:
+    """
+    Report written while a request body is applied and read back by the response at
+    the same time. It spills to a temporary file, so a client that only reads the
+    response after uploading everything never stalls the import, and memory stays bounded.
+    """
+
+    def __init__(self, spool_size: int = REPORT_SPOOL_SIZE):
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_size, mode="w+b")
+        self._written = 0
+        self._read = 0
+        self._done = False
+        self._changed = asyncio.Event()
+
+    def write(self, data: bytes) -> None:
+        if self._file.closed:
+            return
+        self._file.seek(self._written)
+        self._file.write(data)
+        self._written += len(data)
+        self._changed.set()
+
+    def finish(self) -> None:
+        self._done = True
+        self._changed.set()
+
+    async def __aiter__(self):
+        try:
+            while True:
+                if self._read < self._written:
+                    self._file.seek(self._read)
+                    chunk = self._file.read(min(REPORT_READ_SIZE, self._written - self._read))
+                    self._read += len(chunk)
+                    yield chunk
+                elif self._done:
+                    return
+                else:
+                    self._changed.clear()
+                    await self._changed.wait()
+        finally:
+            self._file.close()
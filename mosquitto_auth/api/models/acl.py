@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+AclAccess = Literal["read", "write", "readwrite", "deny"]
+
+class AclRule(BaseModel):
+    username: Optional[str] = Field(default=None, description="Omit for a pattern rule applied to every user (%u / %c allowed)")
+    topic: str
+    access: AclAccess = "readwrite"
+
+class AclRuleList(BaseModel):
+    rules: List[AclRule]
+
+class AclCheck(BaseModel):
+    username: str
+    clientid: Optional[str] = None
+    topic: str
+    acc: int = Field(default=1, ge=1, le=4, description="1 read, 2 write, 3 readwrite, 4 subscribe")
+
+class AclCheckBatch(BaseModel):
+    checks: List[AclCheck]
+
+class AclCheckResult(BaseModel):
+    results: List[bool]
+    allowed: int
+    denied: int
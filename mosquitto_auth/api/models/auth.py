@@ -1,5 +1,28 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class WsAuthPayload(BaseModel):
     type: str
     api_key: str
+
+class AuthUserRequest(BaseModel):
+    username: str
+    password: str
+    clientid: Optional[str] = None
+
+class AuthSuperuserRequest(BaseModel):
+    username: str
+
+class AuthAclRequest(BaseModel):
+    username: str
+    clientid: Optional[str] = None
+    topic: str
+    acc: int  # 1 read, 2 write, 3 readwrite, 4 subscribe
+
+class AuthCacheStats(BaseModel):
+    size: int
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
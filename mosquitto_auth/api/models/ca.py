@@ -1,14 +1,47 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from mosquitto_auth.lib.x509 import KeyType, DEFAULT_CA_KEY_TYPE
 
 class CreateCA(BaseModel):
   common_name: Optional[str] = "ROOT_BROKER_CA"
   days: Optional[int] = 3650
+  key_type: KeyType = DEFAULT_CA_KEY_TYPE
 
 
 class CACreateResponse(BaseModel):
   ca_key: Optional[str] 
   ca_crt: Optional[str]
-  ca_srl: Optional[str]
+  ca_srl: Optional[str]  # kept for compatibility; serials are allocated by the CA database (ca_index)
+  ca_index: Optional[str] = None
+  crl: Optional[str] = None
   common_name: Optional[str]
   valid_days: Optional[int]
+  key_type: Optional[str] = None
+
+
+class IssuedCertificate(BaseModel):
+  serial: str
+  cn: str
+  not_before: str
+  not_after: str
+  fingerprint: str
+  key_type: Optional[str] = None
+  profile: Optional[str] = None
+  issued_at: Optional[str] = None
+  revoked_at: Optional[str] = None
+  revocation_reason: Optional[str] = None
+
+
+class IssuedCertificateList(BaseModel):
+  total: int
+  certificates: List[IssuedCertificate]
+
+
+class CRLInfo(BaseModel):
+  crl_number: Optional[int] = None
+  base_crl_number: Optional[int] = None
+  base_revocations: Optional[int] = None
+  revoked: Optional[int] = None
+  published_at: Optional[str] = None
+  next_update: Optional[str] = None
+  delta_entries: Optional[int] = None
@@ -1,12 +1,88 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 from mosquitto_auth.lib.validators import UsernameStr
-from typing import Optional
+from typing import Literal, Optional
 from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.lib.x509 import KeyType, DEFAULT_KEY_TYPE
 
 
 class CertificateCreate(BaseModel):
     username: UsernameStr
     days: Optional[int] = 365 
+    key_type: KeyType = DEFAULT_KEY_TYPE
+
+class CertificateBulkCreate(BaseModel):
+    certificates: list[CertificateCreate] = Field(min_length=1, max_length=10_000)
+
+class CertificateBulkResult(BaseModel):
+    username: str
+    status: str
+    serial: str | None = None
+    error: str | None = None
+
+class CertificateBulkResponse(BaseModel):
+    issued: int
+    failed: int
+    results: list[CertificateBulkResult]
+
+class CertificateCSRSign(BaseModel):
+    csr: str = Field(description="PEM certificate signing request; its CN becomes the username")
+    days: Optional[int] = 365
+    username: Optional[UsernameStr] = Field(default=None, description="When given, the CSR CN must match it")
+
+class CertificateCSRResponse(BaseModel):
+    username: str
+    serial: str
+    not_after: datetime
+    certificate: str
+
+class CertificateCSRItem(BaseModel):
+    csr: str
+    days: Optional[int] = 365
+
+class CertificateCSRBulkSign(BaseModel):
+    csrs: list[CertificateCSRItem] = Field(min_length=1, max_length=10_000)
+
+class CertificateCSRBulkResult(BaseModel):
+    index: int
+    username: str | None = None
+    status: str
+    serial: str | None = None
+    certificate: str | None = None
+    error: str | None = None
+
+class CertificateCSRBulkResponse(BaseModel):
+    issued: int
+    failed: int
+    results: list[CertificateCSRBulkResult]
+
+RevocationReason = Literal[
+    "unspecified", "keyCompromise", "cACompromise", "affiliationChanged", "superseded",
+    "cessationOfOperation", "certificateHold", "privilegeWithdrawn", "aACompromise"
+]
+
+class CertificateRevokeRequest(BaseModel):
+    serials: list[str] = Field(default=[], max_length=100_000, description="Hex serials")
+    usernames: list[str] = Field(default=[], max_length=100_000, description="Revoke every valid certificate of these users")
+    reason: RevocationReason = "unspecified"
+
+class CertificateRevokeResult(BaseModel):
+    serial: str
+    username: str | None = None
+    status: str
+    revoked_at: str | None = None
+    reason: str | None = None
+    crl_number: int | None = None
+    error: str | None = None
+
+class CertificateRevokeResponse(BaseModel):
+    revoked: int
+    already_revoked: int
+    failed: int
+    crl_number: int | None = None
+    results: list[CertificateRevokeResult]
+    reload_generation: Optional[int] = None
+    reload_applied: Optional[bool] = None
 
 class CertificateResponse(BaseModel):
     username: str
@@ -15,20 +91,103 @@ class CertificateResponse(BaseModel):
     cert_path: str | None = None
     key_path: str | None = None
 
+class CertificateInfo(BaseModel):
+    name: str
+    kind: str
+    path: str
+    cn: Optional[str] = None
+    serial: Optional[str] = None
+    not_before: Optional[datetime] = None
+    not_after: Optional[datetime] = None
+    key_type: Optional[str] = None
+    fingerprint: Optional[str] = None
+    ca_verified: Optional[bool] = None
+    error: Optional[str] = None
+
+class CertificateList(BaseModel):
+    certificates: list[str]
+    items: list[CertificateInfo]
+    total: int
+    next_cursor: Optional[str] = None
+
 class CertificateVerificationResponse(BaseModel):
     valid_from: Optional[str] = None
     valid_until: Optional[str] = None
     signature_status: Optional[str] = None
     error_description: str | None = None
 
+class CertificateVerifyError(BaseModel):
+    code: str
+    tag: str
+    description: str
+    detail: Optional[str] = None
+
+class CertificateVerifyResult(BaseModel):
+    username: str
+    status: str
+    cn: Optional[str] = None
+    serial: Optional[str] = None
+    valid_from: Optional[datetime] = None
+    valid_until: Optional[datetime] = None
+    ca_verified: bool
+    time_valid: bool
+    key_usage_valid: bool
+    extended_key_usage_valid: bool
+    san: list[str] = []
+    san_valid: bool
+    errors: list[CertificateVerifyError] = []
+
+class CertificateVerifyBatchRequest(BaseModel):
+    usernames: Optional[list[str]] = Field(default=None, max_length=1_000_000, description="Omit to verify every client certificate")
+    only_failed: bool = False
+
+class CertificateVerifyBatchResponse(BaseModel):
+    checked: int
+    ok: int
+    failed: int
+    results: list[CertificateVerifyResult]
+
+class RenewalNext(BaseModel):
+    cn: str
+    serial: str
+    not_after: datetime
+    renew_at: datetime
+
+class RenewalResult(BaseModel):
+    cn: str
+    serial: str
+    not_after: datetime
+    status: str
+    new_serial: Optional[str] = None
+    error: Optional[str] = None
+    at: datetime
+
+class RenewalStats(BaseModel):
+    active: bool
+    window_days: float
+    rate_per_minute: float
+    workers: int
+    tracked: int
+    next_renewal: Optional[RenewalNext] = None
+    queued: int
+    in_progress: int
+    renewed: int
+    skipped: int
+    failed: int
+    last_cycle_at: Optional[datetime] = None
+    recent: list[RenewalResult]
+
 class BrokerCertificateRequest(BaseModel):
     cn: Optional[str] = None
     days: Optional[int] = 365
+    key_type: KeyType = DEFAULT_KEY_TYPE
 
 class BrokerCertificateResponse(BaseModel):
     username: str
     status: str
     message: str
+    reload_generation: Optional[int] = None
+    reload_applied: Optional[bool] = None
 
 class BrokerCertificateVerificationResponse(BaseModel):
     valid_until: Optional[str] = None
@@ -40,3 +199,35 @@ class BrokerCertificateVerificationResponse(BaseModel):
 
 class BrokerCertificateDeleteResponse(BaseModel):
     message: str
+
+class BrokerCertificateVersion(BaseModel):
+    version: str
+    current: bool
+    serial: Optional[str] = None
+    not_after: Optional[datetime] = None
+    key_type: Optional[str] = None
+
+class BrokerCertificateRollback(BaseModel):
+    version: Optional[str] = None  # default: the version before the active one
+
+class BrokerCertificateRotation(BaseModel):
+    version: str
+    previous: Optional[str] = None
+    reload_generation: Optional[int] = None
+    reload_applied: Optional[bool] = None
+
+class KeyPoolTypeStats(BaseModel):
+    depth: int
+    target: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    generated: int
+    refill_rate_per_sec: float
+    last_refill_at: Optional[float] = None
+
+class KeyPoolStats(BaseModel):
+    running: bool
+    workers: int
+    uptime_seconds: float
+    types: dict[str, KeyPoolTypeStats]
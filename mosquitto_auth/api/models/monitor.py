@@ -57,3 +57,36 @@ class BrokerStateResponse(BaseModel):
     last_ws_broadcast_at: datetime | None = None
     
     metrics: BrokerMetrics
+
+
+class ReloadMetrics(BaseModel):
+    """Written by the reload daemon in the broker container (shared log volume)."""
+    backend: str | None = None
+    files: list[str] = []
+    generation: int | None = None
+    reloads: int = 0
+    requests: int = 0
+    failed_reloads: int = 0
+    changes: int = 0
+    last_reload_at: datetime | None = None
+    last_latency_ms: float | None = None
+    avg_latency_ms: float | None = None
+    max_latency_ms: float | None = None
+    last_changed: list[str] = []
+
+
+class MetricSeries(BaseModel):
+    min: list[float | None]
+    max: list[float | None]
+    avg: list[float | None]
+    last: list[float | None]
+
+class MetricsHistoryResponse(BaseModel):
+    start: datetime
+    end: datetime
+    step: int = Field(description="Bin size in seconds")
+    tier_step: int = Field(description="Resolution of the history tier the bins were built from")
+    backend: str
+    source: str = Field(description="'memory' (ring buffer) or 'store' (SQLite, ranges older than this process)")
+    timestamps: list[datetime] = Field(description="Start of each bin")
+    series: dict[str, MetricSeries]
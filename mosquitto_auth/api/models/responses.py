@@ -9,6 +9,7 @@ class UserMessages(str, Enum):
     PASSWORD_UPDATED = "Password for user '{username}' updated successfully."
     USER_LISTED = "Users listed successfully."
     USER_INVALID = "User '{username}' is invalid."
+    USERS_RECONCILED = "Users reconciled with the desired state."
 
 class CertificateMessages(str, Enum):
     CERTIFICATE_CREATED = "Certificate for user '{username}' created successfully."
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List
+from typing import List, Optional
 from mosquitto_auth.lib.validators import UsernameStr, PasswordStr
 
 class UserCreate(BaseModel):
@@ -13,6 +13,10 @@ class UserResponse(BaseModel):
     username: str
     status: str
     message: str
+    reload_generation: Optional[int] = None  # broker reload generation that makes this change live
+    # With wait_reload: whether the SIGHUP for that generation was sent in time. The broker
+    # re-reads its files right after the signal; it does not report having finished.
+    reload_applied: Optional[bool] = None
 
 class ManyUserCreate(BaseModel):
     users: List[UserCreate]
@@ -20,6 +24,11 @@ class ManyUserCreate(BaseModel):
 
 class UserList(BaseModel):
     users: List[UserPublic]
+    next_cursor: Optional[str] = None
+
+class UserCount(BaseModel):
+    count: int
+    prefix: Optional[str] = None
 
 class UserPasswordUpdate(BaseModel):
     username: UsernameStr
@@ -28,6 +37,21 @@ class UserPasswordUpdate(BaseModel):
 class UserBulkResponse(BaseModel):
     message: str
     details: dict
+    reload_generation: Optional[int] = None
+    reload_applied: Optional[bool] = None
+
+class UserStateSync(BaseModel):
+    users: List[UserCreate]
+    prune: bool = True
+
+class UserStateResponse(BaseModel):
+    message: str
+    added: List[str]
+    updated: List[str]
+    removed: List[str]
+    unchanged: List[str]
+    reload_generation: Optional[int] = None
+    reload_applied: Optional[bool] = None
 
 class BulkUserDetails(BaseModel):
     success: List[str]
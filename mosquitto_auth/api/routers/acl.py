@@ -0,0 +1,47 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from mosquitto_auth.api.models.acl import AclRuleList, AclCheckBatch, AclCheckResult
+from mosquitto_auth.api.services.auth_backend import acl_store
+
+router = APIRouter()
+
+@router.get("", response_model=AclRuleList, summary="List ACL rules")
+async def get_acl_rules():
+    rules = await asyncio.to_thread(acl_store.rules)
+    return AclRuleList(rules=rules)
+
+@router.put("", response_model=AclRuleList, summary="Replace all ACL rules")
+async def replace_acl_rules(data: AclRuleList):
+    try:
+        rules = await asyncio.to_thread(acl_store.replace_rules, [r.model_dump() for r in data.rules])
+        return AclRuleList(rules=rules)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/rules", response_model=AclRuleList, status_code=status.HTTP_201_CREATED, summary="Add ACL rules")
+async def add_acl_rules(data: AclRuleList):
+    try:
+        rules = await asyncio.to_thread(acl_store.add_rules, [r.model_dump() for r in data.rules])
+        return AclRuleList(rules=rules)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.delete("/rules", response_model=AclRuleList, summary="Remove ACL rules")
+async def remove_acl_rules(data: AclRuleList):
+    try:
+        rules = await asyncio.to_thread(acl_store.remove_rules, [r.model_dump() for r in data.rules])
+        return AclRuleList(rules=rules)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/file", response_class=PlainTextResponse, summary="Rendered mosquitto acl_file")
+async def get_acl_file():
+    return await asyncio.to_thread(acl_store.render)
+
+@router.post("/check", response_model=AclCheckResult, summary="Evaluate many (user, topic, access) tuples")
+async def check_acl_batch(data: AclCheckBatch):
+    engine = await asyncio.to_thread(acl_store.engine)
+    results = [engine.check(c.username, c.clientid, c.topic, c.acc) for c in data.checks]
+    allowed = sum(results)
+    return AclCheckResult(results=results, allowed=allowed, denied=len(results) - allowed)
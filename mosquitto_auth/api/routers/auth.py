@@ -0,0 +1,40 @@
+import asyncio
+from fastapi import APIRouter, Response, status
+from mosquitto_auth.api.core.dependencies import ApiKeyDep, AuthBackendDep
+from mosquitto_auth.api.models.auth import AuthUserRequest, AuthSuperuserRequest, AuthAclRequest, AuthCacheStats
+from mosquitto_auth.api.services.auth_backend import (
+    check_user, check_superuser, check_acl, cached_user, rules_loaded, credential_cache
+)
+
+router = APIRouter()
+
+# mosquitto-go-auth HTTP backend, with:
+#   auth_opt_http_params_mode json
+#   auth_opt_http_response_mode status
+# and the header x-auth-backend-token: <AUTH_BACKEND_TOKEN> on every request.
+# 200 grants, 403 denies. Warm decisions (a stat() plus one SHA-256) stay on the
+# event loop; PBKDF2 checks and passwd/ACL reloads run in a thread.
+
+def _decision(allowed: bool) -> Response:
+    return Response(status_code=status.HTTP_200_OK if allowed else status.HTTP_403_FORBIDDEN)
+
+@router.post("/user", dependencies=[AuthBackendDep], summary="Authenticate an MQTT client (mosquitto-go-auth)")
+async def auth_user(data: AuthUserRequest):
+    allowed = cached_user(data.username, data.password)
+    if allowed is None:
+        allowed = await asyncio.to_thread(check_user, data.username, data.password)
+    return _decision(allowed)
+
+@router.post("/superuser", dependencies=[AuthBackendDep], summary="Superuser check (mosquitto-go-auth)")
+async def auth_superuser(data: AuthSuperuserRequest):
+    return _decision(check_superuser(data.username))
+
+@router.post("/acl", dependencies=[AuthBackendDep], summary="Topic access check (mosquitto-go-auth)")
+async def auth_acl(data: AuthAclRequest):
+    if rules_loaded():
+        return _decision(check_acl(data.username, data.clientid, data.topic, data.acc))
+    return _decision(await asyncio.to_thread(check_acl, data.username, data.clientid, data.topic, data.acc))
+
+@router.get("/stats", response_model=AuthCacheStats, dependencies=[ApiKeyDep], summary="Credential cache hit/miss counters")
+async def auth_stats():
+    return credential_cache.stats()
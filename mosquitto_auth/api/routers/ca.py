@@ -1,9 +1,16 @@
 import asyncio
-from fastapi import APIRouter, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import Response
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.ca.authority import get_certificate_authority
 from mosquitto_auth.ca.generate_ca import generate_ca
 from mosquitto_auth.ca.verify_ca import verify_certificate
 from mosquitto_auth.ca.delete_ca import delete_ca_files
-from mosquitto_auth.api.models.ca import CreateCA, CACreateResponse
+from mosquitto_auth.ca.revocation import get_crl_publisher
+from mosquitto_auth.api.models.ca import CreateCA, CACreateResponse, IssuedCertificate, IssuedCertificateList, CRLInfo
 
 router = APIRouter()
 
@@ -15,7 +22,7 @@ router = APIRouter()
 )
 async def create_ca(data: CreateCA):
   try:
-    result = await asyncio.to_thread(generate_ca, data.common_name, data.days)
+    result = await asyncio.to_thread(generate_ca, data.common_name, data.days, data.key_type)
     if result .get("status") == "ERROR":
       raise HTTPException(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -71,3 +78,84 @@ async def delete_ca():
 
   
 
+
+@router.get(
+  "/index",
+  response_model=IssuedCertificateList,
+  status_code=status.HTTP_200_OK,
+  summary="Query the CA database of issued certificates"
+)
+async def get_ca_index(
+  cn: Optional[str] = Query(default=None, description="Only certificates issued to this CN"),
+  serial: Optional[str] = Query(default=None, description="Hex serial"),
+  offset: int = Query(default=0, ge=0),
+  limit: int = Query(default=100, ge=1, le=1000),
+):
+  database = get_certificate_authority(settings.ca_cert_path, settings.ca_key_path).database
+  if serial is not None:
+    record = await asyncio.to_thread(database.get, serial)
+    records = [record] if record else []
+  elif cn is not None:
+    records = await asyncio.to_thread(database.by_cn, cn)
+  else:
+    records = await asyncio.to_thread(database.entries)
+  return IssuedCertificateList(
+    total=len(records),
+    certificates=[IssuedCertificate(**r) for r in records[offset:offset + limit]]
+  )
+
+
+def _crl_response(path, fmt: str) -> Response:
+  if not path.exists():
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="CRL not found. Generate the CA first.")
+  data = path.read_bytes()
+  if fmt == "der":
+    data = x509.load_pem_x509_crl(data).public_bytes(serialization.Encoding.DER)
+    return Response(content=data, media_type="application/pkix-crl")
+  return Response(content=data, media_type="application/x-pem-file")
+
+
+@router.get(
+  "/crl",
+  status_code=status.HTTP_200_OK,
+  summary="Download the full CRL (the file mosquitto's crlfile reads)"
+)
+async def get_crl(format: str = Query(default="pem", pattern="^(pem|der)$")):
+  return await asyncio.to_thread(_crl_response, get_crl_publisher().crl_path, format)
+
+
+@router.get(
+  "/crl/delta",
+  status_code=status.HTTP_200_OK,
+  summary="Download the delta CRL (revocations since its base CRL)"
+)
+async def get_delta_crl(format: str = Query(default="pem", pattern="^(pem|der)$")):
+  return await asyncio.to_thread(_crl_response, get_crl_publisher().delta_path, format)
+
+
+@router.get(
+  "/crl/info",
+  response_model=CRLInfo,
+  status_code=status.HTTP_200_OK,
+  summary="CRL numbers and validity"
+)
+async def get_crl_info():
+  return CRLInfo(**await asyncio.to_thread(get_crl_publisher().state))
+
+
+@router.post(
+  "/crl",
+  response_model=CRLInfo,
+  status_code=status.HTTP_200_OK,
+  summary="Rebuild and republish the CRL now"
+)
+async def publish_crl():
+  try:
+    return CRLInfo(**await asyncio.to_thread(get_crl_publisher().publish))
+  except FileNotFoundError as e:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+  except Exception as e:
+    raise HTTPException(
+      status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+      detail=f"Error publishing CRL: {e}"
+    )
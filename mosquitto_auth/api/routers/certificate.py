@@ -1,26 +1,47 @@
 import asyncio
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import FileResponse, Response
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
 import zipfile
 import io
 import shutil
 import re
 from mosquitto_auth.api.models.certificate import (
     CertificateCreate, CertificateResponse, CertificateVerificationResponse,
-    BrokerCertificateResponse, BrokerCertificateVerificationResponse, BrokerCertificateDeleteResponse, BrokerCertificateRequest
+    CertificateBulkCreate, CertificateBulkResponse, CertificateBulkResult, CertificateInfo, CertificateList,
+    CertificateVerifyBatchRequest, CertificateVerifyBatchResponse, CertificateVerifyResult,
+    CertificateRevokeRequest, CertificateRevokeResponse, CertificateRevokeResult,
+    CertificateCSRSign, CertificateCSRResponse, CertificateCSRBulkSign, CertificateCSRBulkResponse, CertificateCSRBulkResult,
+    BrokerCertificateResponse, BrokerCertificateVerificationResponse, BrokerCertificateDeleteResponse, BrokerCertificateRequest,
+    BrokerCertificateVersion, BrokerCertificateRollback, BrokerCertificateRotation,
+    KeyPoolStats, RenewalStats
 )
 from mosquitto_auth.api.core.config import settings
 from mosquitto_auth.api.models.status import CertificateStatus
 from mosquitto_auth.api.models.responses import CertificateMessages
 from mosquitto_auth.client.certificate.generate_users_certificate import generate_client_certificate, CA_CERT, CA_KEY, CERTS_BASE_DIR
+from mosquitto_auth.client.certificate.bulk_issue import issue_client_certificates, sign_client_csrs, iter_bundles_zip
+from mosquitto_auth.client.certificate.sign_client_csr import sign_client_csr, CSRPolicyError
 from mosquitto_auth.client.certificate.delete_user_certificate import delete_user_certificate
-from mosquitto_auth.client.certificate.verify_client_certificate import verify_certificate_client
+from mosquitto_auth.client.certificate.verify_client_certificate import verify_client_certificate
 from mosquitto_auth.broker.generate_broker_certificate import generate_broker_certificate
 from mosquitto_auth.broker.delete_broker_certificate import delete_broker_certificate as delete_broker_cert_func
 from mosquitto_auth.broker.verify_broker_certificate import verify_broker_certificate 
-from mosquitto_auth.lib.utils import interpret_openssl_error, error_openssl_map
+from mosquitto_auth.broker.rotate_broker_certificate import (
+    list_broker_versions, rollback_broker_certificate as rollback_broker_cert_func, BrokerRotationError
+)
+from mosquitto_auth.ca.key_pool import key_pool
+from mosquitto_auth.api.services.reload_client import reload_client
+from mosquitto_auth.ca.inventory import certificate_inventory
+from mosquitto_auth.ca.renewal import renewal_scheduler
+from mosquitto_auth.ca.revocation import Revocation, client_serials, get_revocation_coordinator, REVOKED, ALREADY_REVOKED
+from mosquitto_auth.ca.verifier import verify_client_certificates, openssl_date
+from mosquitto_auth.lib.x509 import KeyType
 router = APIRouter()
 
+WAIT_RELOAD = Query(default=False, description="Return only once the broker has reloaded with this change")
+
 @router.post(
     "/client",
     response_model=CertificateResponse,
@@ -34,8 +55,9 @@ async def create_certificate(data: CertificateCreate) -> CertificateResponse:
                 detail="A certificate or key not found."
             )
         await asyncio.to_thread(
-            generate_client_certificate, data.username, data.days if data.days is not None else 365, False
+            generate_client_certificate, data.username, data.days if data.days is not None else 365, data.key_type
         )
+        certificate_inventory.mark_dirty()
         message = CertificateMessages.CERTIFICATE_CREATED.format(username=data.username)
         return CertificateResponse(
             username=data.username,
@@ -50,16 +72,146 @@ async def create_certificate(data: CertificateCreate) -> CertificateResponse:
         )
 
 
+@router.post(
+    "/client/bulk",
+    response_model=CertificateBulkResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Issue many client certificates in parallel",
+)
+async def create_many_certificates(
+    data: CertificateBulkCreate,
+    bundle: bool = Query(default=False, description="Stream a ZIP of every issued key/certificate (plus report.json) instead of JSON"),
+):
+    """
+    Certificates are issued across a dedicated process pool (CERT_ISSUE_WORKERS), each
+    worker reusing its parsed CA key. Results are per username; one failure does not
+    abort the rest.
+    """
+    if not CA_CERT.exists() or not CA_KEY.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="A certificate or key not found."
+        )
+    items = [(c.username, c.days if c.days is not None else 365, c.key_type) for c in data.certificates]
+    try:
+        results = await issue_client_certificates(items)
+        certificate_inventory.mark_dirty()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error issuing certificates: {e}"
+        )
+
+    if bundle:
+        return StreamingResponse(
+            iter_bundles_zip(results),
+            status_code=status.HTTP_201_CREATED,
+            media_type="application/zip",
+            headers={"Content-Disposition": "attachment; filename=client_cert_bundles.zip"}
+        )
+    issued = sum(1 for r in results if r["status"] == CertificateStatus.CREATED)
+    return CertificateBulkResponse(
+        issued=issued,
+        failed=len(results) - issued,
+        results=[CertificateBulkResult(**r) for r in results]
+    )
+
+
+@router.post(
+    "/client/csr",
+    response_model=CertificateCSRResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Sign a client CSR (the private key stays on the device)",
+)
+async def sign_certificate_request(data: CertificateCSRSign) -> CertificateCSRResponse:
+    """
+    The CSR's CN becomes the username; only the CN and public key are used, with the
+    usual client profile (clientAuth). Returns the signed certificate only.
+    """
+    if not CA_CERT.exists() or not CA_KEY.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="A certificate or key not found."
+        )
+    try:
+        cn, cert_pem, cert = await asyncio.to_thread(
+            sign_client_csr, data.csr, data.days if data.days is not None else 365, data.username
+        )
+        certificate_inventory.mark_dirty()
+    except CSRPolicyError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"CSR rejected: {e}")
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error signing CSR: {e}"
+        )
+    return CertificateCSRResponse(
+        username=cn,
+        serial=format(cert.serial_number, "x"),
+        not_after=cert.not_valid_after_utc,
+        certificate=cert_pem.decode("ascii")
+    )
+
+
+@router.post(
+    "/client/csr/bulk",
+    response_model=CertificateCSRBulkResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Sign many client CSRs in parallel",
+)
+async def sign_many_certificate_requests(data: CertificateCSRBulkSign) -> CertificateCSRBulkResponse:
+    """Results are per CSR, in request order; a rejected CSR does not abort the rest."""
+    if not CA_CERT.exists() or not CA_KEY.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="A certificate or key not found."
+        )
+    items = [(c.csr, c.days if c.days is not None else 365) for c in data.csrs]
+    try:
+        results = await sign_client_csrs(items)
+        certificate_inventory.mark_dirty()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error signing CSRs: {e}"
+        )
+    issued = sum(1 for r in results if r["status"] == CertificateStatus.CREATED)
+    return CertificateCSRBulkResponse(
+        issued=issued,
+        failed=len(results) - issued,
+        results=[CertificateCSRBulkResult(**r) for r in results]
+    )
+
+
 @router.get(
     "/client",
     status_code=status.HTTP_200_OK,
     summary="List all user certificates"
 )
-async def list_client_certificates():
-    if not CERTS_BASE_DIR.exists() or not CERTS_BASE_DIR.is_dir():
-        return {"certificates": []}
-    users = [p.name for p in CERTS_BASE_DIR.iterdir() if p.is_dir()]
-    return {"certificates": users}
+async def list_client_certificates(
+    expires_before: Optional[datetime] = Query(default=None, description="Only certificates whose notAfter is earlier (UTC if no offset)"),
+    key_type: Optional[KeyType] = Query(default=None),
+    ca_verified: Optional[bool] = Query(default=None, description="Filter on signature verification against the current CA"),
+    prefix: str = Query(default="", description="Only names starting with this prefix"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(default=None, ge=1, le=10000),
+) -> CertificateList:
+    """
+    Served from the certificate inventory (parsed metadata cached per file by mtime),
+    so filtering never opens the PEM files again. `certificates` keeps the plain
+    list of names; `items` has the metadata.
+    """
+    if expires_before is not None and expires_before.tzinfo is None:
+        expires_before = expires_before.replace(tzinfo=timezone.utc)
+    page, next_cursor, total = await asyncio.to_thread(
+        certificate_inventory.query, expires_before, key_type, prefix, cursor, limit, ca_verified
+    )
+    return CertificateList(
+        certificates=[info.name for info in page],
+        items=[CertificateInfo(**info.to_dict()) for info in page],
+        total=total,
+        next_cursor=next_cursor
+    )
 
 
 @router.get(
@@ -72,7 +224,7 @@ async def get_client_certificate_bundle(username: str):
     cert_dir = CERTS_BASE_DIR / username
     cert_path = cert_dir / f"{username}.crt"
     key_path = cert_dir / f"{username}.key"
-    if not cert_path.exists() or not key_path.exists():
+    if not cert_path.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Certificate or key for user '{username}' not found."
@@ -80,7 +232,9 @@ async def get_client_certificate_bundle(username: str):
     zip_buffer = io.BytesIO()
     with zipfile.ZipFile(zip_buffer, "w") as zipf:
         zipf.write(cert_path, arcname=f"{username}.crt")
-        zipf.write(key_path, arcname=f"{username}.key")
+        # Certificates signed from a CSR have no server-side key
+        if key_path.exists():
+            zipf.write(key_path, arcname=f"{username}.key")
     zip_buffer.seek(0)
     return Response(
         content=zip_buffer.read(),
@@ -98,34 +252,45 @@ async def get_client_certificate_bundle(username: str):
     response_model=CertificateVerificationResponse
 )
 async def get_client_certificate_verification(username: str):
-    result = await asyncio.to_thread(verify_certificate_client, username)
-
-    validity = None
-    expiration = None
-    signature_status = "[NOT AVAILABLE]"
-    error_description = None
-
-    for line in result.splitlines():
-        line = line.strip()
-
-        if line.startswith("notBefore="):
-            validity = line.replace("notBefore=", "")
-        elif line.startswith("notAfter="):
-            expiration = line.replace("notAfter=", "")
-        elif ": OK" in line:
-            signature_status = "OK"
-        else:
-            interpreted = interpret_openssl_error(line)
-            if interpreted:
-                tag, description = interpreted
-                signature_status = tag
-                error_description = description 
+    result = await asyncio.to_thread(verify_client_certificate, username)
 
+    if result is None:
+        return CertificateVerificationResponse(signature_status="[NOT AVAILABLE]")
+
+    # First failure, as `openssl verify` would report it
+    error = result["errors"][0] if result["errors"] else None
     return CertificateVerificationResponse(
-        valid_from=validity,
-        valid_until=expiration,
-        signature_status=signature_status, 
-        error_description=error_description 
+        valid_from=openssl_date(result["valid_from"]),
+        valid_until=openssl_date(result["valid_until"]),
+        signature_status=error["tag"] if error else "OK",
+        error_description=error["description"] if error else None
+    )
+
+
+@router.post(
+    "/verify/batch",
+    response_model=CertificateVerifyBatchResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Verify many client certificates (chain, validity, key usage, EKU, SANs) in one call"
+)
+async def verify_client_certificates_batch(data: CertificateVerifyBatchRequest) -> CertificateVerifyBatchResponse:
+    """
+    Checks run in-process on certificates already parsed by the certificate inventory,
+    so verifying the whole fleet is one pass with no openssl processes.
+    """
+    try:
+        results = await asyncio.to_thread(verify_client_certificates, data.usernames)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error verifying certificates: {e}"
+        )
+    failed = [result for result in results if result["status"] != "OK"]
+    return CertificateVerifyBatchResponse(
+        checked=len(results),
+        ok=len(results) - len(failed),
+        failed=len(failed),
+        results=[CertificateVerifyResult(**result) for result in (failed if data.only_failed else results)]
     )
 
 
@@ -134,10 +299,38 @@ async def get_client_certificate_verification(username: str):
     status_code=status.HTTP_200_OK,
     summary="Remove certificate and key of user"
 )
-async def delete_client_certificate(username: str):
+async def delete_client_certificate(
+    username: str,
+    revoke: bool = Query(default=True, description="Revoke the user's certificates (CRL) before removing the files"),
+    wait_reload: bool = WAIT_RELOAD,
+):
+    """Removing the files alone leaves the certificate valid at the broker; revocation puts it on the CRL."""
+    # 404 before anything is revoked: a revocation cannot be undone
+    if not (CERTS_BASE_DIR / username).is_dir():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Certificate directory for user '{username}' not found."
+        )
     try:
-        delete_user_certificate(username)
-        return {"message": f"Certificate and key for user '{username}' removed successfully."}
+        revoked = []
+        if revoke and CA_CERT.exists() and CA_KEY.exists():
+            serials = await asyncio.to_thread(client_serials, username)
+            if serials:
+                results = await asyncio.to_thread(
+                    get_revocation_coordinator().revoke,
+                    [Revocation(serial, "cessationOfOperation") for serial in serials]
+                )
+                revoked = [r["serial"] for r in results if r["status"] == REVOKED]
+        try:
+            delete_user_certificate(username)
+        except FileNotFoundError:
+            if not revoked:
+                raise
+            # Removed concurrently after the check; the revocation and the new CRL still stand
+        certificate_inventory.mark_dirty()
+        # Only a revocation (new CRL) concerns the broker; client files are never read by it
+        reload = await reload_client.request(wait_reload) if revoked else {}
+        return {"message": f"Certificate and key for user '{username}' removed successfully.", "revoked_serials": revoked, **reload}
     except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -156,17 +349,78 @@ async def delete_client_certificate(username: str):
     status_code=status.HTTP_201_CREATED,
     summary="Generate broker certificate"
 )
-async def create_broker_certificate(data: BrokerCertificateRequest):
+async def create_broker_certificate(data: BrokerCertificateRequest, wait_reload: bool = WAIT_RELOAD):
     try:
-        await asyncio.to_thread(generate_broker_certificate, settings.BROKER_CN, data.days, False)
+        await asyncio.to_thread(
+            generate_broker_certificate, settings.BROKER_CN, data.days, key_type=data.key_type
+        )
+        certificate_inventory.mark_dirty()
         return BrokerCertificateResponse(
             username="broker",
             status=CertificateStatus.CREATED,
-            message="Broker certificate generated successfully."
+            message="Broker certificate generated successfully.",
+            **await reload_client.request(wait_reload)
         )
+    except BrokerRotationError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error generating broker certificate: {e}")
 
+@router.post(
+    "/revoke",
+    response_model=CertificateRevokeResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Revoke certificates by serial or username and publish the CRL"
+)
+async def revoke_certificates(data: CertificateRevokeRequest, wait_reload: bool = WAIT_RELOAD) -> CertificateRevokeResponse:
+    """
+    Revocations are recorded in the CA database and group-committed: requests arriving
+    within CRL_BATCH_WINDOW_SECONDS share one CRL rebuild, hence one broker reload.
+    """
+    if not CA_CERT.exists() or not CA_KEY.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="A certificate or key not found."
+        )
+    try:
+        owners = {}
+        for username in data.usernames:
+            for serial in await asyncio.to_thread(client_serials, username):
+                owners[serial] = username
+        serials = list(dict.fromkeys([*data.serials, *owners]))
+        results = await asyncio.to_thread(
+            get_revocation_coordinator().revoke, [Revocation(serial, data.reason) for serial in serials]
+        ) if serials else []
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error revoking certificates: {e}"
+        )
+    certificate_inventory.mark_dirty()
+    revoked = sum(1 for r in results if r["status"] == REVOKED)
+    already = sum(1 for r in results if r["status"] == ALREADY_REVOKED)
+    return CertificateRevokeResponse(
+        revoked=revoked,
+        already_revoked=already,
+        failed=len(results) - revoked - already,
+        crl_number=max((r["crl_number"] for r in results if r.get("crl_number")), default=None),
+        results=[CertificateRevokeResult(username=owners.get(r["serial"]), **r) for r in results],
+        **(await reload_client.request(wait_reload) if revoked else {})
+    )
+
+
+@router.get(
+    "/broker/info",
+    response_model=CertificateInfo,
+    status_code=status.HTTP_200_OK,
+    summary="Broker certificate metadata from the certificate inventory"
+)
+async def get_broker_certificate_info() -> CertificateInfo:
+    info = await asyncio.to_thread(certificate_inventory.broker)
+    if info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Broker certificate not found.")
+    return CertificateInfo(**info.to_dict())
+
 @router.get(
     "/broker/verify",
     response_model=BrokerCertificateVerificationResponse,
@@ -185,16 +439,7 @@ async def get_verify_broker_certificate():
 
         valid_until = result.get("valid_until")
         ca_signature = "OK" if result.get("ca_verified") else None
-        san_raw = result.get("san_list", [])
-        san = []
-
-        for entry in san_raw:
-            if "IP Address:" in entry:
-                ip_parts = entry.replace("IP Address:", "").split(",")
-                san.extend([f"IP: {ip.strip()}" for ip in ip_parts if ip.strip()])
-            elif "DNS:" in entry:
-                dns_parts = entry.replace("DNS:", "").split(",")
-                san.extend([f"DNS: {dns.strip()}" for dns in dns_parts if dns.strip()])
+        san = result.get("san_list", [])
 
         key_usage = "OK" if result.get("key_usage_valid") else None
         extended_key_usage = "OK" if result.get("extended_key_usage_valid") else None
@@ -226,9 +471,72 @@ async def get_verify_broker_certificate():
 async def delete_broker_certificate():
     try:
         await asyncio.to_thread(delete_broker_cert_func)
+        certificate_inventory.mark_dirty()
         return BrokerCertificateDeleteResponse(message="Broker certificate and key removed successfully.")
     except FileNotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Broker certificate not found.")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error removing broker certificate: {e}")
 
+
+@router.get(
+    "/broker/versions",
+    response_model=list[BrokerCertificateVersion],
+    status_code=status.HTTP_200_OK,
+    summary="Staged broker certificate versions, oldest first"
+)
+async def get_broker_certificate_versions() -> list[BrokerCertificateVersion]:
+    versions = await asyncio.to_thread(list_broker_versions)
+    return [BrokerCertificateVersion(**v) for v in versions]
+
+@router.post(
+    "/broker/rollback",
+    response_model=BrokerCertificateRotation,
+    status_code=status.HTTP_200_OK,
+    summary="Re-activate a previous broker certificate version"
+)
+async def rollback_broker_certificate(data: BrokerCertificateRollback, wait_reload: bool = WAIT_RELOAD) -> BrokerCertificateRotation:
+    try:
+        result = await asyncio.to_thread(rollback_broker_cert_func, data.version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except BrokerRotationError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error rolling back broker certificate: {e}")
+    certificate_inventory.mark_dirty()
+    return BrokerCertificateRotation(**result, **await reload_client.request(wait_reload))
+
+
+@router.get(
+    "/key-pool",
+    response_model=KeyPoolStats,
+    status_code=status.HTTP_200_OK,
+    summary="Pre-generated key pool depth and refill metrics"
+)
+async def get_key_pool_stats() -> KeyPoolStats:
+    return KeyPoolStats(**key_pool.stats())
+
+
+@router.get(
+    "/renewal",
+    response_model=RenewalStats,
+    status_code=status.HTTP_200_OK,
+    summary="Certificate expiry scheduler progress"
+)
+async def get_renewal_stats() -> RenewalStats:
+    """`active` is false on API workers where another worker holds the renewal lock."""
+    return RenewalStats(**renewal_scheduler.stats())
+
+
+@router.post(
+    "/renewal/run",
+    response_model=RenewalStats,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Run a renewal scheduling cycle now"
+)
+async def run_renewal_cycle() -> RenewalStats:
+    if not settings.CERT_RENEWAL_ENABLED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Certificate renewal is disabled (CERT_RENEWAL_ENABLED).")
+    renewal_scheduler.trigger()
+    return RenewalStats(**renewal_scheduler.stats())
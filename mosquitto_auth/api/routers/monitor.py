@@ -1,7 +1,11 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 import asyncio
-from mosquitto_auth.api.core.state import broker_state, metrics_dispatcher
-from mosquitto_auth.api.models.monitor import BrokerStateResponse
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.api.core.state import broker_state, metrics_dispatcher, metrics_history, metrics_store
+from mosquitto_auth.api.models.monitor import BrokerStateResponse, ReloadMetrics, MetricsHistoryResponse
 
 router = APIRouter()
 ws_router = APIRouter()
@@ -14,6 +18,57 @@ def get_broker_status():
     """
     return broker_state.to_dict()
 
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+@router.get("/history", response_model=MetricsHistoryResponse)
+def get_metrics_history(
+    fields: Optional[str] = Query(default=None, description="Métricas separadas por vírgula (padrão: todas)"),
+    start: Optional[datetime] = Query(default=None, alias="from", description="Padrão: 1 hora antes de 'to'"),
+    end: Optional[datetime] = Query(default=None, alias="to", description="Padrão: agora"),
+    step: Optional[int] = Query(default=None, ge=1, description="Tamanho do intervalo em segundos"),
+):
+    """
+    Histórico das métricas numéricas do $SYS, agregado (min/max/avg/last) em intervalos de
+    `step` segundos: do buffer circular em memória ou, para intervalos que começam antes
+    do início deste processo, do banco SQLite (METRICS_STORE_ENABLED).
+    """
+    end = _utc(end or datetime.now(timezone.utc))
+    start = _utc(start or end - timedelta(hours=1))
+    names = [f.strip() for f in fields.split(",") if f.strip()] if fields else metrics_history.fields
+    from_store = metrics_store is not None and start.timestamp() < metrics_history.started_at
+    try:
+        if from_store:
+            metrics_store.flush()
+            result = metrics_store.query(names, start.timestamp(), end.timestamp(), step, metrics_history.max_points)
+        else:
+            result = metrics_history.query(names, start.timestamp(), end.timestamp(), step)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    to_datetime = lambda ts: datetime.fromtimestamp(ts, timezone.utc)
+    return MetricsHistoryResponse(
+        start=to_datetime(result["start"]),
+        end=to_datetime(result["end"]),
+        step=result["step"],
+        tier_step=result["tier_step"],
+        backend="sqlite" if from_store else metrics_history.backend,
+        source="store" if from_store else "memory",
+        timestamps=[to_datetime(ts) for ts in result["timestamps"]],
+        series=result["series"],
+    )
+
+@router.get("/reload", response_model=ReloadMetrics)
+def get_reload_metrics():
+    """
+    Contagem e latência dos reloads (SIGHUP) feitos pelo reload daemon do container do broker.
+    """
+    try:
+        return json.loads(settings.RELOAD_METRICS_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reload daemon metrics not found.")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Invalid reload metrics: {e}")
+
 @ws_router.websocket("/metrics/stream")
 async def metrics_ws(websocket: WebSocket):
     queue = metrics_dispatcher.subscribe()
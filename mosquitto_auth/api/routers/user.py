@@ -1,20 +1,39 @@
 import asyncio
-from fastapi import APIRouter, HTTPException, status
-from mosquitto_auth.api.models.user import UserCreate, UserPublic, UserResponse, UserBulkResponse,ManyUserCreate, UserPasswordUpdate, UserList
+import json
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from mosquitto_auth.api.models.user import UserCreate, UserPublic, UserResponse, UserBulkResponse, BulkUserDetails, ManyUserCreate, UserPasswordUpdate, UserList, UserCount, UserStateSync, UserStateResponse
 from mosquitto_auth.client.MosquittoUserManager import MosquittoUserManager
+from mosquitto_auth.client.user_import import import_batch, DEFAULT_BATCH_SIZE, MAX_LINE_BYTES
 from mosquitto_auth.api.models.status import UserStatus
 from mosquitto_auth.api.models.responses import UserMessages
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.api.services.reload_client import reload_client
+from mosquitto_auth.api.core.streaming import BodyStreamingResponse, ImportReport
 
 router = APIRouter()
 manager = MosquittoUserManager()
 
+STREAM_CHUNK_SIZE = 1000
+WAIT_RELOAD = Query(default=False, description="Return only once the broker has reloaded with this change")
+
+
+async def request_reload(wait: bool) -> dict:
+    """Broker reload generation for a passwd change; dynsec applies changes in place, without reloads."""
+    if settings.PASSWD_BACKEND == "dynsec":
+        return {}
+    return await reload_client.request(wait)
+
 @router.post(
     "",
     response_model=UserResponse,
     status_code=status.HTTP_201_CREATED,
 )
 async def create_user(
-    user_data: UserCreate
+    user_data: UserCreate,
+    wait_reload: bool = WAIT_RELOAD,
 ) -> UserResponse:
     try:
         await asyncio.to_thread(
@@ -28,7 +47,8 @@ async def create_user(
         return UserResponse(
             username=user_data.username,
             status=UserStatus.CREATED,  
-            message=message
+            message=message,
+            **await request_reload(wait_reload)
         )
 
     except ValueError as e:
@@ -37,6 +57,12 @@ async def create_user(
             detail=str(e)
         )
 
+    except TimeoutError as e:
+        # dynsec backend: the broker did not answer the control command in time
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except RuntimeError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -54,11 +80,32 @@ async def create_user(
     response_model=UserList,
     status_code=status.HTTP_200_OK,
   )
-async def get_users() -> UserList:
+async def get_users(
+    prefix: Optional[str] = Query(default=None, max_length=32),
+    cursor: Optional[str] = Query(default=None, description="Last username of the previous page"),
+    limit: Optional[int] = Query(default=None, ge=1, le=10000),
+) -> UserList:
+    """
+    Without parameters, returns every user in file order. With `prefix`, `cursor`
+    or `limit`, returns one page in username order plus `next_cursor`.
+    """
     try:
-        usernames = await asyncio.to_thread(manager.list_users)
-        users = [UserPublic(username=username) for username in usernames]
-        return UserList(users=users)
+        if prefix is None and cursor is None and limit is None:
+            usernames = await asyncio.to_thread(manager.list_users)
+            next_cursor = None
+        else:
+            usernames, next_cursor = await asyncio.to_thread(
+                manager.list_users_page, prefix or "", cursor, limit or 100
+            )
+        # Names come from our own file, skip re-validating each one
+        users = [UserPublic.model_construct(username=username) for username in usernames]
+        return UserList(users=users, next_cursor=next_cursor)
+    except TimeoutError as e:
+        # dynsec backend: the broker did not answer the control command in time
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except RuntimeError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -70,23 +117,86 @@ async def get_users() -> UserList:
             detail=str(e)
         )
 
+@router.get(
+    "/count",
+    response_model=UserCount,
+    status_code=status.HTTP_200_OK,
+)
+async def count_users(prefix: Optional[str] = Query(default=None, max_length=32)) -> UserCount:
+    try:
+        count = await asyncio.to_thread(manager.count_users, prefix or "")
+    except TimeoutError as e:
+        # dynsec backend: the broker did not answer the control command in time
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    return UserCount(count=count, prefix=prefix)
+
+@router.get(
+    "/stream",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    summary="Stream users as NDJSON",
+)
+async def stream_users(prefix: Optional[str] = Query(default=None, max_length=32)):
+    try:
+        usernames = await asyncio.to_thread(manager.iter_users, prefix or "")
+    except TimeoutError as e:
+        # dynsec backend: the broker did not answer the control command in time
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+    async def ndjson():
+        chunk = []
+        for username in usernames:
+            chunk.append(json.dumps({"username": username}))
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+                await asyncio.sleep(0)
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @router.delete(
     "",
     status_code=status.HTTP_200_OK,
     response_model=UserResponse
 )
-async def delete_user(data: UserPublic):
+async def delete_user(data: UserPublic, wait_reload: bool = WAIT_RELOAD):
     try:
         await asyncio.to_thread(manager.delete_user, data.username)
         message = UserMessages.USER_DELETED.format(username=data.username)
         
-        return  UserResponse(username=data.username, status=UserStatus.DELETED, message=message)
+        return  UserResponse(
+            username=data.username, status=UserStatus.DELETED, message=message, **await request_reload(wait_reload)
+        )
     
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=UserMessages.USER_NOT_FOUND.format(username=data.username)
         )
+    except TimeoutError as e:
+        # dynsec backend: the broker did not answer the control command in time
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except RuntimeError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
@@ -99,7 +209,7 @@ async def delete_user(data: UserPublic):
     response_model=UserResponse,
     status_code=status.HTTP_200_OK
 )
-async def update_user_password(data: UserPasswordUpdate):
+async def update_user_password(data: UserPasswordUpdate, wait_reload: bool = WAIT_RELOAD):
     try:
         await asyncio.to_thread(
             manager.edit_password,
@@ -112,13 +222,20 @@ async def update_user_password(data: UserPasswordUpdate):
         return UserResponse(
             username=data.username,
             status=UserStatus.UPDATED,
-            message=message
+            message=message,
+            **await request_reload(wait_reload)
         )
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=UserMessages.USER_NOT_FOUND.format(username=data.username)
         )
+    except TimeoutError as e:
+        # dynsec backend: the broker did not answer the control command in time
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except RuntimeError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -130,36 +247,166 @@ async def update_user_password(data: UserPasswordUpdate):
     response_model=UserBulkResponse,
     status_code=status.HTTP_201_CREATED
 )
-async def create_many_users(data: ManyUserCreate):
-    failed_users = []
-
+async def create_many_users(data: ManyUserCreate, wait_reload: bool = WAIT_RELOAD):
     try:
-        await asyncio.to_thread(manager.add_many_users, data.users, data.overwrite_file)
-
+        result = await asyncio.to_thread(manager.add_many_users, data.users, data.overwrite_file)
+    except TimeoutError as e:
+        # dynsec backend: the broker did not answer the control command in time
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
     except RuntimeError as e:
-        if "Errors in bulk add:" in str(e):
-            error_msgs = str(e).replace("Errors in bulk add: ", "").split("; ")
-            failed_users = [msg.split(":")[0] for msg in error_msgs if msg]
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=str(e)
-            )
-
-    requested_usernames = [user.username for user in data.users]
-    failed_set = set(failed_users)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
 
-    success_users = [username for username in requested_usernames if username not in failed_set]
-    if not success_users:
+    if not result["success"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=[f"{username}: User already exists." for username in failed_users]
+            detail=result["failed"]
         )
 
     return UserBulkResponse(
         message=UserMessages.MANY_USERS_CREATED,
-        details={
-            "success": success_users,
-            "failed": [f"{username}: User already exists." for username in failed_users]
-        }
+        details=BulkUserDetails(**result).model_dump(),
+        **await request_reload(wait_reload)
     )
+
+@router.put(
+    "/state",
+    response_model=UserStateResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Reconcile users with a desired state",
+)
+async def reconcile_users(data: UserStateSync, wait_reload: bool = WAIT_RELOAD) -> UserStateResponse:
+    """
+    Diff the desired users against the passwd file and apply adds, password rotations
+    and (with `prune`) removals in one write, i.e. one broker reload. The monitoring
+    user is never pruned.
+    """
+    desired = {user.username: user.password for user in data.users}
+    try:
+        result = await asyncio.to_thread(
+            manager.reconcile_users, desired, data.prune, {settings.USER_MQTT_MONITOR}
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except TimeoutError as e:
+        # dynsec backend: the broker did not answer the control command in time
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    reload = await request_reload(wait_reload) if result["added"] or result["updated"] or result["removed"] else {}
+    return UserStateResponse(message=UserMessages.USERS_RECONCILED, **result, **reload)
+
+@router.post(
+    "/import",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    summary="Import users from a streamed CSV or NDJSON body",
+)
+async def import_users(
+    request: Request,
+    fmt: Literal["csv", "ndjson"] = Query(default="csv", alias="format"),
+    batch_size: int = Query(default=DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    wait_reload: bool = WAIT_RELOAD,
+):
+    """
+    The request body is read incrementally (`username,password` per CSV line or one
+    JSON object per NDJSON line) and applied batch by batch. The response streams
+    one NDJSON report entry per row, {"row", "username", "status", "error"?}, as
+    soon as its batch has been applied. When users were created, a last entry
+    {"row": null, "status": "RELOAD", "created", "reload_generation", "reload_applied"}
+    follows once the broker reload has been requested.
+    """
+    report = ImportReport()
+    created = 0
+
+    async def apply(batch: list[tuple[int, str]]) -> None:
+        nonlocal created
+        entries = await asyncio.to_thread(import_batch, manager, batch, fmt)
+        created += sum(entry["status"] == UserStatus.CREATED for entry in entries)
+        report.write("".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8"))
+
+    async def read_body() -> None:
+        batch: list[tuple[int, str]] = []
+        row_no = 0
+        pending = bytearray()
+        oversized = False  # skipping the rest of a row longer than MAX_LINE_BYTES
+
+        async def reject_long_row() -> None:
+            nonlocal batch
+            if batch:
+                await apply(batch)
+                batch = []
+            error = {"row": row_no, "username": None, "status": "ERROR", "error": f"Line longer than {MAX_LINE_BYTES} bytes"}
+            report.write((json.dumps(error) + "\n").encode("utf-8"))
+
+        async for chunk in request.stream():
+            pending += chunk
+            end = pending.rfind(b"\n")
+            if end >= 0:
+                lines = pending[:end].split(b"\n")
+                del pending[:end + 1]
+                if oversized:
+                    lines, oversized = lines[1:], False
+                for line in lines:
+                    row_no += 1
+                    if len(line) > MAX_LINE_BYTES:
+                        await reject_long_row()
+                        continue
+                    batch.append((row_no, line.decode("utf-8", errors="replace")))
+                    if len(batch) >= batch_size:
+                        await apply(batch)
+                        batch = []
+            if len(pending) > MAX_LINE_BYTES:
+                # No newline in sight: report the row once and drop its bytes up to the next newline
+                if not oversized:
+                    row_no += 1
+                    await reject_long_row()
+                    oversized = True
+                pending.clear()
+        if pending.strip():
+            batch.append((row_no + 1, pending.decode("utf-8", errors="replace")))
+        if batch:
+            await apply(batch)
+
+    async def consume() -> None:
+        try:
+            try:
+                await read_body()
+            except ClientDisconnect:
+                pass
+            except Exception as e:
+                print(f"❌ User import aborted: {e}")
+                report.write((json.dumps({"row": None, "username": None, "status": "ERROR", "error": str(e)}) + "\n").encode("utf-8"))
+            # Users created before an error or a disconnect are in the passwd file as well
+            if created:
+                reload = await request_reload(wait_reload)
+                trailer = {"row": None, "username": None, "status": "RELOAD", "created": created,
+                           "reload_generation": reload.get("reload_generation"), "reload_applied": reload.get("reload_applied")}
+                report.write((json.dumps(trailer) + "\n").encode("utf-8"))
+        finally:
+            report.finish()
+
+    task = asyncio.create_task(consume())
+
+    async def report_stream():
+        try:
+            async for chunk in report:
+                yield chunk
+        finally:
+            task.cancel()
+
+    return BodyStreamingResponse(report_stream(), media_type="application/x-ndjson")
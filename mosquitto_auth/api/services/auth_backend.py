@@ -0,0 +1,53 @@
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.client.passwd_index import get_passwd_index
+from mosquitto_auth.lib.credential_cache import CredentialCache
+from mosquitto_auth.lib.passwd_hash import verify_password
+from mosquitto_auth.acl.rules import AclStore
+
+passwd_index = get_passwd_index(settings.PASSWD_FILE_PATH)
+credential_cache = CredentialCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+acl_store = AclStore(settings.ACL_RULES_PATH, settings.ACL_FILE_PATH, settings.AUTH_SUPERUSERS)
+
+
+def check_user(username: str, password: str) -> bool:
+    """Verify credentials against the passwd file, skipping PBKDF2 for recently verified pairs. Blocking."""
+    stored_hash = passwd_index.get_hash(username)
+    if stored_hash is None:
+        return False
+    key = credential_cache.key(username, password, stored_hash)
+    cached = credential_cache.get(key)
+    if cached is not None:
+        return cached
+    allowed = verify_password(password, stored_hash)
+    credential_cache.put(key, allowed)
+    return allowed
+
+
+def cached_user(username: str, password: str) -> bool | None:
+    """Decision from memory only (no file read, no PBKDF2), or None when check_user has to run."""
+    if not passwd_index.fresh():
+        return None
+    stored_hash = passwd_index.get_hash(username)
+    if stored_hash is None:
+        return False
+    # A miss is counted by check_user, which runs next
+    return credential_cache.get(credential_cache.key(username, password, stored_hash), count_miss=False)
+
+
+def rules_loaded() -> bool:
+    """Passwd index and ACL engine are current, so check_acl needs no disk reads."""
+    return passwd_index.fresh() and acl_store.fresh()
+
+
+def check_superuser(username: str) -> bool:
+    return username in settings.AUTH_SUPERUSERS
+
+
+def check_acl(username: str, clientid: str | None, topic: str, acc: int) -> bool:
+    if check_superuser(username):
+        return True
+    engine = acl_store.engine()
+    if engine.empty:
+        # No ACL rules: same behaviour as a broker with password_file and no acl_file
+        return username in passwd_index
+    return engine.check(username, clientid, topic, acc)
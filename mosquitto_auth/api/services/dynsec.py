@@ -0,0 +1,109 @@
+import asyncio
+import json
+import uuid
+from typing import Any, Dict, List
+
+DYNSEC_TOPIC = "$CONTROL/dynamic-security/v1"
+DYNSEC_RESPONSE_TOPIC = f"{DYNSEC_TOPIC}/response"
+
+
+class DynsecClient:
+    """
+    Sends Mosquitto dynamic-security commands over the monitor's aiomqtt connection.
+
+    Commands submitted within `window` seconds are published together in one
+    {"commands": [...]} message; each is tagged with correlationData so the
+    responses can be routed back to their callers.
+    """
+
+    def __init__(self, window: float = 0.01, timeout: float = 10.0):
+        self.window = window
+        self.timeout = timeout
+        self._client = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._queue: List[dict] = []
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    async def attach(self, client) -> None:
+        """Called by the monitor once connected; subscribes to the response topic."""
+        self._loop = asyncio.get_running_loop()
+        await client.subscribe(DYNSEC_RESPONSE_TOPIC)
+        self._client = client
+
+    def detach(self) -> None:
+        self._client = None
+        self._queue = []
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Connection to the broker lost."))
+        self._pending.clear()
+
+    async def execute(self, commands: List[dict]) -> List[dict]:
+        """Run commands and return their responses, in order."""
+        if self._client is None:
+            raise RuntimeError("Dynamic security unavailable: not connected to the broker.")
+        loop = asyncio.get_running_loop()
+        ids, futures = [], []
+        for command in commands:
+            correlation_id = uuid.uuid4().hex
+            self._queue.append({**command, "correlationData": correlation_id})
+            future = loop.create_future()
+            self._pending[correlation_id] = future
+            ids.append(correlation_id)
+            futures.append(future)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures), self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("Timed out waiting for dynamic security response.")
+        finally:
+            for correlation_id in ids:
+                self._pending.pop(correlation_id, None)
+
+    def execute_threadsafe(self, commands: List[dict]) -> List[dict]:
+        """Blocking variant for code running in worker threads (asyncio.to_thread)."""
+        if self._loop is None:
+            raise RuntimeError("Dynamic security unavailable: not connected to the broker.")
+        future = asyncio.run_coroutine_threadsafe(self.execute(commands), self._loop)
+        try:
+            return future.result(self.timeout + 1)
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError("Timed out waiting for dynamic security response.")
+
+    async def _flush_later(self) -> None:
+        commands: List[dict] = []
+        try:
+            await asyncio.sleep(self.window)
+            commands, self._queue = self._queue, []
+            if commands and self._client is not None:
+                await self._client.publish(DYNSEC_TOPIC, json.dumps({"commands": commands}))
+        except Exception as e:
+            for command in commands:
+                future = self._pending.get(command["correlationData"])
+                if future and not future.done():
+                    future.set_exception(RuntimeError(f"Error publishing dynamic security commands: {e}"))
+        finally:
+            self._flush_task = None
+            if self._queue:
+                self._flush_task = asyncio.create_task(self._flush_later())
+
+    def handle_response(self, payload: bytes) -> None:
+        try:
+            data: Dict[str, Any] = json.loads(payload)
+        except ValueError:
+            print(f"[Dynsec] Invalid response payload: {payload[:200]!r}")
+            return
+        for response in data.get("responses", []):
+            future = self._pending.get(response.get("correlationData"))
+            if future and not future.done():
+                future.set_result(response)
+
+
+dynsec_client = DynsecClient()
@@ -10,9 +10,12 @@ from mosquitto_auth.api.core.state import (
     broker_state, 
     metrics_dispatcher, 
     TOPIC_MAP,
+    metrics_history,
+    metrics_store,
     BrokerAvailability, 
     ContainerAvailability
 )
+from mosquitto_auth.api.services.dynsec import dynsec_client, DYNSEC_RESPONSE_TOPIC
 
 async def _process_sys_message(topic: str, payload: bytes):
     try:
@@ -24,6 +27,10 @@ async def _process_sys_message(topic: str, payload: bytes):
                 clean_payload = decoded_payload.split()[0] if isinstance(decoded_payload, str) else decoded_payload
                 value = cast_fn(clean_payload)
                 setattr(broker_state.metrics, field_name, value)
+                if cast_fn is not str:
+                    metrics_history.record(field_name, value)
+                    if metrics_store:
+                        metrics_store.record(field_name, value)
             except ValueError:
                 print(f"[Monitor] Fail to process[ topic: {topic}, payload: {field_name}: '{decoded_payload}'")
                 pass # Ignora payload incompatível
@@ -84,8 +91,13 @@ async def start_mqtt_monitor():
                 delay = 1.0 # Reseta o backoff
                 
                 await client.subscribe("$SYS/#")
+                if settings.PASSWD_BACKEND == "dynsec":
+                    await dynsec_client.attach(client)
                 
                 async for message in client.messages:
+                    if message.topic.matches(DYNSEC_RESPONSE_TOPIC):
+                        dynsec_client.handle_response(message.payload)
+                        continue
                     await _process_sys_message(message.topic.value, message.payload)
                     
                     # Stale detection loop interno ou baseado em timeout de mensagem
@@ -102,6 +114,8 @@ async def start_mqtt_monitor():
             broker_state.last_error = f"Erro Inesperado: {e}"
             broker_state.last_disconnect_at = datetime.now(timezone.utc)
             print(f"[Monitor] Erro fatal no monitor loop: {e}")
+        finally:
+            dynsec_client.detach()
 
         # Backoff Exponencial
         delay = min(delay * 2, 60.0) 
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import urllib.parse
+import urllib.request
+from typing import Dict, List
+from mosquitto_auth.api.core.config import settings
+
+
+class ReloadClient:
+    """
+    Asks the broker container's reload daemon for a reload after a write.
+
+    Requests made within `window` seconds share one POST /reload, and callers waiting
+    for the same generation share one wait; the daemon coalesces further with file
+    changes. An unreachable daemon never fails the write: the file watcher still
+    reloads the broker, the caller just gets no generation.
+    """
+
+    def __init__(self, url: str | None, token: str | None = None, window: float = 0.05, timeout: float = 10.0):
+        self.url = url.rstrip("/") if url else None
+        self.token = token
+        self.window = window
+        self.timeout = timeout
+        self._pending: List[asyncio.Future] = []
+        self._flush_task: asyncio.Task | None = None
+        self._waits: Dict[int, asyncio.Task] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.url is not None
+
+    def _call(self, method: str, path: str, timeout: float) -> dict:
+        request = urllib.request.Request(f"{self.url}{path}", method=method, data=b"" if method == "POST" else None)
+        if self.token:
+            request.add_header("X-Reload-Token", self.token)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+
+    async def request(self, wait: bool = False) -> Dict[str, int | bool | None]:
+        """
+        Request a reload covering every change made before this call. Returns the
+        reload_generation (None if unavailable) and, with `wait`, whether the SIGHUP
+        for that generation was sent (reload_applied) once it is or `timeout` runs out.
+        The broker re-reads its files on the signal but does not acknowledge it.
+        """
+        if not self.enabled:
+            return {"reload_generation": None, "reload_applied": None}
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        generation = await future
+        applied = await self.wait(generation) if wait and generation is not None else None
+        return {"reload_generation": generation, "reload_applied": applied}
+
+    async def _flush_later(self) -> None:
+        futures: List[asyncio.Future] = []
+        try:
+            await asyncio.sleep(self.window)
+            futures, self._pending = self._pending, []
+            generation = None
+            try:
+                result = await asyncio.to_thread(self._call, "POST", "/reload", self.timeout)
+                generation = result["generation"]
+            except Exception as e:
+                print(f"[Reload] Reload request failed: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_result(generation)
+        finally:
+            self._flush_task = None
+            if self._pending:
+                self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def wait(self, generation: int) -> bool:
+        """True once `generation` has been signalled to the broker."""
+        task = self._waits.get(generation)
+        if task is None:
+            task = self._waits[generation] = asyncio.create_task(self._wait(generation))
+            task.add_done_callback(lambda _t: self._waits.pop(generation, None))
+        return await asyncio.shield(task)
+
+    async def _wait(self, generation: int) -> bool:
+        query = urllib.parse.urlencode({"generation": generation, "timeout": self.timeout})
+        try:
+            result = await asyncio.to_thread(self._call, "GET", f"/reload?{query}", self.timeout + 5)
+            return bool(result["applied"])
+        except Exception as e:
+            print(f"[Reload] Waiting for generation {generation} failed: {e}")
+            return False
+
+
+reload_client = ReloadClient(
+    settings.RELOAD_CONTROL_URL, settings.RELOAD_CONTROL_TOKEN,
+    settings.RELOAD_BATCH_WINDOW_MS / 1000, settings.RELOAD_WAIT_TIMEOUT_SECONDS
+)
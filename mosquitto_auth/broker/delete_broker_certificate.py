@@ -1,18 +1,22 @@
-from pathlib import Path
-from mosquitto_auth.api.core.config import settings
+import shutil
+from mosquitto_auth.broker.rotate_broker_certificate import broker_base_dir, rotation_lock, VERSIONS_DIR, CURRENT_LINK, CERT_NAME, KEY_NAME
 
 def delete_broker_certificate():
-    base_dir = Path(__file__).parent.parent.parent
-    print(base_dir)
-    broker_cert = base_dir / settings.broker_cert_path
-    print(broker_cert)
-    broker_key = base_dir / settings.broker_key_path
-    print(broker_key)
-    
-    removed = False
-    for f in [broker_cert, broker_key]:
-        if f.exists():
-            f.unlink()
-            removed = True
-    if not removed:
-        raise FileNotFoundError("Broker certificate not found.") 
\ No newline at end of file
+    broker_dir = broker_base_dir()
+    print(broker_dir)
+
+    with rotation_lock():
+        removed = False
+        # broker.crt/broker.key and `current` are links (or legacy plain files); versions/ holds the pairs
+        for name in [CERT_NAME, KEY_NAME, CURRENT_LINK]:
+            f = broker_dir / name
+            if f.is_symlink() or f.exists():
+                print(f)
+                f.unlink()
+                removed = True
+        versions = broker_dir / VERSIONS_DIR
+        if versions.is_dir():
+            removed = removed or any(versions.iterdir())
+            shutil.rmtree(versions)
+        if not removed:
+            raise FileNotFoundError("Broker certificate not found.")
@@ -0,0 +1,501 @@
+"""
+Reload daemon for the broker container: sends mosquitto one SIGHUP per burst of changes
+to the files it actually reads (passwd, ACL, CA, broker cert/key, CRL).
+
+Runs inside the mosquitto image, so it only depends on the standard library (plus
+lib/fs). Changes are picked up with inotify on the parent directories, falling back to
+stat polling where inotify is unavailable; client certificate churn never wakes it up.
+A small HTTP control server lets the API request a reload and wait until it happened.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import hmac
+import json
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+from mosquitto_auth.lib.fs import atomic_write
+
+DEFAULT_FILES = [
+    "/mosquitto/config/mosquitto.passwd",
+    "/mosquitto/config/mosquitto.acl",
+    "/mosquitto/certs/ca.crt",
+    "/mosquitto/certs/ca.crl",
+    "/mosquitto/certs/broker/broker.crt",
+    "/mosquitto/certs/broker/broker.key",
+]
+DEFAULT_METRICS_PATH = "/mosquitto/log/reload_metrics.json"
+
+# inotify(7)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# No IN_MODIFY: writers replace files (atomic_write) or close them, so one event per change
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+
+
+def _stat_signature(path: str):
+    try:
+        st = os.stat(path)  # follows links: a broker cert rotation changes the inode
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def watch_points(path: str, depth: int = 0) -> Set[Tuple[str, str]]:
+    """
+    (directory, name) pairs whose change can change what `path` resolves to: the file
+    itself plus every symlink followed on the way (broker.crt -> current -> versions/<id>).
+    """
+    path = os.path.abspath(path)
+    points = {(os.path.dirname(path), os.path.basename(path))}
+    if depth > 8:
+        return points
+    prefix = Path(path).anchor
+    parts = Path(path).parts[1:]
+    for i, part in enumerate(parts):
+        prefix = os.path.join(prefix, part)
+        if os.path.islink(prefix):
+            points.add((os.path.dirname(prefix), part))
+            target = os.path.join(os.path.dirname(prefix), os.readlink(prefix), *parts[i + 1:])
+            return points | watch_points(os.path.normpath(target), depth + 1)
+    return points
+
+
+class Inotify:
+    """Minimal ctypes binding to inotify; raises OSError where it is not available."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        try:
+            self._add = libc.inotify_add_watch
+            self._rm = libc.inotify_rm_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError("inotify is not available on this platform")
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        wd = self._add(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm(self.fd, wd)
+
+    def read(self) -> List[Tuple[int, int, str]]:
+        """Pending events as (wd, mask, name)."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class InotifyWatcher:
+    """Watches the parent directories, keeping only events for the names that matter."""
+    backend = "inotify"
+
+    def __init__(self, files: List[str]):
+        self.files = files
+        self.inotify = Inotify()
+        self._dirs: Dict[str, int] = {}         # directory -> wd
+        self._names: Dict[int, Set[str]] = {}   # wd -> names of interest
+        self.refresh()
+
+    def refresh(self) -> None:
+        """(Re)compute watch points; link targets and missing directories change over time."""
+        wanted: Dict[str, Set[str]] = {}
+        for path in self.files:
+            for directory, name in watch_points(path):
+                wanted.setdefault(directory, set()).add(name)
+        for directory in set(self._dirs) - set(wanted):
+            self.inotify.rm_watch(self._dirs.pop(directory))
+        self._names = {}
+        for directory, names in wanted.items():
+            try:
+                # re-adding an existing watch is cheap and picks up a replaced directory
+                wd = self._dirs[directory] = self.inotify.add_watch(directory)
+            except OSError:
+                self._dirs.pop(directory, None)  # not there yet; retried on the next refresh
+                continue
+            self._names.setdefault(wd, set()).update(names)
+
+    def wait(self, timeout: float, wake_fd: int | None = None) -> bool:
+        """Block up to `timeout` seconds (or until `wake_fd` is readable); True if a watched file may have changed."""
+        fds = [self.inotify.fd] + ([wake_fd] if wake_fd is not None else [])
+        ready, _, _ = select.select(fds, [], [], max(0.0, timeout))
+        if self.inotify.fd not in ready:
+            return False
+        relevant = False
+        for wd, mask, name in self.inotify.read():
+            if mask & (IN_Q_OVERFLOW | IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                relevant = True
+            elif name in self._names.get(wd, ()):
+                relevant = True
+        if relevant:
+            self.refresh()
+        return relevant
+
+    def close(self) -> None:
+        self.inotify.close()
+
+
+class PollingWatcher:
+    """Portable fallback: stats the watched files (never the whole certs tree) every `interval`."""
+    backend = "poll"
+
+    def __init__(self, files: List[str], interval: float = 1.0):
+        self.files = files
+        self.interval = interval
+
+    def refresh(self) -> None:
+        pass
+
+    def wait(self, timeout: float, wake_fd: int | None = None) -> bool:
+        timeout = max(0.0, min(timeout, self.interval))
+        if wake_fd is None:
+            time.sleep(timeout)
+        else:
+            select.select([wake_fd], [], [], timeout)
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+def find_mosquitto_pid() -> int | None:
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/comm") as f:
+                if f.read().strip() == "mosquitto":
+                    return int(entry)
+        except OSError:
+            continue
+    return None
+
+
+class ReloadDaemon:
+    """
+    Debounces changes into single reloads: a SIGHUP is sent once the files have been
+    quiet for `debounce` seconds, or at the latest `max_delay` seconds after the first
+    change of a burst. Metrics (reload count, change-to-SIGHUP latency) are written to
+    `metrics_path` after each reload, where the API reads them (GET /monitor/reload).
+
+    Every SIGHUP bumps `generation`. Explicit reload requests (the control server) join
+    the pending burst like a file change and are told the generation that will carry
+    their change; waiters block until that generation has been signalled.
+    """
+
+    def __init__(self, files: List[str], pid: int | None = None, debounce: float = 0.5,
+                 max_delay: float = 3.0, poll_interval: float = 1.0, rescan: float = 30.0,
+                 metrics_path: str | None = DEFAULT_METRICS_PATH, watcher=None):
+        self.files = [os.path.abspath(f) for f in files]
+        self.pid = pid
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.rescan = rescan
+        self.metrics_path = metrics_path
+        if watcher is None:
+            try:
+                watcher = InotifyWatcher(self.files)
+            except OSError as e:
+                print(f"⚠️ inotify unavailable ({e}), polling every {poll_interval}s")
+                watcher = PollingWatcher(self.files, poll_interval)
+        self.watcher = watcher
+        self._lock = threading.Lock()
+        self._reloaded = threading.Condition(self._lock)
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._signatures = self._snapshot()
+        self._pending_since: float | None = None
+        self._last_change: float | None = None
+        self._changed: Set[str] = set()
+        self._running = True
+        self.metrics = {
+            "backend": watcher.backend,
+            "files": self.files,
+            # A (re)started broker has just read every file: that is a generation of its own.
+            # Continue from the last run's number so API callers never see it go backwards.
+            "generation": self._previous_generation() + 1,
+            "reloads": 0,
+            "requests": 0,
+            "failed_reloads": 0,
+            "changes": 0,
+            "last_reload_at": None,
+            "last_latency_ms": None,
+            "avg_latency_ms": None,
+            "max_latency_ms": None,
+            "last_changed": [],
+        }
+
+    @property
+    def generation(self) -> int:
+        return self.metrics["generation"]
+
+    def _previous_generation(self) -> int:
+        try:
+            with open(self.metrics_path, encoding="utf-8") as f:
+                return int(json.load(f).get("generation") or 0)
+        except (TypeError, OSError, ValueError):
+            return 0
+
+    def _snapshot(self) -> Dict[str, tuple | None]:
+        return {path: _stat_signature(path) for path in self.files}
+
+    def _mark_pending(self, now: float) -> None:
+        # caller holds self._lock
+        if self._pending_since is None:
+            self._pending_since = now
+        self._last_change = now
+
+    def check(self, now: float) -> bool:
+        """Compare signatures; a difference starts (or extends) the pending burst."""
+        signatures = self._snapshot()
+        changed = [p for p in self.files if signatures[p] != self._signatures.get(p)]
+        self._signatures = signatures
+        if not changed:
+            return False
+        with self._lock:
+            self._changed.update(changed)
+            self.metrics["changes"] += 1
+            self._mark_pending(now)
+        return True
+
+    def request(self) -> int:
+        """Ask for a reload; returns the generation that will include every change made so far."""
+        with self._lock:
+            self.metrics["requests"] += 1
+            self._mark_pending(time.monotonic())
+            target = self.generation + 1
+        os.write(self._wake_w, b"\0")
+        return target
+
+    def wait_for(self, generation: int, timeout: float) -> bool:
+        """
+        Block until `generation` has been signalled to the broker, or `timeout` elapses.
+        Signalled is all we know: mosquitto does not report when it has re-read its files.
+        """
+        deadline = time.monotonic() + timeout
+        with self._reloaded:
+            while self.generation < generation:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._reloaded.wait(remaining)
+            return True
+
+    def _due(self, now: float) -> float:
+        """Seconds until the pending reload fires."""
+        return min(self._last_change + self.debounce, self._pending_since + self.max_delay) - now
+
+    def reload(self, now: float) -> bool:
+        pid = self.pid or find_mosquitto_pid() or 1
+        with self._lock:
+            latency_ms = (now - self._pending_since) * 1000
+            changed = sorted(self._changed)
+            self._pending_since = self._last_change = None
+            self._changed = set()
+        try:
+            os.kill(pid, signal.SIGHUP)
+        except OSError as e:
+            with self._lock:
+                self.metrics["failed_reloads"] += 1
+                self._mark_pending(now)  # retried after the debounce; waiters keep waiting
+                self._changed.update(changed)
+            print(f"❌ SIGHUP to PID {pid} failed: {e}")
+            self.write_metrics()
+            return False
+        with self._reloaded:
+            m = self.metrics
+            m["generation"] += 1
+            m["reloads"] += 1
+            m["last_reload_at"] = time.time()
+            m["last_latency_ms"] = round(latency_ms, 1)
+            m["max_latency_ms"] = round(max(m["max_latency_ms"] or 0, latency_ms), 1)
+            avg = m["avg_latency_ms"] or 0
+            m["avg_latency_ms"] = round(avg + (latency_ms - avg) / m["reloads"], 1)
+            m["last_changed"] = changed
+            self._reloaded.notify_all()
+        reason = ", ".join(os.path.basename(p) for p in changed) or "reload requested"
+        print(f"🔄 {reason}: SIGHUP sent to PID {pid}, generation {m['generation']} ({latency_ms:.0f} ms)")
+        self.write_metrics()
+        return True
+
+    def write_metrics(self) -> None:
+        if not self.metrics_path:
+            return
+        try:
+            with self._lock:
+                data = json.dumps(self.metrics, indent=2)
+            atomic_write(Path(self.metrics_path), data, mode=0o644)
+        except OSError as e:
+            print(f"⚠️ Could not write reload metrics: {e}")
+
+    def stop(self, *_args) -> None:
+        self._running = False
+        os.write(self._wake_w, b"\0")
+
+    def run(self) -> None:
+        print(f"👁️ Watching ({self.watcher.backend}): {', '.join(self.files)}")
+        self.write_metrics()
+        next_rescan = time.monotonic() + self.rescan
+        while self._running:
+            now = time.monotonic()
+            timeout = self._due(now) if self._pending_since is not None else next_rescan - now
+            if self.watcher.wait(timeout, self._wake_r):
+                self.check(time.monotonic())
+            try:
+                os.read(self._wake_r, 4096)  # drain wake-ups from request()/stop()
+            except BlockingIOError:
+                pass
+            now = time.monotonic()
+            if now >= next_rescan:
+                # Safety net for missed events (e.g. a watched directory created later)
+                self.watcher.refresh()
+                self.check(now)
+                next_rescan = now + self.rescan
+            if self._pending_since is not None and self._due(now) <= 0:
+                self.reload(now)
+        self.watcher.close()
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    """
+    POST /reload                      -> {"generation": N}, the generation carrying the caller's changes
+    GET  /reload?generation=N&timeout -> {"generation": current, "applied": bool}, waits up to timeout
+    GET  /status                      -> reload metrics
+    Requests must carry the X-Reload-Token header.
+    """
+    daemon: ReloadDaemon = None
+    token: str | None = None
+    max_wait = 30.0
+
+    def _send(self, code: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if not self.token or not hmac.compare_digest(self.headers.get("X-Reload-Token", ""), self.token):
+            self._send(401, {"detail": "Invalid reload token."})
+            return False
+        return True
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if urlparse(self.path).path != "/reload":
+            return self._send(404, {"detail": "Not found."})
+        self._send(200, {"generation": self.daemon.request()})
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        if url.path == "/status":
+            with self.daemon._lock:
+                return self._send(200, dict(self.daemon.metrics))
+        if url.path != "/reload":
+            return self._send(404, {"detail": "Not found."})
+        query = parse_qs(url.query)
+        try:
+            generation = int(query["generation"][0])
+            timeout = min(float(query.get("timeout", ["10"])[0]), self.max_wait)
+        except (KeyError, ValueError):
+            return self._send(400, {"detail": "generation (int) is required."})
+        applied = self.daemon.wait_for(generation, timeout)
+        self._send(200, {"generation": self.daemon.generation, "applied": applied})
+
+    def log_message(self, format, *args):
+        pass  # one line per API request would drown the reload log
+
+
+def start_control_server(daemon: ReloadDaemon, host: str, port: int, token: str) -> ThreadingHTTPServer:
+    # Anyone reaching the port could otherwise trigger reloads and read the metrics
+    if not token:
+        raise ValueError("The reload control server requires a token (RELOAD_CONTROL_TOKEN).")
+    handler = type("BoundControlHandler", (ControlHandler,), {"daemon": daemon, "token": token})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="reload-control", daemon=True).start()
+    print(f"🎛️ Reload control listening on {host}:{server.server_address[1]}")
+    return server
+
+
+def main():
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description="Reload mosquitto (SIGHUP) when the files it reads change.")
+    parser.add_argument("files", nargs="*", default=env("RELOAD_WATCH_FILES", ":".join(DEFAULT_FILES)).split(":"),
+                        help="Files to watch (default: RELOAD_WATCH_FILES, colon separated, or the broker's files)")
+    parser.add_argument("--pid", type=int, default=None, help="Mosquitto PID (default: looked up in /proc)")
+    parser.add_argument("--debounce-ms", type=float, default=float(env("RELOAD_DEBOUNCE_MS", 500)), help="Quiet period before reloading")
+    parser.add_argument("--max-delay-ms", type=float, default=float(env("RELOAD_MAX_DELAY_MS", 3000)), help="Reload at the latest this long after the first change")
+    parser.add_argument("--poll-seconds", type=float, default=float(env("RELOAD_POLL_SECONDS", 1)), help="Polling interval without inotify")
+    parser.add_argument("--metrics", default=env("RELOAD_METRICS_PATH", DEFAULT_METRICS_PATH), help="Where to write the reload metrics JSON")
+    parser.add_argument("--poll", action="store_true", help="Force the polling backend")
+    parser.add_argument("--control-host", default=env("RELOAD_CONTROL_HOST", "0.0.0.0"), help="Control server address")
+    parser.add_argument("--control-port", type=int, default=int(env("RELOAD_CONTROL_PORT", 8884)), help="Control server port (0 disables it)")
+    args = parser.parse_args()
+
+    files = [f for f in args.files if f]
+    watcher = PollingWatcher([os.path.abspath(f) for f in files], args.poll_seconds) if args.poll else None
+    daemon = ReloadDaemon(
+        files, args.pid, args.debounce_ms / 1000, args.max_delay_ms / 1000,
+        args.poll_seconds, metrics_path=args.metrics, watcher=watcher
+    )
+    token = env("RELOAD_CONTROL_TOKEN")
+    if args.control_port and not token:
+        print("⚠️ RELOAD_CONTROL_TOKEN is not set: reload control server disabled (the file watcher still reloads the broker)")
+    elif args.control_port:
+        start_control_server(daemon, args.control_host, args.control_port, token)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Critical error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,304 @@
+import argparse
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.ca.authority import get_certificate_authority
+from mosquitto_auth.ca.verifier import verify_certificate
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.fs import atomic_write, file_lock
+
+# certs/broker/
+#   versions/<id>/broker.{crt,key}   every issued pair, never modified after staging
+#   current -> versions/<id>         the only link that changes on rotation
+#   broker.crt -> current/broker.crt, broker.key -> current/broker.key   (paths in mosquitto.conf)
+# All links are relative, so they resolve the same in the API and broker containers.
+# Rotation, rollback and pruning hold file_lock(<broker dir>/current) from staging to pruning.
+VERSIONS_DIR = "versions"
+CURRENT_LINK = "current"
+CERT_NAME = "broker.crt"
+KEY_NAME = "broker.key"
+
+# TLS 1.2 suites each key family can sign the handshake with
+FAMILY_SUITES = {"rsa": ("ECDHE-RSA-", "DHE-RSA-"), "ec": ("ECDHE-ECDSA-",)}
+
+
+class BrokerRotationError(RuntimeError):
+    """The certificate failed verification or cannot be served by the broker; the active one was left untouched."""
+
+
+def _base_path(path: Path) -> Path:
+    # Same resolution as generate_broker_certificate: relative to the project root
+    return Path(__file__).parent.parent.parent / path
+
+
+def broker_base_dir(broker_dir: Path | None = None) -> Path:
+    return _base_path(broker_dir or settings.broker_dir)
+
+
+def _replace_symlink(link: Path, target: str) -> None:
+    """Point `link` at `target` with one rename, so readers see the old or the new target, never neither."""
+    tmp = link.with_name(f".{link.name}.tmp")
+    tmp.unlink(missing_ok=True)
+    os.symlink(target, tmp)
+    os.replace(tmp, link)
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def broker_key_families(conf_path: Path | None = None) -> set[str] | None:
+    """
+    Key families ('rsa', 'ec', 'ed25519') every client the broker accepts can be served,
+    from `ciphers` and `tls_version` in mosquitto.conf. The broker reads them only at
+    startup, so a certificate swapped on SIGHUP must stay within these. None when the
+    config cannot be read.
+    """
+    try:
+        lines = _base_path(conf_path or settings.MOSQUITTO_CONF_PATH).read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    families = set(FAMILY_SUITES)
+    tls_versions = []
+    for line in lines:
+        parts = line.split(None, 1)
+        if len(parts) != 2:
+            continue
+        option, value = parts[0], parts[1].strip()
+        if option == "ciphers":
+            # Several listeners: a family must be served on all of them
+            suites = value.split(":")
+            families &= {f for f, prefixes in FAMILY_SUITES.items() if any(s.startswith(prefixes) for s in suites)}
+        elif option == "tls_version":
+            tls_versions.append(value)
+    if tls_versions and all(v == "tlsv1.3" for v in tls_versions):
+        # tls_version is the minimum; TLS 1.3 negotiates the certificate type apart from the suites
+        return {"rsa", "ec", "ed25519"}
+    # TLS 1.2 clients have no suite for an Ed25519 server certificate
+    return families
+
+
+def check_key_servable(key_type: str, conf_path: Path | None = None) -> None:
+    """Raise BrokerRotationError if the running broker cannot serve a `key_type` certificate."""
+    families = broker_key_families(conf_path)
+    if families is None:
+        print("⚠️ mosquitto.conf not found, broker key type not checked against its ciphers.")
+        return
+    family = x509_lib.key_family(key_type)
+    if family not in families:
+        raise BrokerRotationError(
+            f"The broker cannot serve a certificate with a {key_type} key with its current ciphers/tls_version "
+            f"(serves: {', '.join(sorted(families)) or 'none'}); update mosquitto.conf and restart it first."
+        )
+
+
+def current_version(broker_dir: Path | None = None) -> str | None:
+    current = broker_base_dir(broker_dir) / CURRENT_LINK
+    return Path(os.readlink(current)).name if current.is_symlink() else None
+
+
+def rotation_lock(broker_dir: Path | None = None):
+    """Cross-process lock serializing staging, activation and pruning (API workers and CLIs)."""
+    return file_lock(broker_base_dir(broker_dir) / CURRENT_LINK)
+
+
+def _ensure_layout(root: Path) -> None:
+    """
+    Turn legacy plain broker.crt/broker.key files into the first version, and make sure
+    broker.crt/broker.key are links through `current`.
+    """
+    versions = root / VERSIONS_DIR
+    versions.mkdir(parents=True, exist_ok=True)
+    crt, key = root / CERT_NAME, root / KEY_NAME
+    if crt.exists() and not crt.is_symlink() and key.exists() and not key.is_symlink():
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        legacy = versions / f"{stamp}-legacy"
+        legacy.mkdir()
+        shutil.copy2(crt, legacy / CERT_NAME)
+        shutil.copy2(key, legacy / KEY_NAME)
+        _replace_symlink(root / CURRENT_LINK, f"{VERSIONS_DIR}/{legacy.name}")
+    if (root / CURRENT_LINK).is_symlink():
+        for name in (CERT_NAME, KEY_NAME):
+            if not (root / name).is_symlink():
+                _replace_symlink(root / name, f"{CURRENT_LINK}/{name}")
+
+
+def stage_broker_certificate(cn: str, days: int, key_type: str = x509_lib.DEFAULT_KEY_TYPE,
+                             broker_dir: Path | None = None, ca_cert_path: Path | None = None,
+                             ca_key_path: Path | None = None, san: List[str] | None = None) -> str:
+    """
+    Issue a broker key and certificate into a new version directory and verify them
+    natively (CA chain, validity, serverAuth, SANs, key pair match). Nothing the broker
+    reads is touched; returns the version id to activate. Callers hold the rotation lock.
+    """
+    from mosquitto_auth.broker.generate_broker_certificate import broker_alt_names, validate_ca_files
+
+    check_key_servable(key_type)
+    root = broker_base_dir(broker_dir)
+    ca_cert_path = _base_path(ca_cert_path or settings.ca_cert_path)
+    ca_key_path = _base_path(ca_key_path or settings.ca_key_path)
+    validate_ca_files(ca_key_path, ca_cert_path)
+    _ensure_layout(root)
+    authority = get_certificate_authority(ca_cert_path, ca_key_path)
+
+    san = san if san is not None else broker_alt_names(cn)
+    key = x509_lib.generate_private_key(key_type)
+    cert = authority.sign(key.public_key(), cn, days, x509_lib.PROFILE_SERVER, san)
+    authority.database.record(cert, x509_lib.PROFILE_SERVER)
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    version = f"{stamp}-{format(cert.serial_number, 'x')[:8]}"
+    staged = root / VERSIONS_DIR / version
+    # mosquitto runs as another user in its container and must be able to read the key
+    atomic_write(staged / KEY_NAME, x509_lib.key_to_pem(key), mode=0o644)
+    atomic_write(staged / CERT_NAME, x509_lib.cert_to_pem(cert), mode=0o644)
+
+    try:
+        verify_version(version, cn, broker_dir, ca_cert_path)
+    except BrokerRotationError:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    return version
+
+
+def verify_version(version: str, cn: str | None = None, broker_dir: Path | None = None,
+                   ca_cert_path: Path | None = None) -> dict:
+    """Verify a staged version from disk, exactly as the broker would load it."""
+    staged = broker_base_dir(broker_dir) / VERSIONS_DIR / version
+    try:
+        cert = x509_lib.load_certificate((staged / CERT_NAME).read_bytes())
+        key = x509_lib.load_private_key((staged / KEY_NAME).read_bytes())
+        ca_cert = x509_lib.load_certificate(_base_path(ca_cert_path or settings.ca_cert_path).read_bytes())
+    except Exception as e:
+        raise BrokerRotationError(f"Version '{version}' cannot be loaded: {e}")
+    hostnames = [cn or settings.BROKER_CN] if (cn or settings.BROKER_CN) else []
+    result = verify_certificate(cert, ca_cert, x509_lib.PROFILE_SERVER, hostnames=hostnames)
+    if result["status"] != "OK":
+        raise BrokerRotationError(
+            f"Version '{version}' failed verification: " + "; ".join(f"{e['tag']} {e['description']}" for e in result["errors"])
+        )
+    if key.public_key() != cert.public_key():
+        raise BrokerRotationError(f"Version '{version}': private key does not match the certificate.")
+    return result
+
+
+def activate_broker_version(version: str, broker_dir: Path | None = None) -> str | None:
+    """
+    Make `version` the active pair with a single rename of the `current` link; key and
+    certificate switch together, so a reload can never see a mismatched pair. The file
+    watcher sees one change and reloads the broker once. Returns the previous version.
+    Callers hold the rotation lock.
+    """
+    root = broker_base_dir(broker_dir)
+    cert_path = root / VERSIONS_DIR / version / CERT_NAME
+    if not cert_path.exists():
+        raise FileNotFoundError(f"Broker certificate version '{version}' not found.")
+    check_key_servable(x509_lib.key_type_of(x509_lib.load_certificate(cert_path.read_bytes()).public_key()))
+    _ensure_layout(root)
+    previous = current_version(broker_dir)
+    _replace_symlink(root / CURRENT_LINK, f"{VERSIONS_DIR}/{version}")
+    _ensure_layout(root)
+    _fsync_dir(root)
+    prune_broker_versions(broker_dir)
+    return previous
+
+
+def rotate_broker_certificate(cn: str, days: int, key_type: str = x509_lib.DEFAULT_KEY_TYPE,
+                              broker_dir: Path | None = None, ca_cert_path: Path | None = None,
+                              ca_key_path: Path | None = None) -> dict:
+    """Stage, verify and activate a new broker certificate; the old one stays available for rollback."""
+    with rotation_lock(broker_dir):
+        version = stage_broker_certificate(cn, days, key_type, broker_dir, ca_cert_path, ca_key_path)
+        previous = activate_broker_version(version, broker_dir)
+    print(f"🔁 Broker certificate rotated: {previous or '(none)'} -> {version}")
+    return {"version": version, "previous": previous}
+
+
+def rollback_broker_certificate(version: str | None = None, broker_dir: Path | None = None) -> dict:
+    """Re-activate `version`, or the version activated before the current one."""
+    with rotation_lock(broker_dir):
+        if version is None:
+            current = current_version(broker_dir)
+            older = [v["version"] for v in list_broker_versions(broker_dir) if v["version"] != current]
+            candidates = [v for v in older if v < (current or "")]
+            if not candidates:
+                raise FileNotFoundError("No previous broker certificate version to roll back to.")
+            version = candidates[-1]
+        elif version not in {v["version"] for v in list_broker_versions(broker_dir)}:
+            raise FileNotFoundError(f"Broker certificate version '{version}' not found.")
+        verify_version(version, broker_dir=broker_dir)
+        previous = activate_broker_version(version, broker_dir)
+    print(f"⏪ Broker certificate rolled back: {previous} -> {version}")
+    return {"version": version, "previous": previous}
+
+
+def list_broker_versions(broker_dir: Path | None = None) -> List[dict]:
+    """Every staged version, oldest first."""
+    root = broker_base_dir(broker_dir)
+    current = current_version(broker_dir)
+    versions = []
+    try:
+        entries = sorted(p for p in (root / VERSIONS_DIR).iterdir() if p.is_dir())
+    except FileNotFoundError:
+        return []
+    for path in entries:
+        info = {"version": path.name, "current": path.name == current, "serial": None, "not_after": None, "key_type": None}
+        try:
+            cert = x509_lib.load_certificate((path / CERT_NAME).read_bytes())
+            info.update(
+                serial=format(cert.serial_number, "x"),
+                not_after=cert.not_valid_after_utc,
+                key_type=x509_lib.key_type_of(cert.public_key()),
+            )
+        except Exception:
+            pass
+        versions.append(info)
+    return versions
+
+
+def prune_broker_versions(broker_dir: Path | None = None, keep: int | None = None) -> List[str]:
+    """
+    Delete the oldest versions beyond `keep` (BROKER_CERT_KEEP_VERSIONS); the active one
+    is never removed. Callers hold the rotation lock.
+    """
+    keep = settings.BROKER_CERT_KEEP_VERSIONS if keep is None else keep
+    root = broker_base_dir(broker_dir)
+    versions = [v["version"] for v in list_broker_versions(broker_dir) if not v["current"]]
+    removed = versions[:max(0, len(versions) - max(0, keep - 1))]
+    for version in removed:
+        shutil.rmtree(root / VERSIONS_DIR / version, ignore_errors=True)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotate the MQTT broker certificate with a staged, atomic swap.")
+    parser.add_argument("--cn", type=str, help="Common Name (IP or domain)", default=None)
+    parser.add_argument("--days", type=int, default=365, help="Validity in days")
+    parser.add_argument("--key-type", choices=x509_lib.KEY_TYPES, default=x509_lib.DEFAULT_KEY_TYPE, help=f"Key algorithm (default: {x509_lib.DEFAULT_KEY_TYPE})")
+    parser.add_argument("--list", action="store_true", help="List the staged versions")
+    parser.add_argument("--rollback", nargs="?", const="", default=None, metavar="VERSION", help="Re-activate VERSION (default: the previous one)")
+    args = parser.parse_args()
+
+    if args.list:
+        for v in list_broker_versions():
+            print(f"{'*' if v['current'] else ' '} {v['version']}  serial={v['serial']}  notAfter={v['not_after']}  {v['key_type']}")
+    elif args.rollback is not None:
+        rollback_broker_certificate(args.rollback or None)
+    else:
+        cn = args.cn or settings.BROKER_CN
+        if not cn:
+            raise ValueError("Common Name (CN) not specified and BROKER_CN not configured")
+        rotate_broker_certificate(cn, args.days, args.key_type)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Critical error: {str(e)}")
@@ -1,16 +1,8 @@
-import subprocess
 from pathlib import Path
 import argparse
-from datetime import datetime
 from mosquitto_auth.api.core.config import settings
-
-
-def run_cmd_capture(cmd: list[str]) -> str:
-    try:
-        result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        return f"[ERROR]: {' '.join(cmd)}\n{e.output or str(e)}"
+from mosquitto_auth.ca.verifier import verify_certificate_file, openssl_date
+from mosquitto_auth.lib.x509 import PROFILE_SERVER
 
 
 def verify_broker_certificate(cert_path: Path = None, ca_cert_path: Path = None) -> dict:
@@ -24,60 +16,40 @@ def verify_broker_certificate(cert_path: Path = None, ca_cert_path: Path = None)
     if not cert_path.exists():
         return {"status": "ERROR", "message": f"❌ Certificate not found: {cert_path}"}
 
+    # Clients connect to BROKER_CN, so it must be covered by the SANs
+    hostnames = [settings.BROKER_CN] if settings.BROKER_CN else []
+    result = verify_certificate_file(cert_path, ca_cert_path, PROFILE_SERVER, hostnames=hostnames)
+
     result_data = {
         "cert_path": str(cert_path),
         "ca_cert_path": str(ca_cert_path),
-        "valid_until": None,
-        "ca_verified": False,
-        "san_list": [],
-        "key_usage_valid": False,
-        "extended_key_usage_valid": False,
+        "valid_until": openssl_date(result["valid_until"]),
+        "ca_verified": result["ca_verified"],
+        "san_list": result["san"],
+        "key_usage_valid": result["key_usage_valid"],
+        "extended_key_usage_valid": result["extended_key_usage_valid"],
         "status": "FAIL",
+        "errors": result["errors"],
         "messages": []
     }
 
-    result = run_cmd_capture(["openssl", "x509", "-enddate", "-noout", "-in", str(cert_path)])
-    if "notAfter=" in result:
-        end_date_str = result.strip().split("=")[1]
-        result_data["valid_until"] = end_date_str
-        result_data["messages"].append(f"📅 Certificate validity: {end_date_str}")
-
-    result = run_cmd_capture(["openssl", "verify", "-CAfile", str(ca_cert_path), str(cert_path)])
-    if "OK" in result:
-        result_data["ca_verified"] = True
+    if result_data["valid_until"]:
+        result_data["messages"].append(f"📅 Certificate validity: {result_data['valid_until']}")
+    if result["ca_verified"]:
         result_data["messages"].append("✅ Certificate signed by CA confirmed")
-    else:
-        result_data["messages"].append(f"❌ CA verification failed:\n{result}")
-
-    result = run_cmd_capture(["openssl", "x509", "-in", str(cert_path), "-text", "-noout"])
-
-    if "Subject Alternative Name" in result:
-        san_section = result.split("Subject Alternative Name:")[1].split("X509v3")[0]
-        san_lines = [line.strip() for line in san_section.splitlines() if line.strip()]
-        result_data["san_list"] = san_lines
+    if result["san"] and result["san_valid"]:
         result_data["messages"].append("✅ Subject Alternative Names (SANs) present")
-    else:
+    elif not result["san"]:
         result_data["messages"].append("❌ SANs not found")
-
-    if "Digital Signature" in result and "Key Encipherment" in result:
-        result_data["key_usage_valid"] = True
-        result_data["messages"].append("✅ Correct Key Usage (digitalSignature, keyEncipherment)")
-    else:
-        result_data["messages"].append("❌ Incorrect Key Usage")
-
-    if "TLS Web Server Authentication" in result:
-        result_data["extended_key_usage_valid"] = True
+    if result["key_usage_valid"]:
+        result_data["messages"].append("✅ Correct Key Usage")
+    if result["extended_key_usage_valid"]:
         result_data["messages"].append("✅ Correct Extended Key Usage (serverAuth)")
-    else:
-        result_data["messages"].append("❌ Incorrect Extended Key Usage")
+    for error in result["errors"]:
+        detail = f" ({error['detail']})" if error["detail"] else ""
+        result_data["messages"].append(f"❌ {error['tag']} {error['description']}{detail}")
 
-    if (
-        result_data["valid_until"]
-        and result_data["ca_verified"]
-        and result_data["key_usage_valid"]
-        and result_data["extended_key_usage_valid"]
-        and result_data["san_list"]
-    ):
+    if result["status"] == "OK" and result_data["san_list"]:
         result_data["status"] = "OK"
         result_data["messages"].append("✅ All verifications passed successfully!")
 
@@ -100,4 +72,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
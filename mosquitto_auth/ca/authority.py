@@ -0,0 +1,94 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+from mosquitto_auth.ca.database import CertificateDatabase
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.fs import atomic_write
+
+CA_INDEX_NAME = "ca_index.ndjson"
+
+
+class CertificateAuthority:
+    """
+    In-process issuer bound to the CA key/certificate on disk.
+
+    The CA key is parsed once and reused for every issuance; it is reloaded only
+    when either file changes (mtime, size, inode), e.g. after POST /ca. Every signed
+    certificate gets a serial from, and an entry in, the CA database kept next to
+    the CA certificate.
+    """
+
+    def __init__(self, cert_path: Path, key_path: Path):
+        self.cert_path = Path(cert_path)
+        self.key_path = Path(key_path)
+        self.database = CertificateDatabase(self.cert_path.with_name(CA_INDEX_NAME))
+        self._lock = threading.Lock()
+        self._signature = None
+        self._key = None
+        self._cert = None
+
+    def _stat_signature(self):
+        try:
+            cert_st, key_st = os.stat(self.cert_path), os.stat(self.key_path)
+        except FileNotFoundError:
+            return None
+        return tuple((st.st_mtime_ns, st.st_size, st.st_ino) for st in (cert_st, key_st))
+
+    def exists(self) -> bool:
+        return self.cert_path.exists() and self.key_path.exists()
+
+    def load(self):
+        """Return (ca_key, ca_cert), re-reading them only if the files changed."""
+        with self._lock:
+            signature = self._stat_signature()
+            if signature is None:
+                raise FileNotFoundError(f"CA files not found in '{self.cert_path}' or '{self.key_path}'. Generate CA first!")
+            if signature != self._signature:
+                self._key = x509_lib.load_private_key(self.key_path.read_bytes())
+                self._cert = x509_lib.load_certificate(self.cert_path.read_bytes())
+                self._signature = signature
+            return self._key, self._cert
+
+    def issue(self, cn: str, days: int, profile: str = x509_lib.PROFILE_CLIENT,
+              san: Iterable[str] = (), key_type: str = x509_lib.DEFAULT_KEY_TYPE,
+              key=None) -> Tuple[bytes, bytes]:
+        """
+        Sign a certificate in memory for `key` (generated here when not given, e.g. from
+        the key pool); returns (key_pem, cert_pem).
+        """
+        if key is None:
+            key = x509_lib.generate_private_key(key_type)
+        cert = self.sign(key.public_key(), cn, days, profile, san)
+        self.database.record(cert, profile)
+        return x509_lib.key_to_pem(key), x509_lib.cert_to_pem(cert)
+
+    def sign(self, public_key, cn: str, days: int, profile: str = x509_lib.PROFILE_CLIENT,
+             san: Iterable[str] = ()):
+        """Sign a certificate with a freshly allocated serial. The caller records it in `database`."""
+        ca_key, ca_cert = self.load()
+        serial = self.database.allocate_serial()
+        return x509_lib.build_leaf_certificate(ca_key, ca_cert, public_key, cn, days, profile, san, serial)
+
+    def issue_to_files(self, cn: str, days: int, key_path: Path, cert_path: Path,
+                       profile: str = x509_lib.PROFILE_CLIENT, san: Iterable[str] = (),
+                       key_type: str = x509_lib.DEFAULT_KEY_TYPE, key=None,
+                       key_mode: int = 0o600, cert_mode: int = 0o644) -> Tuple[Path, Path]:
+        key_pem, cert_pem = self.issue(cn, days, profile, san, key_type, key)
+        atomic_write(key_path, key_pem, mode=key_mode)
+        atomic_write(cert_path, cert_pem, mode=cert_mode)
+        return Path(cert_path), Path(key_path)
+
+
+_authorities: Dict[Tuple[str, str], CertificateAuthority] = {}
+_authorities_lock = threading.Lock()
+
+
+def get_certificate_authority(cert_path: Path, key_path: Path) -> CertificateAuthority:
+    """Shared CertificateAuthority per (cert, key) pair, so the parsed key is reused across calls."""
+    key = (str(Path(cert_path).resolve()), str(Path(key_path).resolve()))
+    with _authorities_lock:
+        authority = _authorities.get(key)
+        if authority is None:
+            authority = _authorities[key] = CertificateAuthority(cert_path, key_path)
+        return authority
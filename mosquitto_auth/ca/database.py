@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+from cryptography import x509
+from mosquitto_auth.lib.fs import file_lock
+from mosquitto_auth.lib import x509 as x509_lib
+
+
+# Revocations are appended to the same index as {"event": "revoke", "serial", "revoked_at", "reason"}
+EVENT_REVOKE = "revoke"
+
+
+def certificate_record(cert: x509.Certificate, profile: str | None = None) -> dict:
+    """Index entry for an issued certificate; serials are lowercase hex."""
+    cn = cert.subject.get_attributes_for_oid(x509.oid.NameOID.COMMON_NAME)
+    return {
+        "serial": format(cert.serial_number, "x"),
+        "cn": cn[0].value if cn else "",
+        "not_before": cert.not_valid_before_utc.isoformat(),
+        "not_after": cert.not_valid_after_utc.isoformat(),
+        "fingerprint": x509_lib.fingerprint(cert),
+        "key_type": x509_lib.key_type_of(cert.public_key()),
+        "profile": profile,
+        "issued_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class CertificateDatabase:
+    """
+    Append-only NDJSON index of every certificate the CA has issued, and of the
+    revocations of those certificates.
+
+    Appends take a cross-process file_lock on the index, so API workers and
+    bulk issuance processes can record concurrently. Readers keep the parsed index
+    in memory and only read the bytes appended since their last refresh.
+    """
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        self._lock = threading.Lock()
+        self._records: List[dict] = []
+        self._by_serial: Dict[str, dict] = {}
+        self._by_cn: Dict[str, List[dict]] = {}
+        self._revocations: List[dict] = []
+        self._offset = 0
+        self._inode = None
+        self._reserved: set[str] = set()
+        self.generation = 0  # bumped whenever the index is read from scratch
+
+    def _reset(self) -> None:
+        self._records, self._by_serial, self._by_cn, self._revocations = [], {}, {}, []
+        self._offset, self._inode = 0, None
+        self.generation += 1
+
+    def _apply(self, record: dict) -> None:
+        if record.get("event") == EVENT_REVOKE:
+            issued = self._by_serial.get(record["serial"])
+            if issued is not None and "revoked_at" not in issued:
+                issued["revoked_at"] = record["revoked_at"]
+                issued["revocation_reason"] = record["reason"]
+                self._revocations.append(record)
+            return
+        self._records.append(record)
+        self._by_serial[record["serial"]] = record
+        self._by_cn.setdefault(record["cn"], []).append(record)
+
+    def _refresh(self) -> None:
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._reset()
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._reset()  # replaced (new CA) or truncated: read from scratch
+            self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        end = data.rfind(b"\n") + 1  # leave a partially written last line for the next refresh
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self._offset += end
+
+    def allocate_serial(self) -> int:
+        """
+        Random 159-bit serial (positive, fits RFC 5280's 20 octets) not used by any indexed
+        or in-flight certificate. Collisions across processes are 2^-159 unlikely.
+        """
+        with self._lock:
+            self._refresh()
+            while True:
+                serial = x509.random_serial_number()
+                key = format(serial, "x")
+                if key not in self._by_serial and key not in self._reserved:
+                    self._reserved.add(key)
+                    return serial
+
+    def record_many(self, certs: Iterable[x509.Certificate], profile: str | None = None) -> List[dict]:
+        """Append index entries for issued certificates in one locked, fsynced write."""
+        records = [certificate_record(cert, profile) for cert in certs]
+        if not records:
+            return records
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, file_lock(self.index_path):
+            fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            for record in records:
+                self._reserved.discard(record["serial"])
+            self._refresh()
+        return records
+
+    def record(self, cert: x509.Certificate, profile: str | None = None) -> dict:
+        return self.record_many([cert], profile)[0]
+
+    def revoke_many(self, serials: Iterable[Tuple[str, str]]) -> Tuple[Dict[str, dict], Dict[str, dict], Dict[str, str]]:
+        """
+        Record revocations of (serial, reason) pairs in one locked, fsynced append.
+        Returns (revoked now, already revoked, errors), each keyed by normalized serial.
+        """
+        revoked: Dict[str, dict] = {}
+        already: Dict[str, dict] = {}
+        errors: Dict[str, str] = {}
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, file_lock(self.index_path):
+            self._refresh()
+            revoked_at = datetime.now(timezone.utc).isoformat()
+            events = []
+            for serial, reason in serials:
+                serial = serial.lower().lstrip("0") or "0"
+                issued = self._by_serial.get(serial)
+                if issued is None:
+                    errors[serial] = "Serial was not issued by this CA."
+                elif "revoked_at" in issued:
+                    already[serial] = {
+                        "event": EVENT_REVOKE, "serial": serial,
+                        "revoked_at": issued["revoked_at"], "reason": issued["revocation_reason"]
+                    }
+                elif serial not in revoked:
+                    event = {"event": EVENT_REVOKE, "serial": serial, "revoked_at": revoked_at, "reason": reason}
+                    events.append(event)
+                    revoked[serial] = event
+            if events:
+                fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, "".join(json.dumps(event) + "\n" for event in events).encode("utf-8"))
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                self._refresh()
+        return revoked, already, errors
+
+    def revocations(self, start: int = 0, generation: int | None = None) -> Tuple[int, List[dict]]:
+        """
+        Revocation records in the order they were made, from the `start`-th one (from the
+        first when the index was replaced since `generation`). Returns (generation, records).
+        """
+        with self._lock:
+            self._refresh()
+            if generation is not None and generation != self.generation:
+                start = 0
+            return self.generation, self._revocations[start:]
+
+    def get(self, serial: str) -> dict | None:
+        with self._lock:
+            self._refresh()
+            return self._by_serial.get(serial.lower().lstrip("0") or "0")
+
+    def by_cn(self, cn: str) -> List[dict]:
+        """Every certificate issued to `cn`, oldest first."""
+        with self._lock:
+            self._refresh()
+            return list(self._by_cn.get(cn, ()))
+
+    def entries(self) -> List[dict]:
+        with self._lock:
+            self._refresh()
+            return list(self._records)
+
+    def tail(self, start: int, generation: int) -> Tuple[int, List[dict]]:
+        """
+        Records appended since a reader had seen `start` of them in `generation`; every
+        record (from 0) when the index was replaced since. Returns (generation, records).
+        """
+        with self._lock:
+            self._refresh()
+            if generation != self.generation:
+                start = 0
+            return self.generation, self._records[start:]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._records)
+
+    def archive(self) -> Path | None:
+        """Move the index aside (e.g. when a new CA is generated); returns the archived path."""
+        with self._lock, file_lock(self.index_path):
+            if not self.index_path.exists():
+                return None
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            archived = self.index_path.with_name(f"{self.index_path.name}.{stamp}")
+            os.replace(self.index_path, archived)
+            self._reset()
+            return archived
@@ -1,6 +1,11 @@
 import argparse
-import subprocess
 from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.ca.authority import CA_INDEX_NAME
+from mosquitto_auth.ca.database import CertificateDatabase
+from mosquitto_auth.ca.revocation import CRL_STATE_NAME, get_crl_publisher
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.fs import atomic_write
+
 
 def create_initial_cert_paths() -> bool:
     certs_dir = settings.certs_dir
@@ -10,37 +15,47 @@ def create_initial_cert_paths() -> bool:
     return True
   
 
-def generate_ca(cn: str = "ROOT_BROKER_CA", days: int = 3650) -> dict:
+def generate_ca(cn: str = "ROOT_BROKER_CA", days: int = 3650, key_type: str = x509_lib.DEFAULT_CA_KEY_TYPE) -> dict:
     certs_dir = settings.certs_dir
     certs_dir.mkdir(exist_ok=True)
 
     ca_key = certs_dir / "ca.key"
     ca_crt = certs_dir / "ca.crt"
-    ca_srl = certs_dir / "ca.srl"
+    ca_index = certs_dir / CA_INDEX_NAME
 
-    print("🔐 Generating CA private key...")
-    subprocess.run([
-        "openssl", "genrsa", "-out", str(ca_key), "4096"
-    ], check=True)
+    print(f"🔐 Generating CA private key ({key_type})...")
+    key = x509_lib.generate_private_key(key_type)
 
     print(f"📜 Generating self-signed CA certificate with CN={cn} and validity of {days} days...")
-    subprocess.run([
-        "openssl", "req", "-x509", "-new", "-nodes", "-key", str(ca_key),
-        "-sha256", "-days", str(days), "-out", str(ca_crt),
-        "-subj", f"/CN={cn}"
-    ], check=True)
+    cert = x509_lib.build_self_signed_ca(key, cn, days)
+
+    atomic_write(ca_key, x509_lib.key_to_pem(key), mode=0o600)
+    atomic_write(ca_crt, x509_lib.cert_to_pem(cert), mode=0o644)
+
+    # Certificates issued by the previous CA do not belong in the new CA's database
+    archived = CertificateDatabase(ca_index).archive()
+    if archived:
+        print(f"🗄️ Previous CA database archived to {archived}")
+
+    # An empty CRL from the start, so mosquitto's crlfile can point at it before any revocation
+    (certs_dir / CRL_STATE_NAME).unlink(missing_ok=True)
+    crl = get_crl_publisher().publish()
 
     print("✅ CA successfully generated at:")
     print(f"  - {ca_key}")
     print(f"  - {ca_crt}")
-    print(f"  - {ca_srl} (will be created when signing certificates)")
+    print(f"  - {ca_index} (CA database, written when certificates are issued)")
+    print(f"  - {settings.crl_path} (CRL #{crl['crl_number']})")
 
     return {
         "ca_key": str(ca_key),
         "ca_crt": str(ca_crt),
-        "ca_srl": str(ca_srl),
+        "ca_srl": None,
+        "ca_index": str(ca_index),
+        "crl": str(settings.crl_path),
         "common_name": cn,
-        "valid_days": days
+        "valid_days": days,
+        "key_type": key_type
     }
 
 
@@ -48,9 +63,10 @@ def main():
     parser = argparse.ArgumentParser(description="Generate Certificate Authority (CA) certificate.")
     parser.add_argument("--cn", type=str, default="ROOT_BROKER_CA", help="Common Name (CN) for the CA certificate (default: ROOT_BROKER_CA)")
     parser.add_argument("--days", type=int, default=3650, help="Certificate validity in days (default: 3650)")
+    parser.add_argument("--key-type", choices=x509_lib.KEY_TYPES, default=x509_lib.DEFAULT_CA_KEY_TYPE, help=f"Key algorithm (default: {x509_lib.DEFAULT_CA_KEY_TYPE})")
     args = parser.parse_args()
 
-    generate_ca(args.cn, args.days)
+    generate_ca(args.cn, args.days, args.key_type)
 
 if __name__ == "__main__":
     main()
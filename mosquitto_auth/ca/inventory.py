@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+from cryptography import x509
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.lib import x509 as x509_lib
+
+KIND_CLIENT = "client"
+KIND_BROKER = "broker"
+
+
+@dataclass
+class CertificateInfo:
+    name: str  # client directory name, or "broker"
+    kind: str
+    path: str
+    cn: str | None = None
+    serial: str | None = None
+    not_before: datetime | None = None
+    not_after: datetime | None = None
+    key_type: str | None = None
+    fingerprint: str | None = None
+    ca_verified: bool | None = None
+    error: str | None = None
+    # parsed certificate, kept for re-verification when the CA changes
+    _cert: x509.Certificate | None = field(default=None, repr=False)
+
+    @property
+    def certificate(self) -> x509.Certificate | None:
+        return self._cert
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+
+
+def _stat_signature(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class CertificateInventory:
+    """
+    Parsed metadata of every certificate under certs/client/<cn>/<cn>.crt plus the
+    broker certificate. A file is parsed again only when its (mtime, size, inode)
+    changes, and CA verification is redone only when the CA certificate changes, so a
+    refresh over 100k clients costs one stat per file and no processes.
+    Directory scans are throttled to `min_interval` seconds unless marked dirty.
+    """
+
+    def __init__(self, client_dir: Path, broker_cert: Path, ca_cert: Path, min_interval: float = 5.0):
+        self.client_dir = Path(client_dir)
+        self.broker_cert = Path(broker_cert)
+        self.ca_cert_path = Path(ca_cert)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[tuple, CertificateInfo]] = {}  # path -> (stat signature, info)
+        self._clients: List[str] = []  # sorted client names
+        self._broker: CertificateInfo | None = None
+        self._ca_signature = None
+        self._ca_cert: x509.Certificate | None = None
+        self._scanned_at = 0.0
+        self._dirty = True
+
+    def mark_dirty(self) -> None:
+        """Force a rescan on the next query (called after issuing or deleting certificates)."""
+        self._dirty = True
+
+    def _verify(self, info: CertificateInfo) -> None:
+        if info._cert is None or self._ca_cert is None:
+            info.ca_verified = None
+            return
+        try:
+            info._cert.verify_directly_issued_by(self._ca_cert)
+            info.ca_verified = True
+        except Exception:
+            info.ca_verified = False
+
+    def _load(self, name: str, kind: str, path: str) -> CertificateInfo:
+        info = CertificateInfo(name=name, kind=kind, path=path)
+        try:
+            with open(path, "rb") as f:
+                cert = x509_lib.load_certificate(f.read())
+            cn = cert.subject.get_attributes_for_oid(x509.oid.NameOID.COMMON_NAME)
+            info.cn = cn[0].value if cn else None
+            info.serial = format(cert.serial_number, "x")
+            info.not_before = cert.not_valid_before_utc
+            info.not_after = cert.not_valid_after_utc
+            info.key_type = x509_lib.key_type_of(cert.public_key())
+            info.fingerprint = x509_lib.fingerprint(cert)
+            info._cert = cert
+        except Exception as e:
+            info.error = str(e)
+        self._verify(info)
+        return info
+
+    def _cached(self, name: str, kind: str, path: str, signature, entries: dict) -> CertificateInfo:
+        cached = self._entries.get(path)
+        info = cached[1] if cached is not None and cached[0] == signature else self._load(name, kind, path)
+        entries[path] = (signature, info)
+        return info
+
+    def _refresh_ca(self) -> bool:
+        signature = _stat_signature(str(self.ca_cert_path))
+        if signature == self._ca_signature:
+            return False
+        try:
+            self._ca_cert = x509_lib.load_certificate(self.ca_cert_path.read_bytes()) if signature else None
+        except Exception:
+            self._ca_cert = None
+        self._ca_signature = signature
+        return True
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and not self._dirty and time.monotonic() - self._scanned_at < self.min_interval:
+                return
+            self._dirty = False
+            ca_changed = self._refresh_ca()
+            entries: Dict[str, Tuple[tuple, CertificateInfo]] = {}
+            clients: List[str] = []
+            try:
+                with os.scandir(self.client_dir) as it:
+                    for entry in it:
+                        if not entry.is_dir():
+                            continue
+                        path = os.path.join(entry.path, f"{entry.name}.crt")
+                        signature = _stat_signature(path)
+                        if signature is None:
+                            continue
+                        self._cached(entry.name, KIND_CLIENT, path, signature, entries)
+                        clients.append(entry.name)
+            except FileNotFoundError:
+                pass
+            broker_path = str(self.broker_cert)
+            broker_signature = _stat_signature(broker_path)
+            self._broker = (
+                self._cached(KIND_BROKER, KIND_BROKER, broker_path, broker_signature, entries)
+                if broker_signature else None
+            )
+            if ca_changed:
+                for _, info in entries.values():
+                    self._verify(info)
+            clients.sort()
+            self._entries, self._clients = entries, clients
+            self._scanned_at = time.monotonic()
+
+    def get(self, name: str) -> CertificateInfo | None:
+        self.refresh()
+        path = os.path.join(self.client_dir, name, f"{name}.crt")
+        cached = self._entries.get(path)
+        return cached[1] if cached else None
+
+    def broker(self) -> CertificateInfo | None:
+        self.refresh()
+        return self._broker
+
+    def snapshot(self) -> Tuple[List[CertificateInfo], x509.Certificate | None]:
+        """Every client certificate (sorted by name) and the CA they were verified against."""
+        self.refresh()
+        with self._lock:
+            clients, entries, ca_cert = self._clients, self._entries, self._ca_cert
+        return [entries[os.path.join(self.client_dir, name, f"{name}.crt")][1] for name in clients], ca_cert
+
+    def query(self, expires_before: datetime | None = None, key_type: str | None = None,
+              prefix: str = "", cursor: str | None = None, limit: int | None = None,
+              ca_verified: bool | None = None) -> Tuple[List[CertificateInfo], str | None, int]:
+        """
+        Client certificates matching every given filter, by name; returns (page,
+        next_cursor, total matching). `cursor` is the last name of the previous page.
+        """
+        self.refresh()
+        with self._lock:
+            clients, entries = self._clients, self._entries
+        lo = bisect_left(clients, prefix)
+        hi = bisect_left(clients, prefix + "\U0010ffff") if prefix else len(clients)
+        page: List[CertificateInfo] = []
+        total, next_cursor = 0, None
+        for name in clients[lo:hi]:
+            info = entries[os.path.join(self.client_dir, name, f"{name}.crt")][1]
+            if expires_before is not None and (info.not_after is None or info.not_after >= expires_before):
+                continue
+            if key_type is not None and info.key_type != key_type:
+                continue
+            if ca_verified is not None and info.ca_verified is not ca_verified:
+                continue
+            total += 1
+            if cursor is not None and name <= cursor:
+                continue
+            if limit is None or len(page) < limit:
+                page.append(info)
+            elif next_cursor is None:
+                next_cursor = page[-1].name
+        return page, next_cursor, total
+
+certificate_inventory = CertificateInventory(
+    settings.client_certs_dir, settings.broker_cert_path, settings.ca_cert_path,
+    settings.CERT_INVENTORY_REFRESH_SECONDS
+)
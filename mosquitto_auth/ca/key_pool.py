@@ -0,0 +1,218 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Dict, List
+from cryptography.hazmat.primitives import serialization
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.fs import try_file_lock
+
+# Keys generated per worker round-trip; small enough to keep the pool responsive to other key types
+REFILL_BATCH_SIZE = 4
+# Refill only once issuance has been quiet this long, so key generation never competes with a burst for CPU
+REFILL_IDLE_SECONDS = 0.5
+# Only one API worker runs the pool (lock file next to the CA: key_pool.lock); the others retry this often
+KEY_POOL_LOCK_NAME = "key_pool"
+OWNER_RETRY_SECONDS = 30.0
+
+
+def _generate_keys(key_type: str, count: int) -> List[bytes]:
+    """Runs in the refill processes; keys travel back as unencrypted PKCS#8 DER."""
+    return [
+        x509_lib.generate_private_key(key_type).private_bytes(
+            serialization.Encoding.DER, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        for _ in range(count)
+    ]
+
+
+class _TypeStats:
+    __slots__ = ("hits", "misses", "generated", "generate_seconds", "last_refill_at")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.generate_seconds = 0.0
+        self.last_refill_at: float | None = None
+
+
+class KeyPool:
+    """
+    Bounded in-memory pool of pre-generated private keys, one queue per key type.
+
+    `acquire` pops a ready key (a hit) or generates one inline (a miss), so callers
+    never wait on the pool. While the API runs, `run` keeps every queue topped up to
+    its target size from a dedicated process pool, pausing while keys are being
+    acquired so refills run when issuance is idle. Keys are only held in memory and
+    never written to disk; they are lost, not leaked, on restart.
+
+    With several uvicorn workers only the one holding the key pool lock refills, so
+    the configured sizes and KEY_POOL_WORKERS hold for the whole API; the other
+    workers generate inline (misses) and take over if the owner exits.
+    """
+
+    def __init__(self, sizes: Dict[str, int] | None = None, workers: int = 1):
+        self.sizes = {k: v for k, v in (sizes or {}).items() if v > 0}
+        for key_type in self.sizes:
+            if key_type not in x509_lib.KEY_TYPES:
+                raise ValueError(f"Invalid key type '{key_type}'. Choose one of: {', '.join(x509_lib.KEY_TYPES)}")
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._keys: Dict[str, Deque[bytes]] = {k: deque() for k in self.sizes}
+        self._stats: Dict[str, _TypeStats] = {k: _TypeStats() for k in x509_lib.KEY_TYPES}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._started_at: float | None = None
+        self._last_acquire = 0.0
+        self._owner_fd: int | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def depth(self, key_type: str) -> int:
+        with self._lock:
+            keys = self._keys.get(key_type)
+            return len(keys) if keys is not None else 0
+
+    def acquire(self, key_type: str = x509_lib.DEFAULT_KEY_TYPE):
+        """Return a private key of `key_type`, from the pool when one is ready."""
+        der = None
+        with self._lock:
+            self._last_acquire = time.monotonic()
+            keys = self._keys.get(key_type)
+            stats = self._stats.get(key_type)
+            if keys:
+                der = keys.popleft()
+                stats.hits += 1
+            elif stats is not None:
+                stats.misses += 1
+        if key_type in self.sizes:
+            self._notify()
+        if der is None:
+            return x509_lib.generate_private_key(key_type)
+        # The key was generated by our own workers: skip the (slow) RSA consistency check on load
+        return serialization.load_der_private_key(der, password=None, unsafe_skip_rsa_key_validation=True)
+
+    def _notify(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # loop already closed during shutdown
+
+    def _next_refill(self) -> tuple[str, int] | None:
+        """Key type with the largest relative deficit, and how many keys to generate for it."""
+        best, best_ratio = None, 1.0
+        with self._lock:
+            for key_type, target in self.sizes.items():
+                ratio = len(self._keys[key_type]) / target
+                if ratio < best_ratio:
+                    best, best_ratio = key_type, ratio
+            if best is None:
+                return None
+            missing = self.sizes[best] - len(self._keys[best])
+        return best, min(missing, REFILL_BATCH_SIZE)
+
+    def _take_ownership(self) -> bool:
+        if self._owner_fd is None:
+            self._owner_fd = try_file_lock(settings.ca_cert_path.with_name(KEY_POOL_LOCK_NAME))
+        return self._owner_fd is not None
+
+    def _release_ownership(self) -> None:
+        if self._owner_fd is not None:
+            os.close(self._owner_fd)  # closing drops the flock
+            self._owner_fd = None
+
+    async def run(self) -> None:
+        """Refill loop; runs until cancelled. Started from the API lifespan."""
+        if not self.sizes:
+            return
+        try:
+            while not self._take_ownership():
+                await asyncio.sleep(OWNER_RETRY_SECONDS)
+            await self._refill_loop()
+        finally:
+            self._release_ownership()
+
+    async def _refill_loop(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._started_at = time.monotonic()
+        # spawn: fork is unsafe from a process that already runs threads and an event loop
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        print(f"🔑 Key pool started: {self.sizes} ({self.workers} worker(s))")
+        try:
+            while True:
+                job = self._next_refill()
+                if job is None:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                busy_for = REFILL_IDLE_SECONDS - (time.monotonic() - self._last_acquire)
+                if busy_for > 0:
+                    await asyncio.sleep(busy_for)
+                    continue
+                key_type, count = job
+                started = time.monotonic()
+                batches = [
+                    self._loop.run_in_executor(executor, _generate_keys, key_type, max(1, count // self.workers))
+                    for _ in range(min(self.workers, count))
+                ]
+                try:
+                    results = await asyncio.gather(*batches)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"❌ Key pool refill error ({key_type}): {e}")
+                    await asyncio.sleep(5)
+                    continue
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    keys = self._keys[key_type]
+                    for der in (der for result in results for der in result):
+                        if len(keys) < self.sizes[key_type]:
+                            keys.append(der)
+                    stats = self._stats[key_type]
+                    stats.generated += sum(len(result) for result in results)
+                    stats.generate_seconds += elapsed
+                    stats.last_refill_at = time.time()
+        finally:
+            self._loop = None
+            self._wakeup = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            types = {}
+            for key_type in x509_lib.KEY_TYPES:
+                stats = self._stats[key_type]
+                target = self.sizes.get(key_type, 0)
+                if not target and not stats.misses:
+                    continue
+                served = stats.hits + stats.misses
+                types[key_type] = {
+                    "depth": len(self._keys.get(key_type, ())),
+                    "target": target,
+                    "hits": stats.hits,
+                    "misses": stats.misses,
+                    "hit_ratio": stats.hits / served if served else 0.0,
+                    "generated": stats.generated,
+                    # keys/s while a refill is in progress: the sustained issuance rate the pool can absorb
+                    "refill_rate_per_sec": stats.generated / stats.generate_seconds if stats.generate_seconds else 0.0,
+                    "last_refill_at": stats.last_refill_at,
+                }
+            return {
+                "running": self.running,
+                "workers": self.workers,
+                "uptime_seconds": time.monotonic() - self._started_at if self._started_at and self.running else 0.0,
+                "types": types,
+            }
+
+
+key_pool = KeyPool(settings.KEY_POOL_SIZES, settings.KEY_POOL_WORKERS)
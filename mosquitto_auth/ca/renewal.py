@@ -0,0 +1,261 @@
+import asyncio
+import heapq
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Deque, Dict, List, Tuple
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.ca.authority import get_certificate_authority
+from mosquitto_auth.ca.inventory import certificate_inventory
+from mosquitto_auth.client.certificate.generate_users_certificate import generate_client_certificate
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.fs import try_file_lock
+
+RENEWAL_LOCK_NAME = "ca_renewal"  # lock file: ca_renewal.lock next to the CA
+# Renewal results kept for the progress endpoint
+RECENT_RESULTS = 100
+
+# A certificate is renewed once it has less than min(window, this fraction of its lifetime) left,
+# so short-lived certificates are not renewed again on every cycle
+RENEW_AT_LIFETIME_FRACTION = 1 / 3
+
+# (renew_at, not_after, serial, cn, key_type, validity_days)
+HeapEntry = Tuple[datetime, datetime, str, str, str, int]
+
+
+def renew_client_certificate(cn: str, serial: str, key_type: str, days: int) -> dict:
+    """
+    Re-issue the client certificate of `cn` if the one on disk is still `serial`; a
+    certificate replaced or deleted since it was scheduled is skipped.
+    """
+    crt_path = settings.client_certs_dir / cn / f"{cn}.crt"
+    try:
+        current = x509_lib.load_certificate(crt_path.read_bytes())
+    except FileNotFoundError:
+        return {"status": "SKIPPED", "error": "Certificate no longer exists."}
+    if format(current.serial_number, "x") != serial:
+        return {"status": "SKIPPED", "error": "Certificate was replaced since it was scheduled."}
+    if not crt_path.with_suffix(".key").exists():
+        # Signed from a device CSR: only the device can produce the next key
+        return {"status": "SKIPPED", "error": "Certificate was signed from a CSR; the device must submit a new one."}
+    crt_path, _ = generate_client_certificate(cn, days, key_type)
+    renewed = x509_lib.load_certificate(crt_path.read_bytes())
+    return {"status": "RENEWED", "new_serial": format(renewed.serial_number, "x")}
+
+
+class _RateLimiter:
+    """Token bucket shared by the renewal workers: at most `rate` renewals per minute, no bursts above `burst`."""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.interval = 60.0 / rate_per_minute
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.interval)
+
+
+class RenewalScheduler:
+    """
+    Renews client certificates before they expire.
+
+    A min-heap of issued client certificates ordered by renewal time (notAfter minus the
+    renewal window) is built from the CA database and then kept in sync with the records
+    appended to it, so each cycle only looks at the head of the heap instead of rescanning
+    the certs tree. Certificates whose renewal time has come are queued and re-issued by a few workers behind a
+    token bucket, so a wave of expiries never turns into a CPU spike.
+
+    With several API workers only the one holding the renewal lock file schedules;
+    the others stay on standby and take over if it exits.
+    """
+
+    def __init__(self, window_days: float, rate_per_minute: float, workers: int, check_interval: float,
+                 renewal_days: int | None = None):
+        self.window = timedelta(days=window_days)
+        self.rate_per_minute = rate_per_minute
+        self.workers = max(1, workers)
+        self.check_interval = check_interval
+        self.renewal_days = renewal_days
+        self._heap: List[HeapEntry] = []
+        self._generation = -1
+        self._consumed = 0
+        self._queue: asyncio.Queue | None = None
+        self._queued: set[str] = set()
+        self._in_progress: set[str] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._lock_fd: int | None = None
+        self.active = False
+        self.renewed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.last_cycle_at: datetime | None = None
+        self.recent: Deque[dict] = deque(maxlen=RECENT_RESULTS)
+
+    @staticmethod
+    def _database():
+        return get_certificate_authority(settings.ca_cert_path, settings.ca_key_path).database
+
+    def _take_lock(self) -> bool:
+        if self._lock_fd is None:
+            self._lock_fd = try_file_lock(Path(settings.ca_cert_path).with_name(RENEWAL_LOCK_NAME))
+        return self._lock_fd is not None
+
+    def _release_lock(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # closing drops the flock
+        self._lock_fd = None
+
+    def _sync_heap(self, generation: int, records: List[dict]) -> None:
+        """Push the index records appended since the last cycle (all of them after a CA change)."""
+        if generation != self._generation:
+            self._heap, self._consumed, self._generation = [], 0, generation
+        for record in records:
+            if record.get("profile") != x509_lib.PROFILE_CLIENT:
+                continue
+            not_before = datetime.fromisoformat(record["not_before"])
+            not_after = datetime.fromisoformat(record["not_after"])
+            lifetime = not_after - not_before
+            renew_at = not_after - min(self.window, lifetime * RENEW_AT_LIFETIME_FRACTION)
+            days = self.renewal_days or max(1, round(lifetime / timedelta(days=1)))
+            key_type = record.get("key_type")
+            if key_type not in x509_lib.KEY_TYPES:
+                key_type = x509_lib.DEFAULT_KEY_TYPE
+            heapq.heappush(self._heap, (renew_at, not_after, record["serial"], record["cn"], key_type, days))
+        self._consumed += len(records)
+
+    def _schedule_due(self) -> int:
+        """Pop every certificate whose renewal time has come and queue the ones still current."""
+        now = datetime.now(timezone.utc)
+        latest: Dict[str, str] = {}
+        queued = 0
+        database = self._database()
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            serial, cn = entry[2], entry[3]
+            if cn not in latest:
+                issued = database.by_cn(cn)
+                # A revoked certificate is not renewed, even if it is still the latest
+                latest[cn] = issued[-1]["serial"] if issued and "revoked_at" not in issued[-1] else None
+            # Superseded by a newer certificate (renewed or re-issued): nothing to do
+            if latest[cn] != serial or cn in self._queued or cn in self._in_progress:
+                continue
+            self._queued.add(cn)
+            self._queue.put_nowait(entry)
+            queued += 1
+        return queued
+
+    def _record(self, entry: HeapEntry, result: dict) -> None:
+        _, not_after, serial, cn, _, _ = entry
+        status = result["status"]
+        if status == "RENEWED":
+            self.renewed += 1
+        elif status == "SKIPPED":
+            self.skipped += 1
+        else:
+            self.failed += 1
+        self.recent.append({
+            "cn": cn,
+            "serial": serial,
+            "not_after": not_after,
+            "status": status,
+            "new_serial": result.get("new_serial"),
+            "error": result.get("error"),
+            "at": datetime.now(timezone.utc),
+        })
+
+    async def _worker(self, limiter: _RateLimiter) -> None:
+        while True:
+            entry = await self._queue.get()
+            _, _, serial, cn, key_type, days = entry
+            try:
+                await limiter.acquire()
+                self._queued.discard(cn)
+                self._in_progress.add(cn)
+                try:
+                    result = await asyncio.to_thread(renew_client_certificate, cn, serial, key_type, days)
+                except Exception as e:
+                    result = {"status": "ERROR", "error": str(e)}
+                    # Retried on a later cycle: it is still the current certificate
+                    heapq.heappush(self._heap, entry)
+                if result["status"] == "RENEWED":
+                    certificate_inventory.mark_dirty()
+                self._record(entry, result)
+            finally:
+                self._queued.discard(cn)
+                self._in_progress.discard(cn)
+                self._queue.task_done()
+
+    def trigger(self) -> None:
+        """Run a scheduling cycle now instead of waiting for the next interval."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        """Scheduling loop; runs until cancelled. Started from the API lifespan."""
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        limiter = _RateLimiter(self.rate_per_minute, burst=self.workers)
+        workers = [asyncio.create_task(self._worker(limiter)) for _ in range(self.workers)]
+        try:
+            while True:
+                if self._take_lock():
+                    if not self.active:
+                        self.active = True
+                        print(f"🔁 Certificate renewal scheduler active (window {self.window.days} days, {self.rate_per_minute}/min)")
+                    try:
+                        # Reading the index may hit the disk; the heap itself is only touched on the loop
+                        database = self._database()
+                        self._sync_heap(*await asyncio.to_thread(database.tail, self._consumed, self._generation))
+                        if self._schedule_due():
+                            print(f"🔁 {self._queue.qsize()} certificate(s) queued for renewal")
+                    except Exception as e:
+                        print(f"❌ Certificate renewal cycle error: {e}")
+                    self.last_cycle_at = datetime.now(timezone.utc)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.check_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self._release_lock()
+            self.active = False
+            self._queue = None
+            self._wakeup = None
+
+    def stats(self) -> dict:
+        head = self._heap[0] if self._heap else None
+        return {
+            "active": self.active,
+            "window_days": self.window / timedelta(days=1),
+            "rate_per_minute": self.rate_per_minute,
+            "workers": self.workers,
+            "tracked": len(self._heap),
+            "next_renewal": {"cn": head[3], "serial": head[2], "not_after": head[1], "renew_at": head[0]} if head else None,
+            "queued": len(self._queued),
+            "in_progress": len(self._in_progress),
+            "renewed": self.renewed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "last_cycle_at": self.last_cycle_at,
+            "recent": list(self.recent),
+        }
+
+
+renewal_scheduler = RenewalScheduler(
+    settings.CERT_RENEWAL_WINDOW_DAYS, settings.CERT_RENEWAL_RATE_PER_MINUTE, settings.CERT_RENEWAL_WORKERS,
+    settings.CERT_RENEWAL_CHECK_SECONDS, settings.CERT_RENEWAL_DAYS
+)
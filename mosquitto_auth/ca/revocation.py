@@ -0,0 +1,295 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.ca.authority import CertificateAuthority, get_certificate_authority
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.fs import atomic_write, file_lock, try_file_lock
+
+CRL_STATE_NAME = "ca_crl.json"
+# Only one API worker republishes stale CRLs (lock file: crl_refresh.lock next to the CRL)
+CRL_REFRESH_LOCK_NAME = "crl_refresh"
+REASONS = [reason.value for reason in x509.ReasonFlags if reason != x509.ReasonFlags.remove_from_crl]
+DEFAULT_REASON = x509.ReasonFlags.unspecified.value
+
+# Revocation outcomes
+REVOKED = "REVOKED"
+ALREADY_REVOKED = "ALREADY_REVOKED"
+ERROR = "ERROR"
+
+
+def _revoked_entry(record: dict) -> x509.RevokedCertificate:
+    builder = (
+        x509.RevokedCertificateBuilder()
+        .serial_number(int(record["serial"], 16))
+        .revocation_date(datetime.fromisoformat(record["revoked_at"]))
+    )
+    reason = x509.ReasonFlags(record.get("reason") or DEFAULT_REASON)
+    if reason != x509.ReasonFlags.unspecified:  # RFC 5280: omit reasonCode rather than use unspecified
+        builder = builder.add_extension(x509.CRLReason(reason), critical=False)
+    return builder.build()
+
+
+class CRLPublisher:
+    """
+    Builds the CA's CRL and delta CRL from the revocations in the CA database.
+
+    The full CRL (what mosquitto's `crlfile` reads) is rewritten on every publish; the
+    delta CRL lists the revocations made since its base full CRL, which moves forward
+    once the delta grows past `delta_max` entries. Parsed revoked entries are cached
+    and only the revocations appended since the previous publish are converted, and the
+    CRL is assembled in one step instead of one builder copy per entry.
+    """
+
+    def __init__(self, authority: CertificateAuthority, crl_path: Path, delta_path: Path,
+                 validity_hours: float = 168, delta_max: int = 1000):
+        self.authority = authority
+        self.crl_path = Path(crl_path)
+        self.delta_path = Path(delta_path)
+        self.state_path = self.crl_path.with_name(CRL_STATE_NAME)
+        self.validity = timedelta(hours=validity_hours)
+        self.delta_max = delta_max
+        self._lock = threading.Lock()
+        self._entries: List[x509.RevokedCertificate] = []
+        self._generation: int | None = None
+        self.publishes = 0
+
+    def _sync(self) -> None:
+        generation, records = self.authority.database.revocations(len(self._entries), self._generation)
+        if generation != self._generation:
+            self._entries, self._generation = [], generation
+        self._entries.extend(_revoked_entry(record) for record in records)
+
+    def _load_state(self) -> dict:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _build(self, ca_key, ca_cert: x509.Certificate, number: int, entries: List[x509.RevokedCertificate],
+               now: datetime, delta_base: int | None = None) -> x509.CertificateRevocationList:
+        extensions = [
+            x509.Extension(x509.CRLNumber.oid, False, x509.CRLNumber(number)),
+            x509.Extension(
+                x509.AuthorityKeyIdentifier.oid, False,
+                x509.AuthorityKeyIdentifier.from_issuer_public_key(ca_key.public_key())
+            ),
+        ]
+        if delta_base is not None:
+            extensions.append(x509.Extension(x509.DeltaCRLIndicator.oid, True, x509.DeltaCRLIndicator(delta_base)))
+        builder = x509.CertificateRevocationListBuilder(
+            issuer_name=ca_cert.subject,
+            last_update=now,
+            next_update=now + self.validity,
+            extensions=extensions,
+            revoked_certificates=entries,
+        )
+        return builder.sign(ca_key, x509_lib.signature_hash(ca_key))
+
+    def publish(self) -> dict:
+        """Rebuild and atomically replace the CRL and delta CRL; returns what was published."""
+        with self._lock, file_lock(self.crl_path):
+            ca_key, ca_cert = self.authority.load()
+            self._sync()
+            state = self._load_state()
+            number = state.get("crl_number", 0) + 1
+            base_number, base_count = state.get("base_crl_number"), state.get("base_revocations", 0)
+            if base_number is None or base_count > len(self._entries) or len(self._entries) - base_count > self.delta_max:
+                base_number, base_count = number, len(self._entries)
+            now = datetime.now(timezone.utc)
+            full = self._build(ca_key, ca_cert, number, self._entries, now)
+            delta = self._build(ca_key, ca_cert, number, self._entries[base_count:], now, delta_base=base_number)
+            atomic_write(self.crl_path, full.public_bytes(serialization.Encoding.PEM), mode=0o644)
+            atomic_write(self.delta_path, delta.public_bytes(serialization.Encoding.PEM), mode=0o644)
+            state = {
+                "crl_number": number,
+                "base_crl_number": base_number,
+                "base_revocations": base_count,
+                "revoked": len(self._entries),
+                "published_at": now.isoformat(),
+                "next_update": (now + self.validity).isoformat(),
+            }
+            atomic_write(self.state_path, json.dumps(state, indent=2))
+            self.publishes += 1
+            return {**state, "delta_entries": len(self._entries) - base_count}
+
+    def state(self) -> dict:
+        return self._load_state()
+
+    def is_stale(self) -> bool:
+        """True when the CRL is missing or past half of its validity (mosquitto rejects every client once it expires)."""
+        state = self._load_state()
+        if not self.crl_path.exists() or "next_update" not in state:
+            return True
+        next_update = datetime.fromisoformat(state["next_update"])
+        return datetime.now(timezone.utc) >= next_update - self.validity / 2
+
+
+@dataclass
+class Revocation:
+    serial: str
+    reason: str = DEFAULT_REASON
+    future: Future = field(default_factory=Future)
+
+
+class RevocationCoordinator:
+    """
+    Group commit for revocations, the same way PasswdWriteCoordinator batches passwd writes.
+
+    The first caller becomes the leader: it waits `window` seconds for more revocations,
+    appends the whole batch to the CA database in one write and publishes the CRL once,
+    so a burst of revocations costs one CRL rebuild and one broker reload.
+    """
+
+    def __init__(self, database, publisher: CRLPublisher, window: float = 0.2):
+        self.database = database
+        self.publisher = publisher
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending: List[Revocation] = []
+        self._leader_active = False
+        self.commits = 0
+        self.revocations = 0
+
+    def submit(self, revocations: List[Revocation]) -> List[Future]:
+        with self._lock:
+            self._pending.extend(revocations)
+            leader = not self._leader_active
+            if leader:
+                self._leader_active = True
+        if leader:
+            self._lead()
+        return [r.future for r in revocations]
+
+    def revoke(self, revocations: List[Revocation]) -> List[dict]:
+        """Submit and block until the batch containing these revocations is published."""
+        return [future.result() for future in self.submit(revocations)]
+
+    def _lead(self) -> None:
+        if self.window > 0:
+            time.sleep(self.window)
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._leader_active = False
+                    return
+            self._commit(batch)
+
+    def _commit(self, batch: List[Revocation]) -> None:
+        try:
+            revoked, already, errors = self.database.revoke_many((r.serial, r.reason) for r in batch)
+            crl = None
+            if revoked:
+                crl = self.publisher.publish()
+                self.commits += 1
+                self.revocations += len(revoked)
+        except Exception as e:
+            print(f"❌ Error committing revocation batch: {e}", file=sys.stderr)
+            for revocation in batch:
+                if not revocation.future.done():
+                    revocation.future.set_exception(RuntimeError(str(e)))
+            return
+        reported = set()
+        for revocation in batch:
+            serial = revocation.serial.lower().lstrip("0") or "0"
+            if serial in errors:
+                outcome = {"serial": serial, "status": ERROR, "error": errors[serial]}
+            else:
+                # A serial listed twice in one batch is revoked by its first occurrence
+                first = serial in revoked and serial not in reported
+                record = revoked[serial] if serial in revoked else already[serial]
+                outcome = {
+                    "serial": serial, "status": REVOKED if first else ALREADY_REVOKED,
+                    "revoked_at": record["revoked_at"], "reason": record["reason"],
+                    "crl_number": crl["crl_number"] if first else None,
+                }
+            reported.add(serial)
+            revocation.future.set_result(outcome)
+
+
+def client_serials(cn: str, authority: CertificateAuthority | None = None) -> List[str]:
+    """
+    Serials of every unexpired, unrevoked certificate issued to `cn`. A certificate on
+    disk that predates the CA database but was signed by this CA is indexed first, so
+    it can be revoked too.
+    """
+    authority = authority or get_certificate_authority(settings.ca_cert_path, settings.ca_key_path)
+    database = authority.database
+    crt_path = settings.client_certs_dir / cn / f"{cn}.crt"
+    try:
+        cert = x509_lib.load_certificate(crt_path.read_bytes())
+        if database.get(format(cert.serial_number, "x")) is None:
+            cert.verify_directly_issued_by(authority.load()[1])
+            database.record(cert, x509_lib.PROFILE_CLIENT)
+    except Exception:
+        pass  # no certificate on disk, or not ours: only indexed certificates can be revoked
+    now = datetime.now(timezone.utc)
+    return [
+        record["serial"] for record in database.by_cn(cn)
+        if "revoked_at" not in record and datetime.fromisoformat(record["not_after"]) > now
+    ]
+
+
+async def run_crl_refresh(interval: float = 3600) -> None:
+    """
+    Republish the CRL before it expires; runs until cancelled. Started from the API
+    lifespan in every worker, but only the one holding the refresh lock republishes,
+    so a stale CRL is re-signed once, not once per worker.
+    """
+    lock_fd = None
+    try:
+        while True:
+            try:
+                publisher = get_crl_publisher()
+                if lock_fd is None:
+                    lock_fd = try_file_lock(Path(publisher.crl_path).with_name(CRL_REFRESH_LOCK_NAME))
+                # Only once revocation is in use: an expired CRL would lock every client out
+                if lock_fd is not None and publisher.crl_path.exists() and publisher.is_stale():
+                    await asyncio.to_thread(publisher.publish)
+                    print(f"📜 CRL republished: {publisher.crl_path}")
+            except Exception as e:
+                print(f"❌ CRL refresh error: {e}")
+            await asyncio.sleep(interval)
+    finally:
+        if lock_fd is not None:
+            os.close(lock_fd)  # closing drops the flock
+
+
+_publishers: Dict[str, CRLPublisher] = {}
+_coordinators: Dict[str, RevocationCoordinator] = {}
+_registry_lock = threading.Lock()
+
+
+def get_crl_publisher() -> CRLPublisher:
+    authority = get_certificate_authority(settings.ca_cert_path, settings.ca_key_path)
+    key = str(Path(settings.crl_path).resolve())
+    with _registry_lock:
+        if key not in _publishers:
+            _publishers[key] = CRLPublisher(
+                authority, settings.crl_path, settings.crl_delta_path,
+                settings.CRL_VALIDITY_HOURS, settings.CRL_DELTA_MAX_ENTRIES
+            )
+        return _publishers[key]
+
+
+def get_revocation_coordinator() -> RevocationCoordinator:
+    """Process-wide coordinator, so concurrent requests share CRL rebuilds."""
+    publisher = get_crl_publisher()
+    key = str(publisher.crl_path.resolve())
+    with _registry_lock:
+        if key not in _coordinators:
+            _coordinators[key] = RevocationCoordinator(
+                publisher.authority.database, publisher, settings.CRL_BATCH_WINDOW_SECONDS
+            )
+        return _coordinators[key]
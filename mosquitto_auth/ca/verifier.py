@@ -0,0 +1,213 @@
+import ipaddress
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List
+from cryptography import x509
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+from mosquitto_auth.ca.inventory import certificate_inventory
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.utils import error_openssl_map
+
+# Error codes are the keys of error_openssl_map, worded like `openssl verify` reports them
+ERROR_NOT_LOADED = "unable to load certificate"
+ERROR_NO_ISSUER = "unable to get local issuer certificate"
+ERROR_SIGNATURE = "certificate signature failure"
+ERROR_EXPIRED = "certificate has expired"
+ERROR_NOT_YET_VALID = "certificate is not yet valid"
+ERROR_CA_EXPIRED = "CA certificate has expired"
+ERROR_KEY_USAGE = "key usage does not include digital signature"
+ERROR_PURPOSE = "unsupported certificate purpose"
+ERROR_HOSTNAME = "hostname mismatch"
+ERROR_CN = "subject common name mismatch"
+
+EKU_NAMES = {x509_lib.PROFILE_CLIENT: "clientAuth", x509_lib.PROFILE_SERVER: "serverAuth"}
+
+
+def _error(code: str, detail: str | None = None) -> dict:
+    known = error_openssl_map[code]
+    return {"code": code, "tag": known["tag"], "description": known["description"], "detail": detail}
+
+
+def _san_entries(cert: x509.Certificate) -> List[x509.GeneralName]:
+    try:
+        return list(cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value)
+    except x509.ExtensionNotFound:
+        return []
+
+
+def format_san(entry: x509.GeneralName) -> str:
+    if isinstance(entry, x509.IPAddress):
+        return f"IP: {entry.value}"
+    if isinstance(entry, x509.DNSName):
+        return f"DNS: {entry.value}"
+    return f"{type(entry).__name__}: {entry.value}"
+
+
+def _dns_matches(pattern: str, hostname: str) -> bool:
+    """RFC 6125 matching: case-insensitive, a wildcard only as the whole left-most label."""
+    pattern, hostname = pattern.lower().rstrip("."), hostname.lower().rstrip(".")
+    if pattern.startswith("*."):
+        head, _, rest = hostname.partition(".")
+        return bool(head) and rest == pattern[2:]
+    return pattern == hostname
+
+
+def hostname_matches(entries: Iterable[x509.GeneralName], hostname: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(hostname)
+    except ValueError:
+        ip = None
+    for entry in entries:
+        if ip is not None and isinstance(entry, x509.IPAddress) and entry.value == ip:
+            return True
+        if ip is None and isinstance(entry, x509.DNSName) and _dns_matches(entry.value, hostname):
+            return True
+    return False
+
+
+def verify_certificate(cert: x509.Certificate, ca_cert: x509.Certificate | None,
+                       profile: str = x509_lib.PROFILE_CLIENT, expected_cn: str | None = None,
+                       hostnames: Iterable[str] = (), now: datetime | None = None,
+                       signature_verified: bool | None = None) -> dict:
+    """
+    Check `cert` against the CA the way a TLS peer would: issuer and signature, validity
+    window (of the certificate and of the CA), key usage, extended key usage for `profile`
+    and, when given, the CN and every hostname against the SANs.
+
+    `signature_verified` lets callers that already checked the signature (the certificate
+    inventory does it once per file) skip the public key operation.
+    Returns a dict with one flag per check, status "OK" or "FAIL", and structured errors.
+    """
+    now = now or datetime.now(timezone.utc)
+    errors: List[dict] = []
+    cn = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+    cn = cn[0].value if cn else None
+
+    # Chain: the leaf must be signed directly by our CA, and the CA itself must still be valid
+    ca_verified = False
+    if ca_cert is None or cert.issuer != ca_cert.subject:
+        errors.append(_error(ERROR_NO_ISSUER, cert.issuer.rfc4514_string()))
+    else:
+        if signature_verified is None:
+            try:
+                cert.verify_directly_issued_by(ca_cert)
+                signature_verified = True
+            except Exception:
+                signature_verified = False
+        if not signature_verified:
+            errors.append(_error(ERROR_SIGNATURE))
+        elif not ca_cert.not_valid_before_utc <= now <= ca_cert.not_valid_after_utc:
+            errors.append(_error(ERROR_CA_EXPIRED, ca_cert.not_valid_after_utc.isoformat()))
+        else:
+            ca_verified = True
+
+    time_valid = cert.not_valid_before_utc <= now <= cert.not_valid_after_utc
+    if now > cert.not_valid_after_utc:
+        errors.append(_error(ERROR_EXPIRED, cert.not_valid_after_utc.isoformat()))
+    elif now < cert.not_valid_before_utc:
+        errors.append(_error(ERROR_NOT_YET_VALID, cert.not_valid_before_utc.isoformat()))
+
+    # An absent Key Usage / EKU extension means "any use", as OpenSSL treats it
+    key_usage_valid = True
+    try:
+        key_usage = cert.extensions.get_extension_for_class(x509.KeyUsage).value
+        key_usage_valid = key_usage.digital_signature and (
+            profile != x509_lib.PROFILE_SERVER
+            or not isinstance(cert.public_key(), rsa.RSAPublicKey)
+            or key_usage.key_encipherment
+        )
+    except x509.ExtensionNotFound:
+        pass
+    if not key_usage_valid:
+        errors.append(_error(ERROR_KEY_USAGE))
+
+    extended_key_usage_valid = True
+    try:
+        usages = cert.extensions.get_extension_for_class(x509.ExtendedKeyUsage).value
+        extended_key_usage_valid = (
+            x509_lib.PROFILES[profile] in usages or ExtendedKeyUsageOID.ANY_EXTENDED_KEY_USAGE in usages
+        )
+    except x509.ExtensionNotFound:
+        pass
+    if not extended_key_usage_valid:
+        errors.append(_error(ERROR_PURPOSE, f"{profile} profile requires {EKU_NAMES[profile]}"))
+
+    san = _san_entries(cert)
+    mismatched = [host for host in hostnames if host and not hostname_matches(san, host)]
+    if mismatched:
+        errors.append(_error(ERROR_HOSTNAME, ", ".join(mismatched)))
+
+    if expected_cn is not None and cn != expected_cn:
+        errors.append(_error(ERROR_CN, f"expected '{expected_cn}', got '{cn}'"))
+
+    return {
+        "cn": cn,
+        "serial": format(cert.serial_number, "x"),
+        "valid_from": cert.not_valid_before_utc,
+        "valid_until": cert.not_valid_after_utc,
+        "ca_verified": ca_verified,
+        "time_valid": time_valid,
+        "key_usage_valid": key_usage_valid,
+        "extended_key_usage_valid": extended_key_usage_valid,
+        "san": [format_san(entry) for entry in san],
+        "san_valid": not mismatched,
+        "status": "FAIL" if errors else "OK",
+        "errors": errors,
+    }
+
+
+def unloadable_result(detail: str) -> dict:
+    """Result for a certificate that could not be read or parsed."""
+    return {
+        "cn": None, "serial": None, "valid_from": None, "valid_until": None,
+        "ca_verified": False, "time_valid": False, "key_usage_valid": False,
+        "extended_key_usage_valid": False, "san": [], "san_valid": False,
+        "status": "ERROR", "errors": [_error(ERROR_NOT_LOADED, detail)],
+    }
+
+
+def verify_certificate_file(cert_path: Path, ca_cert_path: Path, profile: str = x509_lib.PROFILE_CLIENT,
+                            expected_cn: str | None = None, hostnames: Iterable[str] = ()) -> dict:
+    try:
+        cert = x509_lib.load_certificate(Path(cert_path).read_bytes())
+    except Exception as e:
+        return unloadable_result(f"{cert_path}: {e}")
+    try:
+        ca_cert = x509_lib.load_certificate(Path(ca_cert_path).read_bytes())
+    except Exception:
+        ca_cert = None
+    return verify_certificate(cert, ca_cert, profile, expected_cn, hostnames)
+
+
+def openssl_date(value: datetime | None) -> str | None:
+    """Format a validity date the way `openssl x509 -dates` prints it (e.g. 'Oct  8 07:56:55 2026 GMT')."""
+    if value is None:
+        return None
+    return f"{value:%b} {value.day:2d} {value:%H:%M:%S %Y} GMT"
+
+
+def verify_client_certificates(names: Iterable[str] | None = None, now: datetime | None = None) -> List[dict]:
+    """
+    Verify many client certificates (all of them when `names` is None) in one pass.
+
+    Certificates come already parsed from the certificate inventory, together with its
+    cached signature check, so a fleet-wide run costs no file reads, no process spawns
+    and no public key operations for files unchanged since the last refresh.
+    """
+    now = now or datetime.now(timezone.utc)
+    infos, ca_cert = certificate_inventory.snapshot()
+    by_name = {info.name: info for info in infos}
+    results: List[dict] = []
+    for name in (by_name if names is None else names):
+        info = by_name.get(name)
+        if info is None or info.certificate is None:
+            result = unloadable_result(info.error if info is not None else f"No certificate for '{name}'")
+        else:
+            result = verify_certificate(
+                info.certificate, ca_cert, x509_lib.PROFILE_CLIENT, expected_cn=name, now=now,
+                signature_verified=info.ca_verified
+            )
+        result["username"] = name
+        results.append(result)
+    return results
@@ -2,9 +2,17 @@ import os
 import sys
 import platform
 import subprocess
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 from pathlib import Path
-from mosquitto_auth.lib.validators import validate_single_user
+from mosquitto_auth.lib.validators import validate_single_user, validate_users_batch
+from mosquitto_auth.lib.passwd_hash import hash_password, hash_many_passwords, verify_many_passwords
+from mosquitto_auth.client.passwd_index import get_passwd_index
+from mosquitto_auth.client.passwd_file import write_passwd_entries
+from mosquitto_auth.client.dynsec_store import DynsecUserStore
+from mosquitto_auth.client.passwd_writer import (
+    PasswdMutation, OP_ADD, OP_UPDATE, OP_DELETE, OP_RESET,
+    get_write_coordinator, passwd_file_lock
+)
 from mosquitto_auth.api.core.config import settings
 
 class MosquittoUserManager:
@@ -16,9 +24,28 @@ class MosquittoUserManager:
     
     HASH_ALGORITHMS = ['sha512-pbkdf2', 'sha512']
     
-    def __init__(self, passwd_file: Path = settings.PASSWD_FILE_PATH, hash_alg: str = 'sha512-pbkdf2'):
+    # native: hashes in-process and rewrites the file atomically
+    # subprocess: delegates every change to mosquitto_passwd
+    # dynsec: no passwd file, users live in the broker's dynamic-security plugin
+    BACKENDS = ['native', 'subprocess', 'dynsec']
+    # dynsec needs the API's broker connection and event loop, so the CLIs can't use it
+    CLI_BACKENDS = ['native', 'subprocess']
+    
+    RECONCILE_ATTEMPTS = 3  # optimistic diffs before diffing under the passwd lock
+    
+    def __init__(self, passwd_file: Path = settings.PASSWD_FILE_PATH, hash_alg: str = 'sha512-pbkdf2',
+                 backend: str = settings.PASSWD_BACKEND, dynsec_store: DynsecUserStore | None = None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Invalid passwd backend '{backend}'. Choose one of: {', '.join(self.BACKENDS)}")
         self.passwd_file = passwd_file
         self.hash_alg = hash_alg
+        self.backend = backend
+        self.index = get_passwd_index(passwd_file)
+        self.coordinator = get_write_coordinator(passwd_file, settings.PASSWD_COMMIT_WINDOW_MS / 1000)
+        self.dynsec = dynsec_store
+        if backend == 'dynsec' and self.dynsec is None:
+            from mosquitto_auth.api.services.dynsec import dynsec_client
+            self.dynsec = DynsecUserStore(dynsec_client.execute_threadsafe)
     
     def get_mosquitto_cmd(self) -> str:
         system = platform.system().lower()
@@ -50,81 +77,252 @@ class MosquittoUserManager:
             print(f"❌ Error executing mosquitto_passwd: {err}", file=sys.stderr)
             raise RuntimeError(err)
     
-    def add_user(self, username: str, password: str, overwrite_file: bool = False) -> None:
-        valid_user, valid_pass = validate_single_user(username, password)
-        if not overwrite_file and self.user_exists(valid_user):
-            msg = f"User '{valid_user}' already exists."
+    def _commit_native(self, mutations: List[PasswdMutation]) -> None:
+        """Hand mutations to the group-commit coordinator and wait until they are on disk."""
+        for future in self.coordinator.submit(mutations):
+            err = future.exception()
+            if err:
+                print(f"❌ {err}", file=sys.stderr)
+                raise err
+    
+    @staticmethod
+    def _dynsec_error(err: str) -> Exception:
+        # Plugin errors like "Client already exists" / "Client not found" are caller errors
+        if "exists" in err or "not found" in err:
+            return ValueError(err)
+        return RuntimeError(f"Dynamic security error: {err}")
+    
+    def _run_dynsec(self, errors: List[str | None]) -> None:
+        for err in errors:
+            if err:
+                print(f"❌ {err}", file=sys.stderr)
+                raise self._dynsec_error(err)
+    
+    def _require_user(self, username: str, exists: bool) -> None:
+        if self.user_exists(username) != exists:
+            msg = f"User '{username}' {'does not exist' if exists else 'already exists'}."
             print(f"❌ {msg}", file=sys.stderr)
             raise ValueError(msg)
+    
+    def add_user(self, username: str, password: str, overwrite_file: bool = False) -> None:
+        valid_user, valid_pass = validate_single_user(username, password)
+        if not overwrite_file:
+            self._require_user(valid_user, exists=False)
         
-        cmd_args = ["-H", self.hash_alg, "-b"]
-        if overwrite_file:
-            cmd_args.append("-c")
-        cmd_args += [str(self.passwd_file), valid_user, valid_pass]
-        
-        self._execute_command(cmd_args)
+        if self.backend == 'dynsec':
+            self._run_dynsec(self.dynsec.create_clients([(valid_user, valid_pass)]))
+        elif self.backend == 'native':
+            mutations = [PasswdMutation(OP_RESET)] if overwrite_file else []
+            mutations.append(PasswdMutation(OP_ADD, valid_user, hash_password(valid_pass, self.hash_alg)))
+            self._commit_native(mutations)
+        else:
+            cmd_args = ["-H", self.hash_alg, "-b"]
+            if overwrite_file:
+                cmd_args.append("-c")
+            cmd_args += [str(self.passwd_file), valid_user, valid_pass]
+            with passwd_file_lock(self.passwd_file):
+                if not overwrite_file:
+                    self._require_user(valid_user, exists=False)
+                self._execute_command(cmd_args)
         print(f"✅ User '{valid_user}' added{' with overwrite' if overwrite_file else ''}.")
     
     def edit_password(self, username: str, new_password: str) -> None:
-        if not self.user_exists(username):
-            msg = f"User '{username}' does not exist."
-            print(f"❌ {msg}", file=sys.stderr)
-            raise ValueError(msg)
+        self._require_user(username, exists=True)
         
         valid_user, valid_pass = validate_single_user(username, new_password)
-        cmd_args = ["-H", self.hash_alg, "-b", str(self.passwd_file), valid_user, valid_pass]
-        
-        self._execute_command(cmd_args)
+        if self.backend == 'dynsec':
+            self._run_dynsec(self.dynsec.set_passwords([(valid_user, valid_pass)]))
+        elif self.backend == 'native':
+            self._commit_native([PasswdMutation(OP_UPDATE, valid_user, hash_password(valid_pass, self.hash_alg))])
+        else:
+            cmd_args = ["-H", self.hash_alg, "-b", str(self.passwd_file), valid_user, valid_pass]
+            with passwd_file_lock(self.passwd_file):
+                self._require_user(valid_user, exists=True)
+                self._execute_command(cmd_args)
         print(f"✅ Password for '{valid_user}' updated.")
     
     def delete_user(self, username: str) -> None:
-        if not self.user_exists(username):
-            msg = f"User '{username}' does not exist."
-            print(f"❌ {msg}", file=sys.stderr)
-            raise ValueError(msg)
-        
-        cmd_args = ["-H", self.hash_alg, "-D", str(self.passwd_file), username]
+        self._require_user(username, exists=True)
         
-        self._execute_command(cmd_args)
+        if self.backend == 'dynsec':
+            self._run_dynsec(self.dynsec.delete_clients([username]))
+        elif self.backend == 'native':
+            self._commit_native([PasswdMutation(OP_DELETE, username)])
+        else:
+            cmd_args = ["-H", self.hash_alg, "-D", str(self.passwd_file), username]
+            with passwd_file_lock(self.passwd_file):
+                self._require_user(username, exists=True)
+                self._execute_command(cmd_args)
         print(f"✅ User '{username}' deleted.")
     
-    def add_many_users(self, users: Any, overwrite_file: bool = False) -> None:
+    def add_many_users(self, users: Any, overwrite_file: bool = False) -> Dict[str, List[str]]:
+        """
+        Add many users at once and report them as {"success": [...], "failed": ["user: reason"]}.
+        The native backend hashes in parallel and commits the whole batch in one write.
+        """
         if isinstance(users, dict):
             items = list(users.items())
         else:
-            items = [(u.username, u.password) for u in users]  
+            items = [(u.username, u.password) if hasattr(u, "username") else tuple(u) for u in users]
         
-        if overwrite_file and self.passwd_file.exists():
-            self.passwd_file.unlink()
-            print("🗑️  Existing passwd file removed for overwrite.")
+        validated = validate_users_batch([{"username": u, "password": p} for u, p in items])
+        valid = [(v.username, v.password) for v in validated if not isinstance(v, ValueError)]
+        failed = [f"{u}: {v}" for (u, _), v in zip(items, validated) if isinstance(v, ValueError)]
         
-        errors = []
-        for u, p in items:
-            try:
-                current_overwrite = overwrite_file and not self.passwd_file.exists()
-                self.add_user(u, p, current_overwrite)
-            except Exception as e:
-                errors.append(f"{u}: {e}")
+        success: List[str] = []
+        for (username, _), err in zip(valid, self.add_validated_users(valid, overwrite_file)):
+            if err:
+                failed.append(f"{username}: {err}")
+            else:
+                success.append(username)
         
-        if errors:
-            msg = "Errors in bulk add: " + "; ".join(errors)
-            print(f"❌ {msg}", file=sys.stderr)
-            raise RuntimeError(msg)
+        return self._bulk_report(success, failed, len(items))
+    
+    def add_validated_users(self, users: List[tuple[str, str]], overwrite_file: bool = False) -> List[Exception | None]:
+        """
+        Add already-validated (username, password) pairs. Returns one entry per pair,
+        in order: None when the user was added, otherwise the error that rejected it.
+        """
+        results: List[Exception | None] = [None] * len(users)
+        pending: Dict[str, int] = {}
+        for i, (username, _) in enumerate(users):
+            # Against the backend in use: the plugin's client list with dynsec, the passwd file otherwise
+            if username in pending or (not overwrite_file and self.user_exists(username)):
+                results[i] = ValueError(f"User '{username}' already exists.")
+            else:
+                pending[username] = i
         
-        print(f"✅ Bulk operation completed for {len(items)} users.")
+        if self.backend == 'dynsec':
+            # One batched createClient message; overwrite_file has no meaning here
+            errors = self.dynsec.create_clients([users[i] for i in pending.values()])
+            for i, err in zip(pending.values(), errors):
+                results[i] = self._dynsec_error(err) if err else None
+            return results
+        
+        if self.backend != 'native':
+            if overwrite_file and self.passwd_file.exists():
+                self.passwd_file.unlink()
+                print("🗑️  Existing passwd file removed for overwrite.")
+            for username, i in pending.items():
+                try:
+                    current_overwrite = overwrite_file and not self.passwd_file.exists()
+                    self.add_user(username, users[i][1], current_overwrite)
+                except Exception as e:
+                    results[i] = e
+            return results
+        
+        hashes = hash_many_passwords([users[i][1] for i in pending.values()], self.hash_alg, settings.PASSWD_HASH_WORKERS)
+        adds = [PasswdMutation(OP_ADD, u, h) for u, h in zip(pending.keys(), hashes)]
+        mutations = ([PasswdMutation(OP_RESET)] if overwrite_file else []) + adds
+        if mutations:
+            self.coordinator.submit(mutations)
+        for i, mutation in zip(pending.values(), adds):
+            err = mutation.future.exception()
+            if isinstance(err, RuntimeError):
+                raise err
+            results[i] = err
+        return results
+    
+    def reconcile_users(self, desired: Dict[str, str], prune: bool = True, keep: Iterable[str] = ()) -> Dict[str, List[str]]:
+        """
+        Make the passwd file match `desired` ({username: password}, already validated).
+        Existing hashes are verified, so users whose password did not change keep their
+        hash untouched. Adds, rotations and (with prune) removals of users missing from
+        `desired` and `keep` are written in a single commit.
+        """
+        if self.backend == 'dynsec':
+            return self._reconcile_dynsec(desired, prune, set(keep))
+        if self.backend != 'native':
+            raise RuntimeError("Reconcile requires the native passwd backend.")
+        
+        keep = set(keep)
+        verified: Dict[tuple, bool] = {}
+        hashes: Dict[str, str] = {}
+        for attempt in range(self.RECONCILE_ATTEMPTS):
+            # Verify and hash outside the lock, then commit only if nobody wrote meanwhile;
+            # the last attempt diffs with the lock held
+            snapshot = self.index.entries()
+            diff = self._diff_users(snapshot, desired, prune, keep, verified, hashes)
+            with passwd_file_lock(self.passwd_file):
+                self.index.refresh()
+                current = self.index.entries()
+                if current != snapshot:
+                    if attempt + 1 < self.RECONCILE_ATTEMPTS:
+                        continue
+                    diff = self._diff_users(current, desired, prune, keep, verified, hashes)
+                added, updated, removed, unchanged = diff
+                if added or updated or removed:
+                    for username in added + updated:
+                        current[username] = hashes[username]
+                    for username in removed:
+                        del current[username]
+                    write_passwd_entries(self.passwd_file, current.items())
+                    self.index.replace(current.items())
+            break
+        
+        print(f"✅ Reconcile: {len(added)} added, {len(updated)} updated, {len(removed)} removed, {len(unchanged)} unchanged.")
+        return {"added": added, "updated": updated, "removed": removed, "unchanged": unchanged}
+    
+    def _diff_users(self, current: Dict[str, str], desired: Dict[str, str], prune: bool, keep: set,
+                    verified: Dict[tuple, bool], hashes: Dict[str, str]) -> tuple:
+        """(added, updated, removed, unchanged) against `current`; verifications and new hashes are cached across attempts."""
+        added = [u for u in desired if u not in current]
+        existing = [u for u in desired if u in current]
+        todo = [u for u in existing if (u, current[u]) not in verified]
+        matches = verify_many_passwords([(desired[u], current[u]) for u in todo], settings.PASSWD_HASH_WORKERS)
+        verified.update(((u, current[u]), ok) for u, ok in zip(todo, matches))
+        updated = [u for u in existing if not verified[(u, current[u])]]
+        unchanged = [u for u in existing if verified[(u, current[u])]]
+        removed = [u for u in current if u not in desired and u not in keep] if prune else []
+        
+        missing = [u for u in added + updated if u not in hashes]
+        hashes.update(zip(missing, hash_many_passwords([desired[u] for u in missing], self.hash_alg, settings.PASSWD_HASH_WORKERS)))
+        return added, updated, removed, unchanged
+    
+    def _reconcile_dynsec(self, desired: Dict[str, str], prune: bool, keep: set) -> Dict[str, List[str]]:
+        # The plugin never exposes hashes, so every existing user gets its password re-set;
+        # that is an in-place update in the broker, not a reload.
+        current = set(self.dynsec.list_clients())
+        added = [u for u in desired if u not in current]
+        updated = [u for u in desired if u in current]
+        removed = [u for u in current if u not in desired and u not in keep] if prune else []
+        self._run_dynsec(self.dynsec.create_clients([(u, desired[u]) for u in added]))
+        self._run_dynsec(self.dynsec.set_passwords([(u, desired[u]) for u in updated]))
+        self._run_dynsec(self.dynsec.delete_clients(removed))
+        print(f"✅ Reconcile (dynsec): {len(added)} added, {len(updated)} updated, {len(removed)} removed.")
+        return {"added": added, "updated": updated, "removed": removed, "unchanged": []}
+    
+    @staticmethod
+    def _bulk_report(success: List[str], failed: List[str], total: int) -> Dict[str, List[str]]:
+        if failed:
+            print(f"❌ Errors in bulk add: {'; '.join(failed)}", file=sys.stderr)
+        print(f"✅ Bulk operation completed: {len(success)}/{total} users added.")
+        return {"success": success, "failed": failed}
     
     def user_exists(self, username: str) -> bool:
-        if not self.passwd_file.exists():
-            return False
-        with open(self.passwd_file, 'r') as f:
-            for line in f:
-                if line.startswith(username + ":"):
-                    return True
-        return False
+        if self.backend == 'dynsec':
+            return self.dynsec.exists(username)
+        return username in self.index
     
     def list_users(self) -> List[str]:
-        if not self.passwd_file.exists():
+        if self.backend == 'dynsec':
+            return self.dynsec.list_clients()
+        if not self.index.exists():
             print(f"❌ Passwd file not found: {self.passwd_file}", file=sys.stderr)
             return []
-        with open(self.passwd_file, 'r') as f:
-            return [line.split(":")[0] for line in f]
+        return self.index.usernames()
+    
+    def list_users_page(self, prefix: str = "", cursor: str | None = None, limit: int = 100) -> tuple[List[str], str | None]:
+        if self.backend == 'dynsec':
+            return self.dynsec.page(prefix, cursor, limit)
+        return self.index.page(prefix, cursor, limit)
+    
+    def count_users(self, prefix: str = "") -> int:
+        if self.backend == 'dynsec':
+            return self.dynsec.count(prefix)
+        return self.index.count(prefix)
+    
+    def iter_users(self, prefix: str = "") -> Iterator[str]:
+        if self.backend == 'dynsec':
+            return iter(self.dynsec.page(prefix, None, sys.maxsize)[0])
+        return self.index.iter_usernames(prefix)
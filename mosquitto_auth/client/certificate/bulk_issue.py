@@ -0,0 +1,213 @@
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+from cryptography.hazmat.primitives import serialization
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.ca.authority import get_certificate_authority
+from mosquitto_auth.client.certificate.sign_client_csr import check_csr
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.fs import atomic_write
+
+# (cn, days, key_type)
+IssueItem = Tuple[str, int, str]
+# (csr_pem, days)
+CSRItem = Tuple[str, int]
+
+# Certificates per worker round-trip: amortizes IPC without starving the other workers
+ISSUE_CHUNK_SIZE = 32
+
+_issue_pool: ProcessPoolExecutor | None = None
+_issue_pool_lock = threading.Lock()
+
+
+def _get_issue_pool() -> ProcessPoolExecutor:
+    """Dedicated pool, so bulk issuance never competes with the default to_thread executor."""
+    global _issue_pool
+    with _issue_pool_lock:
+        if _issue_pool is None:
+            workers = settings.CERT_ISSUE_WORKERS or os.cpu_count() or 1
+            # spawn: fork is unsafe from a process that already runs threads and an event loop
+            _issue_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _issue_pool
+
+
+def _issue_chunk(ca_cert: str, ca_key: str, certs_dir: str, items: List[IssueItem]) -> List[dict]:
+    """
+    Runs in a worker: the CA key is parsed once per process and reused for every chunk.
+    The chunk is indexed in the CA database with a single append before any file is written.
+    """
+    authority = get_certificate_authority(Path(ca_cert), Path(ca_key))
+    results: List[dict] = []
+    signed = []
+    for cn, days, key_type in items:
+        try:
+            key = x509_lib.generate_private_key(key_type)
+            cert = authority.sign(key.public_key(), cn, days, x509_lib.PROFILE_CLIENT)
+            signed.append((cn, key, cert))
+        except Exception as e:
+            results.append({"username": cn, "status": "ERROR", "error": str(e)})
+    try:
+        authority.database.record_many((cert for _, _, cert in signed), x509_lib.PROFILE_CLIENT)
+    except Exception as e:
+        return results + [{"username": cn, "status": "ERROR", "error": f"CA database error: {e}"} for cn, _, _ in signed]
+    for cn, key, cert in signed:
+        try:
+            client_dir = Path(certs_dir) / cn
+            atomic_write(client_dir / f"{cn}.key", x509_lib.key_to_pem(key), mode=0o600)
+            atomic_write(client_dir / f"{cn}.crt", x509_lib.cert_to_pem(cert), mode=0o644)
+            results.append({"username": cn, "status": "CREATED", "serial": format(cert.serial_number, "x")})
+        except Exception as e:
+            results.append({"username": cn, "status": "ERROR", "error": str(e)})
+    return results
+
+
+def _sign_chunk(ca_cert: str, ca_key: str, certs_dir: str, items: List[Tuple[str, bytes, int]]) -> List[dict]:
+    """Runs in a worker: signs already vetted (cn, public key DER, days) items, no key generation."""
+    authority = get_certificate_authority(Path(ca_cert), Path(ca_key))
+    results: List[dict] = []
+    signed = []
+    for cn, public_der, days in items:
+        try:
+            public_key = serialization.load_der_public_key(public_der)
+            signed.append((cn, authority.sign(public_key, cn, days, x509_lib.PROFILE_CLIENT)))
+        except Exception as e:
+            results.append({"username": cn, "status": "ERROR", "error": str(e)})
+    try:
+        authority.database.record_many((cert for _, cert in signed), x509_lib.PROFILE_CLIENT)
+    except Exception as e:
+        return results + [{"username": cn, "status": "ERROR", "error": f"CA database error: {e}"} for cn, _ in signed]
+    for cn, cert in signed:
+        try:
+            cert_pem = x509_lib.cert_to_pem(cert)
+            client_dir = Path(certs_dir) / cn
+            atomic_write(client_dir / f"{cn}.crt", cert_pem, mode=0o644)
+            # A key from an earlier server-side issuance no longer matches the certificate
+            (client_dir / f"{cn}.key").unlink(missing_ok=True)
+            results.append({
+                "username": cn, "status": "CREATED", "serial": format(cert.serial_number, "x"),
+                "certificate": cert_pem.decode("ascii")
+            })
+        except Exception as e:
+            results.append({"username": cn, "status": "ERROR", "error": str(e)})
+    return results
+
+
+async def _run_chunks(func, items: list, chunk_size: int) -> List[dict]:
+    loop = asyncio.get_running_loop()
+    pool = _get_issue_pool()
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    issued = await asyncio.gather(*(
+        loop.run_in_executor(
+            pool, func, str(settings.ca_cert_path), str(settings.ca_key_path),
+            str(settings.client_certs_dir), chunk
+        )
+        for chunk in chunks
+    ))
+    return [result for chunk in issued for result in chunk]
+
+
+async def issue_client_certificates(items: Iterable[IssueItem], chunk_size: int = ISSUE_CHUNK_SIZE) -> List[dict]:
+    """
+    Issue many client certificates in parallel across the issuance process pool.
+    Returns one result per item, in order: {"username", "status", "serial" | "error"}.
+    Serials come from the CA database (random 159-bit, checked against the index).
+    """
+    items = list(items)
+    seen, duplicates = set(), set()
+    for cn, _, _ in items:
+        (duplicates if cn in seen else seen).add(cn)
+
+    unique = [item for item in items if item[0] not in duplicates]
+    by_cn = {result["username"]: result for result in await _run_chunks(_issue_chunk, unique, chunk_size)}
+
+    # Two workers writing the same CN could pair a key with the other's certificate
+    return [
+        by_cn.get(cn) or {"username": cn, "status": "ERROR", "error": "Duplicate username in request."}
+        for cn, _, _ in items
+    ]
+
+
+def _vet_csrs(items: List[CSRItem]) -> List[Tuple[dict | None, tuple | None]]:
+    """Parse and policy-check every CSR: (error result, None) or (None, (cn, public key DER, days))."""
+    vetted = []
+    for index, (csr_pem, days) in enumerate(items):
+        try:
+            cn, public_key = check_csr(csr_pem)
+        except ValueError as e:
+            vetted.append(({"index": index, "username": None, "status": "ERROR", "error": str(e)}, None))
+            continue
+        public_der = public_key.public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        vetted.append((None, (cn, public_der, days)))
+    return vetted
+
+
+async def sign_client_csrs(items: Iterable[CSRItem], chunk_size: int = ISSUE_CHUNK_SIZE) -> List[dict]:
+    """
+    Sign many client CSRs across the issuance process pool. CSRs are vetted here
+    (signature, CN, key type, EKU policy) and workers only sign, so throughput is
+    bounded by CA signatures rather than key generation.
+    Returns one result per CSR, in order: {"index", "username", "status", "serial", "certificate" | "error"}.
+    """
+    items = list(items)
+    vetted = await asyncio.to_thread(_vet_csrs, items)
+    seen, duplicates = set(), set()
+    for _, job in vetted:
+        if job is not None:
+            (duplicates if job[0] in seen else seen).add(job[0])
+
+    jobs = [job for _, job in vetted if job is not None and job[0] not in duplicates]
+    by_cn = {result["username"]: result for result in await _run_chunks(_sign_chunk, jobs, chunk_size)}
+
+    results = []
+    for index, (error, job) in enumerate(vetted):
+        if error is not None:
+            results.append(error)
+        elif job[0] in duplicates:
+            results.append({"index": index, "username": job[0], "status": "ERROR", "error": "Duplicate Common Name in request."})
+        else:
+            results.append({"index": index, **by_cn[job[0]]})
+    return results
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable sink: zipfile then streams entries with data descriptors."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_bundles_zip(results: List[dict], certs_dir: Path | None = None) -> Iterator[bytes]:
+    """Stream a ZIP with <cn>/<cn>.crt and <cn>/<cn>.key for every issued certificate, plus report.json."""
+    certs_dir = Path(certs_dir or settings.client_certs_dir)
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
+        for result in results:
+            if result["status"] != "CREATED":
+                continue
+            cn = result["username"]
+            for suffix in ("crt", "key"):
+                zipf.write(certs_dir / cn / f"{cn}.{suffix}", arcname=f"{cn}/{cn}.{suffix}")
+            yield sink.drain()
+        zipf.writestr("report.json", json.dumps(results, indent=2))
+    yield sink.drain()
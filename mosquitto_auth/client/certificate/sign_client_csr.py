@@ -0,0 +1,106 @@
+import re
+import sys
+import argparse
+from pathlib import Path
+from typing import Tuple
+from cryptography import x509
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.ca.authority import get_certificate_authority
+from mosquitto_auth.lib import x509 as x509_lib
+from mosquitto_auth.lib.fs import atomic_write
+
+DEFAULT_DAYS = 365
+CERTS_BASE_DIR = settings.client_certs_dir
+CA_CERT = settings.ca_cert_path
+CA_KEY = settings.ca_key_path
+
+# Same rule as UsernameStr: the CN becomes the broker username (use_identity_as_username)
+CN_PATTERN = re.compile(r"^[a-zA-Z0-9_-]{3,32}$")
+ALLOWED_EKUS = {ExtendedKeyUsageOID.CLIENT_AUTH}
+
+
+class CSRPolicyError(ValueError):
+    """The CSR is well-formed but asks for something client certificates may not have."""
+
+
+def check_csr(csr_pem: bytes | str, username: str | None = None) -> Tuple[str, object]:
+    """
+    Parse and vet a client CSR; returns (cn, public_key).
+
+    Only the CN and the public key are taken from the CSR. Requested extensions are never
+    copied, but a CSR asking for a CA certificate or for an EKU other than clientAuth is
+    rejected rather than silently downgraded.
+    """
+    if isinstance(csr_pem, str):
+        csr_pem = csr_pem.encode("ascii")
+    try:
+        csr = x509_lib.load_csr(csr_pem)
+    except ValueError as e:
+        raise CSRPolicyError(f"Invalid PEM CSR: {e}")
+    if not csr.is_signature_valid:
+        raise CSRPolicyError("CSR signature is invalid (it was not signed by the key it carries).")
+
+    cn = csr.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+    if len(cn) != 1:
+        raise CSRPolicyError("CSR subject must have exactly one Common Name.")
+    cn = cn[0].value
+    if not CN_PATTERN.match(cn):
+        raise CSRPolicyError(f"Common Name '{cn}' is not a valid username (3-32 chars: letters, digits, '_' or '-').")
+    if username is not None and cn != username:
+        raise CSRPolicyError(f"Common Name '{cn}' does not match username '{username}'.")
+
+    public_key = csr.public_key()
+    key_type = x509_lib.key_type_of(public_key)
+    if key_type not in x509_lib.KEY_TYPES:
+        raise CSRPolicyError(f"Unsupported key '{key_type}'. Allowed: {', '.join(x509_lib.KEY_TYPES)}")
+
+    for extension in csr.extensions:
+        if isinstance(extension.value, x509.BasicConstraints) and extension.value.ca:
+            raise CSRPolicyError("CSR requests a CA certificate.")
+        if isinstance(extension.value, x509.ExtendedKeyUsage):
+            denied = [oid.dotted_string for oid in extension.value if oid not in ALLOWED_EKUS]
+            if denied:
+                raise CSRPolicyError(f"CSR requests Extended Key Usage other than clientAuth: {', '.join(denied)}")
+    return cn, public_key
+
+
+def sign_client_csr(csr_pem: bytes | str, days: int = DEFAULT_DAYS, username: str | None = None) -> Tuple[str, bytes, x509.Certificate]:
+    """
+    Sign a client CSR with the CA and store the certificate as certs/client/<cn>/<cn>.crt;
+    returns (cn, cert_pem, cert). The private key never reaches the server, so a key left
+    over from a previous server-side issuance is removed: it no longer matches.
+    """
+    cn, public_key = check_csr(csr_pem, username)
+    authority = get_certificate_authority(CA_CERT, CA_KEY)
+    cert = authority.sign(public_key, cn, days, x509_lib.PROFILE_CLIENT)
+    authority.database.record(cert, x509_lib.PROFILE_CLIENT)
+    cert_pem = x509_lib.cert_to_pem(cert)
+    client_dir = CERTS_BASE_DIR / cn
+    atomic_write(client_dir / f"{cn}.crt", cert_pem, mode=0o644)
+    (client_dir / f"{cn}.key").unlink(missing_ok=True)
+    return cn, cert_pem, cert
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sign an MQTT client CSR with the CA.")
+    parser.add_argument("csr", type=Path, help="PEM certificate signing request")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Validity in days")
+    parser.add_argument("--out", type=Path, default=None, help="Also write the certificate here")
+    args = parser.parse_args()
+
+    if not CA_CERT.exists() or not CA_KEY.exists():
+        print(f"❌ Certificate or CA key not found in '{CA_CERT}' or '{CA_KEY}'. Please generate the CA certificate first.")
+        sys.exit(1)
+
+    try:
+        cn, cert_pem, _ = sign_client_csr(args.csr.read_bytes(), args.days)
+    except CSRPolicyError as e:
+        print(f"❌ CSR rejected: {e}")
+        sys.exit(1)
+    if args.out:
+        atomic_write(args.out, cert_pem, mode=0o644)
+    print(f"✅ Client certificate for '{cn}' signed: {CERTS_BASE_DIR / cn / f'{cn}.crt'}")
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,40 @@
 import sys
-from pathlib import Path
-import subprocess
 from mosquitto_auth.api.core.config import settings
-from mosquitto_auth.lib.utils import interpret_openssl_error
+from mosquitto_auth.ca.verifier import verify_certificate_file, openssl_date
 
 CA_CERT = settings.ca_cert_path
 CLIENT_BASE = settings.client_certs_dir
 
 
-def run_cmd_capture(cmd: list[str]) -> str:
-    """Run a shell command and capture stdout + stderr."""
-    try:
-        result = subprocess.run(
-            cmd,
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        return f"[ERROR]: {' '.join(cmd)}\n{e.output or str(e)}"
+def verify_client_certificate(cn: str) -> dict | None:
+    """Structured verification of a client certificate; None when it does not exist."""
+    crt_path = CLIENT_BASE / cn / f"{cn}.crt"
+    if not crt_path.exists():
+        return None
+    return verify_certificate_file(crt_path, CA_CERT, expected_cn=cn)
 
 
 def verify_certificate_client(cn: str) -> str:
     """Check the validity and CA signature of a client certificate."""
-    client_dir = CLIENT_BASE / cn
-    crt_path = client_dir / f"{cn}.crt"
+    crt_path = CLIENT_BASE / cn / f"{cn}.crt"
 
     if not crt_path.exists():
-        return "[CLIENT NOT FOUND] Client certificate not found: {crt_path}"
+        return f"[CLIENT NOT FOUND] Client certificate not found: {crt_path}"
 
     if not CA_CERT.exists():
-        return "[CA NOT FOUND] CA certificate not found: {CA_CERT}"
+        return f"[CA NOT FOUND] CA certificate not found: {CA_CERT}"
 
+    result = verify_client_certificate(cn)
     output = []
     output.append("🔍 Checking certificate validity:")
-    output.append(
-        run_cmd_capture([
-            "openssl", "x509", "-in", str(crt_path), "-noout", "-dates"
-        ])
-    )
+    output.append(f"notBefore={openssl_date(result['valid_from'])}")
+    output.append(f"notAfter={openssl_date(result['valid_until'])}")
 
     output.append("\n🔒 Verifying CA signature:")
-    verify_output = run_cmd_capture([
-        "openssl", "verify", "-CAfile", str(CA_CERT), str(crt_path)
-    ])
-    output.append(verify_output)
-    interpreted = interpret_openssl_error(verify_output)
-    if interpreted:
-        tag, description = interpreted
-        output.append(f"\n💡 {tag} {description}")
+    output.append(f"{crt_path}: {result['status']}")
+    for error in result["errors"]:
+        detail = f" ({error['detail']})" if error["detail"] else ""
+        output.append(f"\n💡 {error['tag']} {error['description']}{detail}")
 
     return "\n".join(output)
 
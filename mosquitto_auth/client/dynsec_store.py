@@ -0,0 +1,87 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Callable, Iterable, List, Tuple
+
+# Runs a list of dynamic-security commands and returns one response dict per command
+CommandExecutor = Callable[[List[dict]], List[dict]]
+
+
+class DynsecUserStore:
+    """
+    User store backed by Mosquitto's dynamic-security plugin. Every change is an
+    incremental control command applied live by the broker: no file rewrite and no
+    SIGHUP. The client list is cached for `list_ttl` seconds and kept up to date
+    with our own changes.
+    """
+
+    def __init__(self, execute: CommandExecutor, list_ttl: float = 5.0):
+        self._execute = execute
+        self.list_ttl = list_ttl
+        self._lock = threading.Lock()
+        self._clients: List[str] | None = None
+        self._loaded_at = 0.0
+
+    def run(self, commands: List[dict]) -> List[str | None]:
+        """Execute commands in one batch; returns the error message (or None) for each."""
+        if not commands:
+            return []
+        responses = self._execute(commands)
+        return [response.get("error") for response in responses]
+
+    def _invalidate(self) -> None:
+        with self._lock:
+            self._clients = None
+
+    def list_clients(self) -> List[str]:
+        """Sorted usernames known to the plugin."""
+        with self._lock:
+            if self._clients is not None and time.monotonic() - self._loaded_at < self.list_ttl:
+                return self._clients
+        response = self._execute([{"command": "listClients", "verbose": False, "count": -1, "offset": 0}])[0]
+        if response.get("error"):
+            raise RuntimeError(f"Dynamic security error: {response['error']}")
+        clients = sorted(response.get("data", {}).get("clients", []))
+        with self._lock:
+            self._clients, self._loaded_at = clients, time.monotonic()
+        return clients
+
+    def exists(self, username: str) -> bool:
+        clients = self.list_clients()
+        i = bisect_left(clients, username)
+        return i < len(clients) and clients[i] == username
+
+    def page(self, prefix: str = "", cursor: str | None = None, limit: int = 100) -> Tuple[List[str], str | None]:
+        clients = self.list_clients()
+        lo = bisect_left(clients, prefix)
+        hi = bisect_left(clients, prefix + "\U0010ffff") if prefix else len(clients)
+        if cursor is not None:
+            lo = max(lo, bisect_right(clients, cursor))
+        end = min(hi, lo + limit)
+        page = clients[lo:end]
+        return page, (page[-1] if page and end < hi else None)
+
+    def count(self, prefix: str = "") -> int:
+        clients = self.list_clients()
+        hi = bisect_left(clients, prefix + "\U0010ffff") if prefix else len(clients)
+        return hi - bisect_left(clients, prefix)
+
+    def create_clients(self, users: Iterable[Tuple[str, str]], roles: Iterable[str] = ()) -> List[str | None]:
+        roles = [{"rolename": role} for role in roles]
+        errors = self.run([
+            {"command": "createClient", "username": u, "password": p, "roles": roles}
+            for u, p in users
+        ])
+        self._invalidate()
+        return errors
+
+    def set_passwords(self, users: Iterable[Tuple[str, str]]) -> List[str | None]:
+        return self.run([
+            {"command": "setClientPassword", "username": u, "password": p}
+            for u, p in users
+        ])
+
+    def delete_clients(self, usernames: Iterable[str]) -> List[str | None]:
+        errors = self.run([{"command": "deleteClient", "username": u} for u in usernames])
+        self._invalidate()
+        return errors
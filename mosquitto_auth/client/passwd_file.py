@@ -0,0 +1,30 @@
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+from mosquitto_auth.lib.fs import atomic_write
+from mosquitto_auth.lib.passwd_hash import format_passwd_line, parse_passwd_line
+
+DEFAULT_FILE_MODE = 0o600
+
+
+def read_passwd_entries(passwd_file: Path) -> Dict[str, str]:
+    """Read the passwd file into an ordered {username: hash} dict."""
+    entries: Dict[str, str] = {}
+    if not passwd_file.exists():
+        return entries
+    with open(passwd_file, 'r') as f:
+        for line in f:
+            parsed = parse_passwd_line(line)
+            if parsed:
+                username, password_hash = parsed
+                entries[username] = password_hash
+    return entries
+
+
+def write_passwd_entries(passwd_file: Path, entries: Iterable[Tuple[str, str]]) -> None:
+    """Atomically replace the passwd file with `entries`, keeping the permissions of the previous file."""
+    passwd_file = Path(passwd_file)
+    try:
+        mode = passwd_file.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = DEFAULT_FILE_MODE
+    atomic_write(passwd_file, "".join(format_passwd_line(u, h) for u, h in entries), mode=mode)
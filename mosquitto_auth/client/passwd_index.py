@@ -0,0 +1,163 @@
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+from mosquitto_auth.lib.passwd_hash import format_passwd_line, parse_passwd_line
+
+FileSignature = Tuple[int, int, int]
+
+
+class PasswdIndex:
+    """
+    In-memory index of a passwd file: username -> (hash, byte offset of its line).
+    It is revalidated with a single stat() per lookup and only re-read when the
+    file's (mtime, size, inode) signature changes.
+    """
+
+    def __init__(self, passwd_file: Path):
+        self.passwd_file = Path(passwd_file)
+        self._lock = threading.RLock()
+        self._entries: Dict[str, str] = {}
+        self._offsets: Dict[str, int] = {}
+        self._sorted: List[str] | None = None
+        self._signature: FileSignature | None = None  # None: the file does not exist
+        self._stale = True  # entries may lag the file (not loaded yet, or a write raced with the read)
+
+    def _stat_signature(self) -> FileSignature | None:
+        try:
+            st = os.stat(self.passwd_file)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _load(self) -> None:
+        entries: Dict[str, str] = {}
+        offsets: Dict[str, int] = {}
+        offset = 0
+        with open(self.passwd_file, 'rb') as f:
+            for raw in f:
+                parsed = parse_passwd_line(raw.decode('utf-8', errors='replace'))
+                if parsed:
+                    username, password_hash = parsed
+                    entries[username] = password_hash
+                    offsets[username] = offset
+                offset += len(raw)
+        self._entries, self._offsets = entries, offsets
+        self._sorted = None
+
+    def refresh(self) -> None:
+        with self._lock:
+            signature = self._stat_signature()
+            if signature == self._signature and not self._stale:
+                return
+            stale = False
+            if signature is None:
+                self._entries, self._offsets, self._sorted = {}, {}, None
+            else:
+                try:
+                    self._load()
+                except FileNotFoundError:
+                    self._entries, self._offsets, self._sorted = {}, {}, None
+                    signature = None
+                else:
+                    # A write that raced with the read: keep what was loaded, reload on the next lookup
+                    stale = self._stat_signature() != signature
+            self._signature, self._stale = signature, stale
+
+    def replace(self, entries: Iterable[Tuple[str, str]]) -> None:
+        """Adopt entries that were just written to disk, without reading the file back."""
+        with self._lock:
+            new_entries: Dict[str, str] = {}
+            offsets: Dict[str, int] = {}
+            offset = 0
+            for username, password_hash in entries:
+                new_entries[username] = password_hash
+                offsets[username] = offset
+                offset += len(format_passwd_line(username, password_hash).encode('utf-8'))
+            self._entries, self._offsets = new_entries, offsets
+            self._sorted = None
+            self._signature = self._stat_signature()
+            self._stale = False
+
+    def fresh(self) -> bool:
+        """True when the loaded entries match the file: lookups will not read it (one stat, no lock)."""
+        return not self._stale and self._stat_signature() == self._signature
+
+    def exists(self) -> bool:
+        self.refresh()
+        return self._signature is not None
+
+    def __contains__(self, username: str) -> bool:
+        self.refresh()
+        return username in self._entries
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._entries)
+
+    def get_hash(self, username: str) -> str | None:
+        self.refresh()
+        return self._entries.get(username)
+
+    def get_offset(self, username: str) -> int | None:
+        self.refresh()
+        return self._offsets.get(username)
+
+    def entries(self) -> Dict[str, str]:
+        """Snapshot copy of {username: hash}, in file order."""
+        with self._lock:
+            self.refresh()
+            return dict(self._entries)
+
+    def usernames(self) -> List[str]:
+        with self._lock:
+            self.refresh()
+            return list(self._entries)
+
+    def _sorted_range(self, prefix: str) -> Tuple[List[str], int, int]:
+        """Sorted username list (rebuilt lazily after changes) and the slice matching prefix."""
+        with self._lock:
+            self.refresh()
+            if self._sorted is None:
+                self._sorted = sorted(self._entries)
+            names = self._sorted
+        lo = bisect_left(names, prefix)
+        hi = bisect_left(names, prefix + "\U0010ffff") if prefix else len(names)
+        return names, lo, hi
+
+    def count(self, prefix: str = "") -> int:
+        _, lo, hi = self._sorted_range(prefix)
+        return hi - lo
+
+    def page(self, prefix: str = "", cursor: str | None = None, limit: int = 100) -> Tuple[List[str], str | None]:
+        """
+        Return up to `limit` usernames in sorted order, starting after `cursor`,
+        plus the cursor for the next page (None on the last page).
+        """
+        names, lo, hi = self._sorted_range(prefix)
+        if cursor is not None:
+            lo = max(lo, bisect_right(names, cursor))
+        end = min(hi, lo + limit)
+        page = names[lo:end]
+        next_cursor = page[-1] if page and end < hi else None
+        return page, next_cursor
+
+    def iter_usernames(self, prefix: str = "") -> Iterator[str]:
+        """Iterate a sorted snapshot without copying it; later writes don't affect the iteration."""
+        names, lo, hi = self._sorted_range(prefix)
+        return islice(names, lo, hi)
+
+
+_indexes: Dict[Path, PasswdIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_passwd_index(passwd_file: Path) -> PasswdIndex:
+    """Return the process-wide index for a passwd file, shared by every manager using it."""
+    key = Path(passwd_file).resolve()
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = PasswdIndex(passwd_file)
+        return _indexes[key]
@@ -0,0 +1,140 @@
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+from mosquitto_auth.client.passwd_file import write_passwd_entries
+from mosquitto_auth.client.passwd_index import PasswdIndex, get_passwd_index
+from mosquitto_auth.lib.fs import file_lock
+
+# Mutation operations applied, in order, against the file contents read under the lock
+OP_ADD = "add"          # fails if the user exists
+OP_UPDATE = "update"    # fails if the user does not exist
+OP_DELETE = "delete"    # fails if the user does not exist
+OP_RESET = "reset"      # drops every entry (overwrite_file)
+OP_SET = "set"          # adds or replaces, never fails
+OP_DISCARD = "discard"  # removes if present, never fails
+
+
+@dataclass
+class PasswdMutation:
+    op: str
+    username: str | None = None
+    password_hash: str | None = None
+    future: Future = field(default_factory=Future)
+
+
+# Every process (uvicorn workers, CLIs) touching the passwd file takes this lock
+passwd_file_lock = file_lock
+
+
+class PasswdWriteCoordinator:
+    """
+    Group commit for passwd mutations.
+
+    The first thread to submit becomes the leader: it waits `window` seconds for
+    other mutations to pile up, then takes the cross-process file lock, re-reads the
+    file, validates and applies the whole batch and rewrites the file once. Existence
+    checks happen under the lock, so concurrent workers cannot lose each other's updates.
+    """
+
+    def __init__(self, passwd_file: Path, index: PasswdIndex, window: float = 0.02):
+        self.passwd_file = Path(passwd_file)
+        self.index = index
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending: List[PasswdMutation] = []
+        self._leader_active = False
+        self.commits = 0
+        self.mutations = 0
+
+    def submit(self, mutations: List[PasswdMutation]) -> List[Future]:
+        with self._lock:
+            self._pending.extend(mutations)
+            leader = not self._leader_active
+            if leader:
+                self._leader_active = True
+        if leader:
+            self._lead()
+        return [m.future for m in mutations]
+
+    def apply(self, mutations: List[PasswdMutation]) -> None:
+        """Submit and block until the batch containing these mutations is on disk."""
+        for future in self.submit(mutations):
+            future.exception()
+
+    def _lead(self) -> None:
+        if self.window > 0:
+            time.sleep(self.window)
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._leader_active = False
+                    return
+            self._commit(batch)
+
+    def _commit(self, batch: List[PasswdMutation]) -> None:
+        applied: List[PasswdMutation] = []
+        try:
+            with passwd_file_lock(self.passwd_file):
+                self.index.refresh()
+                entries = self.index.entries()
+                for mutation in batch:
+                    try:
+                        self._apply_one(entries, mutation)
+                        applied.append(mutation)
+                    except ValueError as e:
+                        mutation.future.set_exception(e)
+                if applied:
+                    write_passwd_entries(self.passwd_file, entries.items())
+                    self.index.replace(entries.items())
+                    self.commits += 1
+                    self.mutations += len(applied)
+        except Exception as e:
+            print(f"❌ Error committing passwd batch: {e}", file=sys.stderr)
+            for mutation in batch:
+                if not mutation.future.done():
+                    mutation.future.set_exception(RuntimeError(str(e)))
+            return
+        for mutation in applied:
+            mutation.future.set_result(None)
+
+    @staticmethod
+    def _apply_one(entries: Dict[str, str], mutation: PasswdMutation) -> None:
+        username = mutation.username
+        if mutation.op == OP_RESET:
+            entries.clear()
+        elif mutation.op == OP_ADD:
+            if username in entries:
+                raise ValueError(f"User '{username}' already exists.")
+            entries[username] = mutation.password_hash
+        elif mutation.op == OP_UPDATE:
+            if username not in entries:
+                raise ValueError(f"User '{username}' does not exist.")
+            entries[username] = mutation.password_hash
+        elif mutation.op == OP_DELETE:
+            if username not in entries:
+                raise ValueError(f"User '{username}' does not exist.")
+            del entries[username]
+        elif mutation.op == OP_SET:
+            entries[username] = mutation.password_hash
+        elif mutation.op == OP_DISCARD:
+            entries.pop(username, None)
+        else:
+            raise ValueError(f"Unknown passwd mutation: {mutation.op}")
+
+
+_coordinators: Dict[Path, PasswdWriteCoordinator] = {}
+_coordinators_lock = threading.Lock()
+
+
+def get_write_coordinator(passwd_file: Path, window: float = 0.02) -> PasswdWriteCoordinator:
+    """Return the process-wide coordinator for a passwd file."""
+    key = Path(passwd_file).resolve()
+    with _coordinators_lock:
+        if key not in _coordinators:
+            _coordinators[key] = PasswdWriteCoordinator(passwd_file, get_passwd_index(passwd_file), window)
+        return _coordinators[key]
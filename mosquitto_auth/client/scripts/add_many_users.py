@@ -13,14 +13,18 @@ def main():
     parser.add_argument("-u", "--users", required=True, help="List in the format user1:pass1,user2:pass2")
     parser.add_argument("-c", "--overwrite", action="store_true", help="Create new file (overwrite existing)")
     parser.add_argument("--hash-alg", default="sha512-pbkdf2", choices=MosquittoUserManager.HASH_ALGORITHMS)
+    parser.add_argument("--backend", default=settings.PASSWD_BACKEND, choices=MosquittoUserManager.CLI_BACKENDS)
     parser.add_argument("--no-reload", action="store_true", help="Do not reload Mosquitto after changes")
     
     args = parser.parse_args()
-    manager = MosquittoUserManager(args.file, args.hash_alg)
+    if args.backend not in MosquittoUserManager.CLI_BACKENDS:
+        parser.error(f"backend '{args.backend}' is only available through the API; use --backend native or subprocess")
+    manager = MosquittoUserManager(args.file, args.hash_alg, args.backend)
     print(f"Users: {args.users}")
     try:
         users = parse_users(args.users)
-        if not manager.add_many_users(users, args.overwrite):
+        result = manager.add_many_users(users, args.overwrite)
+        if result["failed"]:
             sys.exit(1)
             
     except Exception as e:
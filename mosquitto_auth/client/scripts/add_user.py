@@ -11,10 +11,13 @@ def main():
     parser.add_argument("-p", "--password", required=True, help="User password")
     parser.add_argument("-c", "--overwrite", action="store_true", help="Create new file (overwrite existing)")
     parser.add_argument("--hash-alg", default="sha512-pbkdf2", choices=MosquittoUserManager.HASH_ALGORITHMS)
+    parser.add_argument("--backend", default=settings.PASSWD_BACKEND, choices=MosquittoUserManager.CLI_BACKENDS)
     parser.add_argument("--no-reload", action="store_true", help="Do not reload Mosquitto after changes")
     
     args = parser.parse_args()
-    manager = MosquittoUserManager(args.file, args.hash_alg)
+    if args.backend not in MosquittoUserManager.CLI_BACKENDS:
+        parser.error(f"backend '{args.backend}' is only available through the API; use --backend native or subprocess")
+    manager = MosquittoUserManager(args.file, args.hash_alg, args.backend)
     
     try:
         if not manager.add_user(args.username, args.password, args.overwrite):
@@ -8,10 +8,13 @@ def main():
     parser = argparse.ArgumentParser(description="Remove a user from the Mosquitto password file")
     parser.add_argument("-f", "--file", type=Path, default=settings.PASSWD_FILE_PATH)
     parser.add_argument("-u", "--username", required=True, help="Username to remove")
+    parser.add_argument("--backend", default=settings.PASSWD_BACKEND, choices=MosquittoUserManager.CLI_BACKENDS)
     parser.add_argument("--no-reload", action="store_true", help="Do not reload Mosquitto after changes")
     
     args = parser.parse_args()
-    manager = MosquittoUserManager(args.file)
+    if args.backend not in MosquittoUserManager.CLI_BACKENDS:
+        parser.error(f"backend '{args.backend}' is only available through the API; use --backend native or subprocess")
+    manager = MosquittoUserManager(args.file, backend=args.backend)
     
     try:
         if not manager.delete_user(args.username):
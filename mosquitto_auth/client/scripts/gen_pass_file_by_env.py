@@ -1,3 +1,4 @@
+import argparse
 import os
 import re
 import sys
@@ -31,7 +32,13 @@ def get_env_users() -> Dict[str, str]:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate the Mosquitto password file from USER_X/PASS_X variables in .env")
+    parser.add_argument("--sync", action="store_true",
+                        help="Reconcile with the existing file: only add, rotate or remove users that changed")
+    args = parser.parse_args()
     load_dotenv()
+    if settings.PASSWD_BACKEND not in MosquittoUserManager.CLI_BACKENDS:
+        parser.error(f"PASSWD_BACKEND '{settings.PASSWD_BACKEND}' is only available through the API")
     
     try:
         passwd_file = settings.PASSWD_FILE_PATH
@@ -44,8 +51,12 @@ def main():
             print("⚠️ No users found in .env", file=sys.stderr)
             sys.exit(1)
         
-        if not manager.add_many_users(users, overwrite_file=True):
-            sys.exit(1)
+        if args.sync:
+            manager.reconcile_users(users, keep={settings.USER_MQTT_MONITOR})
+        else:
+            result = manager.add_many_users(users, overwrite_file=True)
+            if result["failed"]:
+                sys.exit(1)
             
         print(f"✅ File {passwd_file} successfully updated with {len(users)} user(s)!")
         print(f"✅ Detected OS: {platform.system()}")
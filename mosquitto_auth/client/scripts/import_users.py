@@ -0,0 +1,43 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from mosquitto_auth.api.core.config import settings
+from mosquitto_auth.client.MosquittoUserManager import MosquittoUserManager
+from mosquitto_auth.client.user_import import import_users, IMPORT_FORMATS, DEFAULT_BATCH_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="Import users from a CSV (username,password) or NDJSON file")
+    parser.add_argument("input", help="Path to the file to import, or '-' for stdin")
+    parser.add_argument("-f", "--file", type=Path, default=settings.PASSWD_FILE_PATH)
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None, help="Input format (default: from file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--hash-alg", default="sha512-pbkdf2", choices=MosquittoUserManager.HASH_ALGORITHMS)
+    parser.add_argument("--backend", default=settings.PASSWD_BACKEND, choices=MosquittoUserManager.CLI_BACKENDS)
+    
+    args = parser.parse_args()
+    if args.backend not in MosquittoUserManager.CLI_BACKENDS:
+        parser.error(f"backend '{args.backend}' is only available through the API; use --backend native or subprocess")
+    fmt = args.format or ('ndjson' if args.input.endswith(('.ndjson', '.jsonl')) else 'csv')
+    manager = MosquittoUserManager(args.file, args.hash_alg, args.backend)
+    
+    created = failed = 0
+    try:
+        source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+        with source:
+            for entry in import_users(manager, source, fmt, args.batch_size):
+                print(json.dumps(entry))
+                if entry["status"] == "CREATED":
+                    created += 1
+                else:
+                    failed += 1
+    except Exception as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    print(f"✅ Import finished: {created} created, {failed} failed.", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
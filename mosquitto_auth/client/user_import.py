@@ -0,0 +1,90 @@
+import csv
+import json
+from typing import Iterable, Iterator, List, Tuple
+from mosquitto_auth.lib.validators import validate_users_batch
+from mosquitto_auth.client.MosquittoUserManager import MosquittoUserManager
+
+IMPORT_FORMATS = ['csv', 'ndjson']
+DEFAULT_BATCH_SIZE = 1000
+# Longest accepted row; the API reports longer ones as errors instead of buffering them
+MAX_LINE_BYTES = 64 * 1024
+
+# (row number, raw line) as read from the upload or file
+RawRow = Tuple[int, str]
+
+
+def parse_import_line(line: str, fmt: str) -> dict | None:
+    """
+    Parse one line into {"username", "password"}. Returns None for blank lines
+    and the optional CSV header; raises ValueError for malformed rows.
+    """
+    # Only the line terminator: spaces around a CSV password are part of the password
+    line = line.rstrip("\r\n")
+    if not line.strip():
+        return None
+    if fmt == 'ndjson':
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e.msg}")
+        if not isinstance(row, dict):
+            raise ValueError("Expected a JSON object with 'username' and 'password'")
+        return {"username": row.get("username"), "password": row.get("password")}
+    if fmt == 'csv':
+        fields = next(csv.reader([line]))
+        if [f.strip().lower() for f in fields] == ["username", "password"]:
+            return None
+        if len(fields) != 2:
+            raise ValueError("Expected 2 columns: username,password")
+        return {"username": fields[0], "password": fields[1]}
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def import_batch(manager: MosquittoUserManager, rows: List[RawRow], fmt: str) -> List[dict]:
+    """Parse, validate and add one batch of rows; returns one report entry per data row."""
+    report: List[dict] = []
+    parsed: List[Tuple[int, dict]] = []
+    for row_no, line in rows:
+        try:
+            row = parse_import_line(line, fmt)
+        except ValueError as e:
+            report.append({"row": row_no, "username": None, "status": "ERROR", "error": str(e)})
+            continue
+        if row is not None:
+            parsed.append((row_no, row))
+
+    validated = validate_users_batch([row for _, row in parsed])
+    valid: List[Tuple[int, str, str]] = []
+    for (row_no, row), result in zip(parsed, validated):
+        if isinstance(result, ValueError):
+            report.append({"row": row_no, "username": row.get("username"), "status": "ERROR", "error": str(result)})
+        else:
+            valid.append((row_no, result.username, result.password))
+
+    errors = manager.add_validated_users([(u, p) for _, u, p in valid]) if valid else []
+    for (row_no, username, _), err in zip(valid, errors):
+        entry = {"row": row_no, "username": username, "status": "CREATED" if err is None else "ERROR"}
+        if err is not None:
+            entry["error"] = str(err)
+        report.append(entry)
+
+    report.sort(key=lambda r: r["row"])
+    return report
+
+
+def iter_row_batches(lines: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[RawRow]]:
+    batch: List[RawRow] = []
+    for row_no, line in enumerate(lines, start=1):
+        batch.append((row_no, line))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_users(manager: MosquittoUserManager, lines: Iterable[str], fmt: str,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[dict]:
+    """Apply rows batch by batch and yield the per-row report as it goes; memory stays bounded by batch_size."""
+    for batch in iter_row_batches(lines, batch_size):
+        yield from import_batch(manager, batch, fmt)
@@ -0,0 +1,63 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class CredentialCache:
+    """
+    LRU + TTL cache of password verification results.
+
+    Keys are SHA-256 digests of (username, password, stored hash), so plaintext
+    passwords are never kept and a password rotation changes the key by itself.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, tuple[bool, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(username: str, password: str, password_hash: str) -> bytes:
+        return hashlib.sha256(f"{username}\0{password}\0{password_hash}".encode("utf-8")).digest()
+
+    def get(self, key: bytes, count_miss: bool = True) -> bool | None:
+        """Cached decision or None. count_miss=False for a probe that will be followed by a counted lookup."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    del self._entries[key]
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: bytes, allowed: bool) -> None:
+        with self._lock:
+            self._entries[key] = (allowed, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,87 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+
+def atomic_write(path: Path, data: bytes | str, mode: int | None = None) -> None:
+    """
+    Write data to a temp file next to `path`, fsync it and os.replace it into place,
+    so readers (and the broker on reload) only ever see the old or the new content.
+    Keeps the permissions of the file being replaced unless `mode` is given.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if mode is None:
+        try:
+            mode = path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def lock_file_path(path: Path) -> Path:
+    path = Path(path)
+    return path.with_name(f"{path.name}.lock")
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Exclusive fcntl lock on `<path>.lock`, shared by every process (uvicorn workers,
+    CLIs) changing `path`. The lock lives in a side file so atomic replaces of `path`
+    don't drop it.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path = lock_file_path(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def try_file_lock(path: Path) -> int | None:
+    """
+    Non-blocking exclusive lock on `<path>.lock`, held until the returned descriptor is
+    closed (or the process exits); None when another process holds it. Used to elect
+    one process among the uvicorn workers for a job only one of them should do.
+    """
+    lock_path = lock_file_path(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+    if fcntl is None:
+        return fd
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
@@ -0,0 +1,126 @@
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# Mosquitto passwd line format (mosquitto_passwd >= 2.0):
+#   sha512         -> username:$6$<b64 salt>$<b64 sha512(password + salt)>
+#   sha512-pbkdf2  -> username:$7$<iterations>$<b64 salt>$<b64 pbkdf2_sha512(password, salt)>
+SALT_LENGTH = 12
+PBKDF2_ITERATIONS = 101
+
+HASH_IDS = {
+    'sha512': 6,
+    'sha512-pbkdf2': 7,
+}
+
+# Below this many passwords the pool round-trip costs more than hashing inline
+PARALLEL_HASH_THRESHOLD = 256
+
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_workers = 0
+_hash_pool_lock = threading.Lock()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data.encode("ascii"), validate=True)
+
+
+def _sha512_digest(password: str, salt: bytes) -> bytes:
+    return hashlib.sha512(password.encode("utf-8") + salt).digest()
+
+
+def _pbkdf2_digest(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha512", password.encode("utf-8"), salt, iterations, dklen=64)
+
+
+def hash_password(
+    password: str,
+    hash_alg: str = 'sha512-pbkdf2',
+    iterations: int = PBKDF2_ITERATIONS,
+    salt: bytes | None = None
+) -> str:
+    """Return the hash field of a Mosquitto passwd line (everything after 'username:')."""
+    if hash_alg not in HASH_IDS:
+        raise ValueError(f"Unsupported hash algorithm: {hash_alg}")
+    if salt is None:
+        salt = os.urandom(SALT_LENGTH)
+
+    if hash_alg == 'sha512':
+        return f"$6${_b64encode(salt)}${_b64encode(_sha512_digest(password, salt))}"
+    return f"$7${iterations}${_b64encode(salt)}${_b64encode(_pbkdf2_digest(password, salt, iterations))}"
+
+
+def _get_hash_pool(workers: int) -> ProcessPoolExecutor:
+    global _hash_pool, _hash_pool_workers
+    with _hash_pool_lock:
+        if _hash_pool is None or _hash_pool_workers != workers:
+            if _hash_pool is not None:
+                _hash_pool.shutdown(wait=False)
+            # spawn: the API calls this from worker threads, where fork is unsafe
+            _hash_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _hash_pool_workers = workers
+        return _hash_pool
+
+
+def hash_many_passwords(passwords: list[str], hash_alg: str = 'sha512-pbkdf2', workers: int | None = None) -> list[str]:
+    """Hash a batch of passwords, spreading large batches across a process pool."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return [hash_password(p, hash_alg) for p in passwords]
+    pool = _get_hash_pool(workers)
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(partial(hash_password, hash_alg=hash_alg), passwords, chunksize=chunksize))
+
+
+def _verify_pair(pair: tuple[str, str]) -> bool:
+    return verify_password(*pair)
+
+
+def verify_many_passwords(pairs: list[tuple[str, str]], workers: int | None = None) -> list[bool]:
+    """Verify (password, hash) pairs, spreading large batches across the hashing pool."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pairs) < PARALLEL_HASH_THRESHOLD:
+        return [verify_password(p, h) for p, h in pairs]
+    pool = _get_hash_pool(workers)
+    chunksize = max(1, len(pairs) // (workers * 4))
+    return list(pool.map(_verify_pair, pairs, chunksize=chunksize))
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Check a password against a '$6$' or '$7$' hash as the broker does."""
+    parts = password_hash.strip().split("$")
+    try:
+        if len(parts) == 4 and parts[1] == "6":
+            salt, expected = _b64decode(parts[2]), _b64decode(parts[3])
+            digest = _sha512_digest(password, salt)
+        elif len(parts) == 5 and parts[1] == "7":
+            iterations = int(parts[2])
+            salt, expected = _b64decode(parts[3]), _b64decode(parts[4])
+            digest = _pbkdf2_digest(password, salt, iterations)
+        else:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+def format_passwd_line(username: str, password_hash: str) -> str:
+    return f"{username}:{password_hash}\n"
+
+
+def parse_passwd_line(line: str) -> tuple[str, str] | None:
+    """Split a passwd line into (username, hash). Blank lines and comments return None."""
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#") or ":" not in line:
+        return None
+    username, password_hash = line.split(":", 1)
+    return username, password_hash
@@ -15,6 +15,38 @@ error_openssl_map = {
         "tag": "[CERTIFICATE HAS EXPIRED]",
         "description": "The certificate is no longer valid because its expiration date has passed."
     },
+    "certificate is not yet valid": {
+        "tag": "[CERTIFICATE IS NOT YET VALID]",
+        "description": "The certificate's validity period has not started yet. Check the clock of the host that issued it."
+    },
+    "CA certificate has expired": {
+        "tag": "[CA CERTIFICATE HAS EXPIRED]",
+        "description": "The issuing CA certificate is no longer valid, so nothing it signed can be trusted. Generate a new CA."
+    },
+    "certificate signature failure": {
+        "tag": "[CERTIFICATE SIGNATURE FAILURE]",
+        "description": "The certificate names the CA as issuer but its signature does not match the CA key. It was signed by a different CA with the same name."
+    },
+    "unsupported certificate purpose": {
+        "tag": "[UNSUPPORTED CERTIFICATE PURPOSE]",
+        "description": "The Extended Key Usage does not allow this use (clientAuth for clients, serverAuth for the broker)."
+    },
+    "key usage does not include digital signature": {
+        "tag": "[INVALID KEY USAGE]",
+        "description": "The Key Usage extension is missing digitalSignature (and keyEncipherment for RSA server keys), so TLS handshakes will fail."
+    },
+    "hostname mismatch": {
+        "tag": "[HOSTNAME MISMATCH]",
+        "description": "None of the Subject Alternative Names matches the expected host, so clients verifying the hostname will reject it."
+    },
+    "subject common name mismatch": {
+        "tag": "[SUBJECT COMMON NAME MISMATCH]",
+        "description": "The certificate CN differs from the user it is stored for; with use_identity_as_username the broker would authenticate a different user."
+    },
+    "unable to load certificate": {
+        "tag": "[UNABLE TO LOAD CERTIFICATE]",
+        "description": "The certificate file is missing or is not a valid PEM certificate."
+    },
     "verification failed": {
         "tag": "[VERIFICATION FAILED]",
         "description": "Certificate verification failed. The CA file might be incorrect or the chain incomplete."
@@ -1,6 +1,6 @@
 from typing import Annotated
 from pydantic.types import StringConstraints
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError, WrapValidator
 
 UsernameStr = Annotated[
     str,
@@ -20,18 +20,35 @@ PasswordStr = Annotated[
     )
 ]
 
+class UserCredentials(BaseModel):
+    username: UsernameStr
+    password: PasswordStr
+
+def _row_error(value, handler):
+    # Turn a row's validation error into its result, so one bad row doesn't fail the batch
+    try:
+        return handler(value)
+    except ValidationError as e:
+        return ValueError(f"Invalid user credentials: {e.errors()}")
+
+# Compiled once at import; building a model per call was the dominant validation cost
+UserCredentialsBatch = TypeAdapter(list[Annotated[UserCredentials, WrapValidator(_row_error)]])
+
 def validate_single_user(username: str, password: str) -> tuple[str, str]:
     """Validate a single username/password pair"""
-    class TempUser(BaseModel):
-        username: UsernameStr
-        password: PasswordStr
-    
     try:
-        validated = TempUser(username=username, password=password)
+        validated = UserCredentials(username=username, password=password)
         return validated.username, validated.password
     except ValidationError as e:
         raise ValueError(f"Invalid user credentials: {e.errors()}")
 
+def validate_users_batch(rows: list[dict]) -> list[UserCredentials | ValueError]:
+    """
+    Validate many rows in one pass. Returns, per row, either the validated
+    credentials or the ValueError explaining why the row was rejected.
+    """
+    return UserCredentialsBatch.validate_python(rows)
+
 def validate_users_dict(users_dict: dict[str, str]) -> dict[str, str]:
     """Validate a complete users dictionary"""
     validated_users = {}
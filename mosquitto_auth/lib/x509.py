@@ -0,0 +1,159 @@
+import datetime
+import ipaddress
+from typing import Iterable, List, Literal, get_args
+from cryptography import x509
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+RSA_PUBLIC_EXPONENT = 65537
+
+KeyType = Literal["rsa-2048", "rsa-3072", "rsa-4096", "ec-p256", "ec-p384", "ed25519"]
+KEY_TYPES = get_args(KeyType)
+DEFAULT_KEY_TYPE: KeyType = "rsa-2048"
+DEFAULT_CA_KEY_TYPE: KeyType = "rsa-4096"
+
+_EC_CURVES = {"ec-p256": ec.SECP256R1, "ec-p384": ec.SECP384R1}
+
+# Extension profiles, equivalent to the v3_req sections the openssl configs used
+PROFILE_CLIENT = "client"
+PROFILE_SERVER = "server"
+PROFILES = {
+    PROFILE_CLIENT: ExtendedKeyUsageOID.CLIENT_AUTH,
+    PROFILE_SERVER: ExtendedKeyUsageOID.SERVER_AUTH,
+}
+
+
+def generate_private_key(key_type: str = DEFAULT_KEY_TYPE):
+    if key_type not in KEY_TYPES:
+        raise ValueError(f"Invalid key type '{key_type}'. Choose one of: {', '.join(KEY_TYPES)}")
+    if key_type.startswith("rsa-"):
+        return rsa.generate_private_key(public_exponent=RSA_PUBLIC_EXPONENT, key_size=int(key_type[4:]))
+    if key_type == "ed25519":
+        return ed25519.Ed25519PrivateKey.generate()
+    return ec.generate_private_key(_EC_CURVES[key_type]())
+
+
+def key_family(key_type: str) -> str:
+    """'rsa', 'ec' or 'ed25519': which TLS 1.2 suites (ECDHE-RSA, ECDHE-ECDSA, none widely supported) a server key can use."""
+    if key_type.startswith("rsa-"):
+        return "rsa"
+    return "ed25519" if key_type == "ed25519" else "ec"
+
+
+def signature_hash(signing_key) -> hashes.HashAlgorithm | None:
+    """Digest used when signing with `signing_key`: none for Ed25519, SHA-384 for P-384, SHA-256 otherwise."""
+    if isinstance(signing_key, ed25519.Ed25519PrivateKey):
+        return None
+    if isinstance(signing_key, ec.EllipticCurvePrivateKey) and signing_key.curve.key_size >= 384:
+        return hashes.SHA384()
+    return hashes.SHA256()
+
+
+def key_type_of(public_key) -> str:
+    """KEY_TYPES name of a public key (e.g. 'ec-p256'); 'unknown' for anything we do not issue."""
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return f"rsa-{public_key.key_size}"
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return "ed25519"
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        return f"ec-p{public_key.curve.key_size}"
+    return "unknown"
+
+
+def fingerprint(cert: x509.Certificate) -> str:
+    return cert.fingerprint(hashes.SHA256()).hex()
+
+
+def key_to_pem(key) -> bytes:
+    return key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+def cert_to_pem(cert: x509.Certificate) -> bytes:
+    return cert.public_bytes(serialization.Encoding.PEM)
+
+
+def load_private_key(data: bytes):
+    return serialization.load_pem_private_key(data, password=None)
+
+
+def load_certificate(data: bytes) -> x509.Certificate:
+    return x509.load_pem_x509_certificate(data)
+
+
+def load_csr(data: bytes) -> x509.CertificateSigningRequest:
+    return x509.load_pem_x509_csr(data)
+
+
+def common_name(cn: str) -> x509.Name:
+    return x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)])
+
+
+def subject_alt_names(names: Iterable[str]) -> x509.SubjectAlternativeName:
+    """IP addresses become iPAddress entries, anything else a dNSName."""
+    entries: List[x509.GeneralName] = []
+    for name in names:
+        try:
+            entries.append(x509.IPAddress(ipaddress.ip_address(name)))
+        except ValueError:
+            entries.append(x509.DNSName(name))
+    return x509.SubjectAlternativeName(entries)
+
+
+def _validity(builder: x509.CertificateBuilder, days: int) -> x509.CertificateBuilder:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return builder.not_valid_before(now).not_valid_after(now + datetime.timedelta(days=days))
+
+
+def build_self_signed_ca(key, cn: str, days: int) -> x509.Certificate:
+    name = common_name(cn)
+    public_key = key.public_key()
+    builder = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(public_key)
+        .serial_number(x509.random_serial_number())
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(x509.KeyUsage(
+            digital_signature=True, content_commitment=False, key_encipherment=False,
+            data_encipherment=False, key_agreement=False, key_cert_sign=True,
+            crl_sign=True, encipher_only=False, decipher_only=False,
+        ), critical=True)
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(public_key), critical=False)
+    )
+    return _validity(builder, days).sign(key, signature_hash(key))
+
+
+def build_leaf_certificate(ca_key, ca_cert: x509.Certificate, public_key, cn: str, days: int,
+                           profile: str = PROFILE_CLIENT, san: Iterable[str] = (),
+                           serial: int | None = None) -> x509.Certificate:
+    """Sign an end-entity certificate for `public_key` directly with the CA key."""
+    if profile not in PROFILES:
+        raise ValueError(f"Invalid certificate profile '{profile}'. Choose one of: {', '.join(PROFILES)}")
+    builder = (
+        x509.CertificateBuilder()
+        .subject_name(common_name(cn))
+        .issuer_name(ca_cert.subject)
+        .public_key(public_key)
+        .serial_number(serial if serial is not None else x509.random_serial_number())
+        .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=False)
+        .add_extension(x509.KeyUsage(
+            # keyEncipherment only makes sense for RSA (key transport); EC/EdDSA keys just sign
+            digital_signature=True, content_commitment=False,
+            key_encipherment=isinstance(public_key, rsa.RSAPublicKey),
+            data_encipherment=False, key_agreement=False, key_cert_sign=False,
+            crl_sign=False, encipher_only=False, decipher_only=False,
+        ), critical=False)
+        .add_extension(x509.ExtendedKeyUsage([PROFILES[profile]]), critical=False)
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(public_key), critical=False)
+        .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(ca_key.public_key()), critical=False)
+    )
+    san = list(san)
+    if san:
+        builder = builder.add_extension(subject_alt_names(san), critical=False)
+    return _validity(builder, days).sign(ca_key, signature_hash(ca_key))
@@ -0,0 +1,131 @@
+import math
+import random
+import time
+from mosquitto_auth.api.core import history
+from mosquitto_auth.api.core.history import AGGREGATES, MetricsHistory
+
+FIELDS = ["clients_connected", "messages_received"]
+TIERS = {1: 600, 60: 120}
+SAMPLES = 5000
+
+failures = []
+
+
+def _same(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    if math.isnan(a) or math.isnan(b):
+        return math.isnan(a) and math.isnan(b)
+    return a == b or math.isclose(a, b, rel_tol=1e-9)
+
+
+def check(label: str, actual, expected) -> None:
+    if len(actual) == len(expected) and all(_same(a, e) for a, e in zip(actual, expected)):
+        print(f"✅ {label}")
+    else:
+        failures.append(label)
+        print(f"❌ {label}: got {actual}, expected {expected}")
+
+
+def aggregates(tier, columns, first_bucket, bins, per_bin, column=0) -> dict:
+    """{aggregate: [per bin]} for one column, with empty bins as None like the API returns them."""
+    data = tier.aggregate(columns, first_bucket, bins, per_bin)
+    return {name: [history._clean(row[column]) for row in data[name]] for name in AGGREGATES}
+
+
+def check_known_samples():
+    """Array backend (the deployed one) against hand-computed aggregates."""
+    print("\n🧪 Array backend: known samples")
+    metrics = MetricsHistory(["a", "b"], {1: 10, 5: 4}, numpy=False)
+    for ts, value in [(1000.1, 3), (1000.5, -1), (1000.9, 5), (1001.2, 7), (1003.0, 2)]:
+        metrics.record("a", value, ts)
+    metrics.record("b", 10, 1001.0)
+    seconds, fives = metrics.tiers
+
+    a = aggregates(seconds, [0, 1], 1000, 4, 1)
+    check("1s bins: min", a["min"], [-1, 7, None, 2])
+    check("1s bins: max", a["max"], [5, 7, None, 2])
+    check("1s bins: avg", a["avg"], [7 / 3, 7, None, 2])
+    check("1s bins: last", a["last"], [5, 7, None, 2])
+    b = aggregates(seconds, [0, 1], 1000, 4, 1, column=1)
+    check("NaN gaps: other field only in its own second", b["last"], [None, 10, None, None])
+
+    a = aggregates(seconds, [0], 1000, 2, 2)
+    check("2s bins over a gap: min/max/avg/last", [a["min"][0], a["max"][0], a["avg"][0], a["last"][0], a["last"][1]], [-1, 7, 3.5, 7, 2])
+    a = aggregates(fives, [0], 200, 1, 1)
+    check("5s tier: min/max/avg/last", [a["min"][0], a["max"][0], a["avg"][0], a["last"][0]], [-1, 7, 16 / 5, 2])
+
+    # 1010 lands in the slot of 1000 (capacity 10): the old bucket must not be read back
+    metrics.record("a", 4, 1010.5)
+    check("Wraparound: overwritten bucket is empty", aggregates(seconds, [0], 1000, 1, 1)["last"], [None])
+    a = aggregates(seconds, [0], 1003, 1, 8)
+    check("Wraparound: bin across the end of the ring", [a["min"][0], a["max"][0], a["avg"][0], a["last"][0]], [2, 4, 3, 4])
+
+
+def check_tier_pick():
+    print("\n🧪 Array backend: tier picked for a range")
+    metrics = MetricsHistory(["a"], {1: 60, 10: 30}, numpy=False)
+    now = time.time()
+    picks = [
+        metrics.query(["a"], now - 30, now)["tier_step"],            # within the 1 s tier's minute
+        metrics.query(["a"], now - 30, now, step=10)["tier_step"],   # coarser step requested
+        metrics.query(["a"], now - 200, now)["tier_step"],           # older than the 1 s tier reaches
+        metrics.query(["a"], now - 10_000, now)["tier_step"],        # older than every tier: the last one
+    ]
+    check("Tier steps", picks, [1, 10, 10, 10])
+
+
+def check_numpy_matches_array():
+    """Extra check when NumPy is installed: both backends agree on random samples."""
+    if history.np is None:
+        print("\nℹ️ NumPy is not installed: skipping the array/NumPy comparison.")
+        return
+    rng = random.Random(24)
+    now = int(time.time())
+    backends = [MetricsHistory(FIELDS, TIERS, numpy=False), MetricsHistory(FIELDS, TIERS, numpy=True)]
+    print(f"\n🧪 Array vs NumPy: {SAMPLES} samples over the last {TIERS[1]} s (with gaps)")
+    for _ in range(SAMPLES):
+        ts = now - rng.uniform(0, TIERS[1] * 1.5)
+        if int(ts) % 17 == 0:
+            continue  # empty buckets
+        field, value = rng.choice(FIELDS), rng.uniform(-1000, 1000)
+        for metrics in backends:
+            metrics.record(field, value, ts)
+
+    mismatches = checked = 0
+    columns = list(range(len(FIELDS)))
+    for array_tier, numpy_tier in zip(*(m.tiers for m in backends)):
+        for per_bin in (1, 3, 10):
+            bins = max(1, array_tier.capacity // per_bin)
+            first_bucket = now // array_tier.step - bins * per_bin + 1
+            expected = array_tier.aggregate(columns, first_bucket, bins, per_bin)
+            actual = numpy_tier.aggregate(columns, first_bucket, bins, per_bin)
+            for name in AGGREGATES:
+                for b, (row_a, row_n) in enumerate(zip(expected[name], actual[name])):
+                    for j, (a, n) in enumerate(zip(row_a, row_n)):
+                        checked += 1
+                        if not _same(a, n):
+                            mismatches += 1
+                            if mismatches <= 10:
+                                print(f"❌ tier={array_tier.step}s per_bin={per_bin} bin={b} {FIELDS[j]}.{name}: array={a} numpy={n}")
+    if mismatches:
+        failures.append("array/NumPy comparison")
+        print(f"❌ {mismatches}/{checked} aggregates differ between the array and NumPy backends")
+    else:
+        print(f"✅ {checked} aggregates identical in the array and NumPy backends")
+
+
+def test_history_backends():
+    failures.clear()
+    check_known_samples()
+    check_tier_pick()
+    check_numpy_matches_array()
+    print("═" * 80)
+    if failures:
+        print(f"❌ {len(failures)} check(s) failed: {', '.join(failures)}")
+        raise SystemExit(1)
+    print("✅ Metrics history checks passed")
+
+
+if __name__ == "__main__":
+    test_history_backends()